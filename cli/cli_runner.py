@@ -1,14 +1,64 @@
-from argparse import ArgumentParser, RawTextHelpFormatter, SUPPRESS
+import sys
+import yaml
+from argparse import ArgumentParser, ArgumentTypeError, RawTextHelpFormatter, SUPPRESS
 from pathlib import Path
 from core.controller import SDController
 from core.card_ops import CardOperations
-from core.test_suite import TestSuite
+from core.backend import create_backend
+from core.test_suite import TestSuite, WORKLOADS
+from core.test_runner import TestRunner
+from core.report import ReportWriter
+from cli.json_output import JsonOutput
 from utils.logger import get_logger
 from utils.config import config
 from datetime import datetime
 
 logger = get_logger(__name__)
 
+# Exit codes of a CLI run
+EXIT_PASSED = 0   # Every round finished and every test case passed
+EXIT_FAILED = 1   # A test case failed or the test was stopped
+EXIT_USAGE = 2    # Invalid command line options
+EXIT_NO_CARD = 3  # No SD card detected within the card timeout
+EXIT_ERROR = 4    # Test process error
+
+def _positive_int(value):
+    try:
+        number = int(value)
+    except ValueError:
+        raise ArgumentTypeError(f"not an integer: {value}")
+    if number < 1:
+        raise ArgumentTypeError(f"must be at least 1: {value}")
+    return number
+
+def _non_negative_float(value):
+    try:
+        number = float(value)
+    except ValueError:
+        raise ArgumentTypeError(f"not a number: {value}")
+    if number < 0:
+        raise ArgumentTypeError(f"must not be negative: {value}")
+    return number
+
+def _int_list(value):
+    return [_positive_int(item) for item in value.split(',') if item.strip()]
+
+def _workload_list(value):
+    names = [name.strip() for name in value.split(',') if name.strip()]
+    unknown = [name for name in names if name not in WORKLOADS]
+    if unknown:
+        raise ArgumentTypeError(f"unknown workloads {', '.join(unknown)}, valid: {', '.join(WORKLOADS)}")
+    return names
+
+def _setting(value):
+    key, separator, text = value.partition('=')
+    if not separator or not key.strip():
+        raise ArgumentTypeError(f"expected KEY=VALUE: {value}")
+    try:
+        return key.strip(), yaml.safe_load(text)
+    except yaml.YAMLError as e:
+        raise ArgumentTypeError(f"invalid value of {key}: {str(e)}")
+
 class CLIRunner:
     def __init__(self):
         logger.debug("Initializing CLI runner")
@@ -18,14 +68,20 @@ class CLIRunner:
             formatter_class=RawTextHelpFormatter  # Keep help message format
         )
         self._setup_arguments()
-        self.controller = SDController()
+        self.output = None  # JsonOutput in json/jsonl format
+        logger.debug("CLI runner initialization complete")
+
+    def _init_components(self):
+        """Create backend, card operations and test suite once the configuration is final"""
+        self.backend = create_backend(config)
+        self.controller = SDController(backend=self.backend)
         self.card_ops = CardOperations(
                     controller=self.controller,
-                    config=config   #from utils.config import
+                    config=config,   #from utils.config import
+                    backend=self.backend
         )
         self.test_suite = TestSuite(self.card_ops)
-        logger.debug("CLI runner initialization complete")
-    
+
     def _setup_arguments(self):
         """Setup command line arguments"""
         # Add program description
@@ -34,11 +90,16 @@ SDExpressTester [options]
 
 Examples:
   ./SDExpressTester.exe --cli --run  # Run test according to config.yaml
+  ./SDExpressTester.exe --cli --run --workloads performance,iops --qd 1,32 --format jsonl --target E:
+  ./SDExpressTester.exe --cli --run --set test.iops.read_percent=[70] --card-timeout 0 --format json
+
+Exit codes:
+  0 passed, 1 failed or stopped, 2 invalid options, 3 no SD card, 4 test process error
 """
-        
+
         basic = self.parser.add_argument_group('Basic Options')
-        basic.add_argument('-h', '--help', 
-                          action='help', 
+        basic.add_argument('-h', '--help',
+                          action='help',
                           default=SUPPRESS,
                           help='Show help message and exit')
         basic.add_argument('--cli',
@@ -47,53 +108,127 @@ Examples:
         basic.add_argument('--run',
                           action='store_true',
                           help='Run test using config.yaml')
-    
+        basic.add_argument('--reprobe',
+                          action='store_true',
+                          help='Measure the card mode again instead of using the card mode cache')
+
+        # Batch options override config.yaml for this run only, the file is not changed
+        batch = self.parser.add_argument_group('Batch Options (override config.yaml for this run)')
+        batch.add_argument('--workloads', type=_workload_list, metavar='LIST',
+                          help=f"Comma separated test cases to run: {', '.join(WORKLOADS)}")
+        batch.add_argument('--size', type=_positive_int, metavar='MB',
+                          help='Performance test total size (test.performance.total_size)')
+        batch.add_argument('--block-size', type=_positive_int, metavar='MB',
+                          help='Performance test block size (test.performance.block_size)')
+        batch.add_argument('--qd', type=_int_list, metavar='LIST',
+                          help='Comma separated queue depths of the performance and random IOPS tests')
+        batch.add_argument('--iterations', type=_positive_int, metavar='N',
+                          help='Performance test iterations (test.performance.iterations)')
+        batch.add_argument('--duration', type=_non_negative_float, metavar='SECONDS',
+                          help='Run time of every random IOPS run (test.iops.duration)')
+        batch.add_argument('--loops', type=_positive_int, metavar='N',
+                          help='Number of test rounds (test.loop)')
+        batch.add_argument('--target', metavar='DEVICE',
+                          help='Card to test: volume (E: or mount point), device path or serial number (card.target)')
+        batch.add_argument('--card-timeout', type=_non_negative_float, default=300, metavar='SECONDS',
+                          help='Wait for an SD card at most this long, 0 checks once (default 300)')
+        batch.add_argument('--timeout', type=_positive_int, metavar='SECONDS',
+                          help='Timeout of every test round (test.timeout), surface scan and endurance are exempt')
+        batch.add_argument('--set', type=_setting, action='append', default=[], metavar='KEY=VALUE',
+                          help='Override any configuration key, value in YAML syntax, may be repeated')
+        batch.add_argument('--format', choices=('text', 'json', 'jsonl'), default='text',
+                          help='Output format on stdout: text, json (one document at the end) or\n'
+                               'jsonl (one event per line as the test runs); logs and messages go to stderr')
+        batch.add_argument('--report-dir', type=Path, metavar='DIR',
+                          help='Directory of the test report files (default current directory)')
+
+    def _overrides(self, args):
+        """Configuration overrides of the command line options, in order"""
+        overrides = []
+        if args.workloads is not None:
+            overrides.append(('test.workloads', args.workloads))
+        if args.size is not None:
+            overrides.append(('test.performance.total_size', args.size))
+        if args.block_size is not None:
+            overrides.append(('test.performance.block_size', args.block_size))
+        if args.qd is not None:
+            overrides.append(('test.performance.queue_depths', args.qd))
+            overrides.append(('test.iops.queue_depths', args.qd))
+        if args.iterations is not None:
+            overrides.append(('test.performance.iterations', args.iterations))
+        if args.duration is not None:
+            overrides.append(('test.iops.duration', args.duration))
+        if args.loops is not None:
+            overrides.append(('test.loop.enabled', args.loops > 1))
+            overrides.append(('test.loop.count', args.loops))
+        if args.target is not None:
+            overrides.append(('card.target', args.target))
+        if args.timeout is not None:
+            overrides.append(('test.timeout', args.timeout))
+        # Explicit settings win over the shortcuts above
+        overrides.extend(args.set)
+        return overrides
+
+    def _print(self, message):
+        """Human readable message, on stderr when stdout carries JSON"""
+        print(message, file=sys.stderr if self.output else sys.stdout)
+
     def run(self):
-        """Run CLI test"""
+        """Run CLI test
+        Returns:
+            int: Exit code, EXIT_PASSED when every round finished and passed
+        """
         try:
             args = self.parser.parse_args()
             logger.debug(f"CLI parameters: {args}")
-            
+
             # Show help info when only --cli parameter is present
             if args.cli and not args.run:
                 self.parser.print_help()
-                return True
-            
+                return EXIT_PASSED
+
             # Execute test when both --cli and --run parameters are present
             if args.cli and args.run:
                 logger.info("Starting CLI test")
             else:
                 logger.info("Please use --cli and --run parameters to run test")
-                return False
-            
+                return EXIT_USAGE
+
+            if args.format != 'text':
+                self.output = JsonOutput(lines=args.format == 'jsonl')
+            overrides = self._overrides(args)
+            for key, value in overrides:
+                config.override(key, value)
+            self._init_components()
+
             # Check controller
             controller_info = self.controller._controller_info()
             # If SD Express is already in NVMe mode when running the tool, controller compatibility cannot be determined
             # So here we don't exit, just notify user
             if not controller_info:
                 logger.info("SD controller may be incompatible or already in NVMe mode")
-                print("INFO: SD controller may be incompatible or already in NVMe mode")
+                self._print("INFO: SD controller may be incompatible or already in NVMe mode")
                 # return False
             else:
                 logger.info(f"Controller compatibility: {controller_info}")
-                print(f"Controller compatibility: {controller_info}")
-            
+                self._print(f"Controller compatibility: {controller_info}")
+
             # Wait and detect SD card
-            print("Please insert SD card...")
+            self._print("Please insert SD card...")
             logger.info("Waiting for SD card insertion...")
-            card_info = self.card_ops.wait_for_card(timeout=300)  # Use default timeout
+            card_info = self.card_ops.wait_for_card(timeout=args.card_timeout, reprobe=args.reprobe)
             if not card_info:
                 logger.error("No SD card detected or timeout")
-                print("Error: No SD card detected or timeout")
-                return False
-                
+                self._print("Error: No SD card detected or timeout")
+                if self.output:
+                    self.output.finish(EXIT_NO_CARD, passed=False, error="No SD card detected")
+                return EXIT_NO_CARD
+
             logger.info(f"SD card detected: {card_info}")
-            print(f"SD card detected: {card_info}")
-            
-            # Get loop test configuration
-            loop_enabled = config.get('test.loop.enabled', False)
-            loop_count = config.get('test.loop.count', 1)
-            
+            self._print(f"SD card detected: {card_info}")
+            if self.output:
+                self.output.start(card_info, {key: value for key, value in overrides})
+
             # Use settings from config file
             test_config = {
                 'mode': 'all',
@@ -104,104 +239,91 @@ Examples:
                 'result_callback': self._show_result,
                 'status_callback': self._update_status
             }
-            
+
             # Set output file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = Path(f"test_report_{timestamp}.txt")
-            
+            report_dir = args.report_dir or Path()
+            report_dir.mkdir(parents=True, exist_ok=True)
+            output_path = report_dir / f"test_report_{timestamp}.txt"
+            test_config['series_path'] = output_path.with_name(f"{output_path.stem}_throughput.csv")
+            test_config['results_path'] = output_path.with_name(f"{output_path.stem}_results")
+
+            report = None
             try:
                 logger.info("Starting test...")
-                # Initialize results list
-                all_results = []
-
-                # Execute loop test
-                for i in range(loop_count if loop_enabled else 1):
-                    if loop_enabled:
-                        print(f"\n=== Test {i+1}/{loop_count} ===")
-                        logger.info(f"Starting test {i+1}/{loop_count}")
-                    
-                    results = self.test_suite.run_tests(test_config)
-                    if not results: break
-                    all_results.append(results)
-                
-                # Generate report
-                self._generate_report(all_results if loop_enabled else results, output_path)
-                logger.info(f"Test report saved to: {output_path}")
-                print(f"Test report saved to: {output_path}")
-                
+                # Report grows round by round, a killed run keeps every finished round
+                report = ReportWriter(output_path, config)
+                test_config['iteration_callback'] = self._iteration_callback(report)
+                runner = TestRunner(self.test_suite, config)
+                try:
+                    runner.run(test_config, round_callback=self._show_round, round_finished=report.add_round)
+                finally:
+                    report.finish(stopped=self.test_suite._stop_event.is_set())
+                self._print(f"Test report saved to: {output_path}")
+                logger.info(f"Typed results saved to: {test_config['results_path']}")
+
                 logger.info("Test completed")
-                return True
-                
+                passed = (report.rounds == report.loop_count and report.passed_rounds == report.rounds and
+                          not self.test_suite._stop_event.is_set())
+                exit_code = EXIT_PASSED if passed else EXIT_FAILED
+                if self.output:
+                    self.output.finish(exit_code, passed=passed, rounds=report.rounds, planned_rounds=report.loop_count,
+                                       passed_rounds=report.passed_rounds, report=str(output_path),
+                                       results=str(test_config['results_path']))
+                return exit_code
+
             except Exception as e:
                 logger.error(f"Test process error: {str(e)}", exc_info=True)
-                print(f"Error: Test process error: {str(e)}")
-                return False
-                
+                self._print(f"Error: Test process error: {str(e)}")
+                if self.output:
+                    self.output.finish(EXIT_ERROR, passed=False, error=str(e),
+                                       rounds=report.rounds if report else 0)
+                return EXIT_ERROR
+
         except Exception as e:
             logger.error(f"CLI run error: {str(e)}", exc_info=True)
-            print(f"Error: {str(e)}")
-            return False
-    
-    def _generate_report(self, all_results, output_path):
-        """Generate test report"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Write report header
-            f.write("=== SD Express Tester Test Report ===\n")
-            f.write(f"Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            # Write configuration information
-            f.write("Test configuration:\n")
-            f.write(f"- Loop test: {'Enabled' if config.get('test.loop.enabled') else 'Disabled'}\n")
-            if config.get('test.loop.enabled'):
-                f.write(f"- Loop count: {config.get('test.loop.count')}\n")
-            f.write(f"- Total size of performance test: {config.get('test.performance.total_size')}MB\n")
-            f.write(f"- Performance test block size: {config.get('test.performance.block_size')}MB\n")
-            f.write(f"- Performance test iterations: {config.get('test.performance.iterations')}\n\n")
-            
-            # Write test results
-            if isinstance(all_results, list):  # Loop test results
-                total_rounds = len(all_results)
-                passed_rounds = sum(1 for results in all_results 
-                                  if all(r.get('passed', False) for r in results.values()))
-                failed_rounds = total_rounds - passed_rounds
-                
-                f.write(f"Test result summary:\n")
-                f.write(f"- Total number of test rounds: {total_rounds}\n")
-                f.write(f"- Passed rounds: {passed_rounds}\n")
-                f.write(f"- Failed rounds: {failed_rounds}\n\n")
-                
-                # Write detailed results of each test round
-                for round_num, results in enumerate(all_results, 1):
-                    f.write(f"\n=== Test round {round_num}/{total_rounds} ===\n")
-                    self._write_test_details(f, results)
-                    
-            else:  # Single test result
-                f.write("Test result:\n")
-                self._write_test_details(f, all_results)
-
-    def _write_test_details(self, f, results):
-        """Write test details"""
-        for test_name, result in results.items():
-            status = "Passed" if result['passed'] else "Failed"
-            f.write(f"\n{test_name}: {status}\n")
-            details = result['details'].split('\n')
-            for detail in details:
-                if detail.strip():
-                    f.write(f"  {detail}\n")
+            self._print(f"Error: {str(e)}")
+            if self.output:
+                self.output.finish(EXIT_ERROR, passed=False, error=str(e))
+            return EXIT_ERROR
+
+    def _iteration_callback(self, report):
+        """Iteration metrics go to the report aggregates, and to stdout in json/jsonl format"""
+        if not self.output:
+            return report.add_iteration
+
+        def callback(test, phase, queue_depth, iteration, result):
+            report.add_iteration(test, phase, queue_depth, iteration, result)
+            self.output.iteration(self.test_suite.round, test, phase, queue_depth, iteration, result)
+        return callback
+
+    def _show_round(self, round_number, round_count):
+        """Show loop test round header"""
+        if self.output:
+            self.output.round_started(round_number, round_count)
+            return
+        print(f"\n=== Test {round_number}/{round_count} ===")
 
     def _update_progress(self, value):
         """Show progress"""
+        if self.output:
+            return
         print(f"\rProgress: {value}%", end="", flush=True)
         if value == 100:
             print()  # New line when complete
-            
+
     def _show_result(self, result):
         """Show test results"""
+        if self.output:
+            self.output.results(self.test_suite.round, result)
+            return
         for test_name, test_result in result.items():
             status = "Passed" if test_result['passed'] else "Failed"
             print(f"{test_name}: {status}")
             print(f"Details: {test_result['details']}\n")
-            
+
     def _update_status(self, message):
         """Update status"""
-        print(f"\r{message}", end="\n", flush=True)
\ No newline at end of file
+        if self.output:
+            return
+        print(f"\r{message}", end="\n", flush=True)
@@ -0,0 +1,64 @@
+import sys
+import json
+from datetime import datetime
+
+class JsonOutput:
+    """Machine readable test output on stdout
+
+    In "jsonl" format every event is printed as one JSON object per line as
+    soon as it happens: start, round, result, iteration and summary. In
+    "json" format the events are collected and printed as one document when
+    the run ended, with the round, result and iteration events in lists.
+    Every object carries an "event" field, results and iterations also
+    carry their round number.
+    """
+    def __init__(self, lines=True, stream=None):
+        self.lines = lines
+        self.stream = stream or sys.stdout
+        self._document = {'rounds': [], 'results': [], 'iterations': []}
+
+    def _emit(self, event, **fields):
+        record = dict(event=event, time=datetime.now().isoformat(timespec='milliseconds'), **fields)
+        if self.lines:
+            self.stream.write(json.dumps(record) + "\n")
+            self.stream.flush()
+        elif event in ('round', 'result', 'iteration'):
+            self._document[event + 's'].append(record)
+        else:
+            self._document[event] = record
+
+    def start(self, card_info, overrides):
+        self._emit('start', card=card_to_dict(card_info), overrides=overrides)
+
+    def round_started(self, round_number, round_count):
+        self._emit('round', round=round_number, count=round_count)
+
+    def results(self, round_number, results):
+        """Result callback of TestSuite, one event per test case"""
+        for test_name, result in results.items():
+            self._emit('result', round=round_number, test=test_name, passed=bool(result['passed']),
+                       details=result['details'])
+
+    def iteration(self, round_number, test, phase, queue_depth, iteration, result):
+        """Iteration callback of TestSuite, the metrics of one engine run"""
+        latency = result.latency
+        self._emit('iteration', round=round_number, test=test, phase=phase, queue_depth=queue_depth,
+                   iteration=iteration, bytes=result.bytes, elapsed=round(result.elapsed, 6),
+                   mb_per_s=round(result.speed, 3), iops=round(result.iops, 1),
+                   latency_ms={'p50': round(latency.percentile(50) * 1000, 4),
+                               'p99': round(latency.percentile(99) * 1000, 4),
+                               'max': round(latency.max / 1000000, 4)})
+
+    def finish(self, exit_code, **summary):
+        """Print the summary, and the whole document in "json" format"""
+        self._emit('summary', exit_code=exit_code, **summary)
+        if not self.lines:
+            self.stream.write(json.dumps(self._document, indent=2) + "\n")
+            self.stream.flush()
+
+def card_to_dict(card_info):
+    if card_info is None:
+        return None
+    return {'name': card_info.name, 'mode': card_info.mode, 'capacity': card_info.capacity,
+            'serial': card_info.serial, 'device_path': card_info.device_path, 'volume': card_info.drive_letter,
+            'read_speed': round(card_info.read_speed or 0.0, 2), 'mode_cached': card_info.mode_cached}
@@ -0,0 +1,755 @@
+import os
+import re
+import sys
+import ctypes
+import glob
+import shutil
+import time
+import struct
+import threading
+import zlib
+from core.io_engine import create_io_engine, ThreadPoolIOEngine
+from core.device_events import create_device_watcher, SimulatedDeviceWatcher
+from utils.logger import get_logger
+
+try:
+    import win32file
+    import win32api
+    import winioctlcon
+    import win32security
+    import win32com.client
+    import winreg
+except ImportError:  # Non-Windows platform
+    win32file = None
+    win32api = None
+    winioctlcon = None
+    win32security = None
+    win32com = None
+    winreg = None
+
+logger = get_logger(__name__)
+
+PREALLOCATE_CHUNK = 1024 * 1024
+
+class DeviceDescriptor:
+    """Platform neutral disk description
+
+    Attribute names follow WMI Win32_DiskDrive so card detection logic can
+    handle WMI disk objects and descriptors built by other backends alike.
+    """
+    def __init__(self, device_id, model="", caption="", description="",
+                 pnp_device_id="", media_type="Fixed hard disk media", serial_number=""):
+        self.DeviceID = device_id
+        self.Model = model
+        self.Caption = caption or model
+        self.Description = description or "Disk drive"
+        self.PNPDeviceID = pnp_device_id
+        self.MediaType = media_type
+        self.SerialNumber = serial_number
+
+class ControllerDescriptor:
+    """Platform neutral storage controller description (WMI Win32_SCSIController fields)"""
+    def __init__(self, name, pnp_device_id):
+        self.Name = name
+        self.PNPDeviceID = pnp_device_id
+        self.DeviceID = pnp_device_id
+
+class DeviceTopology:
+    """Indexed snapshot of volumes, disks and storage controllers
+
+    Built by the backend in one enumeration pass, every lookup afterwards is a
+    dict access. Only plain descriptors are kept, no COM objects, so one
+    snapshot can be shared by the GUI and test threads.
+    """
+    def __init__(self, volumes, disks, volume_disks, controllers, disk_controllers=None):
+        """
+        Args:
+            volumes: Mounted volumes that may hold an SD card
+            disks: Device path -> DeviceDescriptor
+            volume_disks: Volume -> device path
+            controllers: ControllerDescriptor list
+            disk_controllers: Device path -> controller PNP device ID
+        """
+        self.volumes = volumes
+        self.disks = disks
+        self.volume_disks = volume_disks
+        self.controllers = controllers
+        self.disk_controllers = disk_controllers or {}
+        self.disk_volumes = {}
+        for volume in sorted(volume_disks):
+            self.disk_volumes.setdefault(volume_disks[volume], volume)
+
+    def get_device_path(self, volume):
+        return self.volume_disks.get(volume)
+
+    def get_disk(self, device_path):
+        return self.disks.get(device_path)
+
+    def get_volume(self, device_path):
+        return self.disk_volumes.get(device_path)
+
+    def get_controller(self, device_path):
+        """Controller PNP device ID of the disk, None if unknown"""
+        return self.disk_controllers.get(device_path)
+
+class StorageBackend:
+    """Storage backend interface
+
+    A backend hides every platform specific call used by card detection and the
+    test suite: device enumeration, unbuffered I/O, capacity and mode control.
+    Volumes are drive letters on Windows and mount points elsewhere.
+
+    Device lookups are answered from a cached DeviceTopology snapshot. While a
+    device watcher runs the snapshot is kept until the next device event,
+    otherwise it expires after TOPOLOGY_MAX_AGE so one detection pass shares it.
+    """
+    name = "base"
+    TOPOLOGY_MAX_AGE = 2.0  # Seconds, only while no device watcher is running
+
+    def __init__(self):
+        self._topology = None
+        self._topology_time = 0.0
+        self._topology_lock = threading.Lock()
+        self._watchers = 0
+        self.monitor = None  # LiveMonitor attached to the engines created while set
+
+    def topology(self):
+        """Return cached DeviceTopology, rebuilt after invalidation or expiry"""
+        with self._topology_lock:
+            now = time.monotonic()
+            if (self._topology is None or
+                    not self._watchers and now - self._topology_time > self.TOPOLOGY_MAX_AGE):
+                start = time.perf_counter()
+                self._topology = self._build_topology()
+                self._topology_time = now
+                logger.debug(f"Device topology rebuilt in {(time.perf_counter() - start) * 1000:.1f}ms: "
+                             f"{len(self._topology.volumes)} volumes, {len(self._topology.disks)} disks")
+            return self._topology
+
+    def invalidate_topology(self):
+        """Drop the snapshot, e.g. after a device event or controller reinitialization"""
+        with self._topology_lock:
+            self._topology = None
+
+    def _watcher_started(self):
+        with self._topology_lock:
+            self._watchers += 1
+            self._topology = None  # Events before the start were missed
+
+    def _watcher_stopped(self):
+        with self._topology_lock:
+            self._watchers -= 1
+
+    def _build_topology(self):
+        """Enumerate volumes, disks and controllers in one pass"""
+        raise NotImplementedError
+
+    def list_volumes(self):
+        """Return all mounted volumes that may hold an SD card"""
+        return list(self.topology().volumes)
+
+    def get_device_path(self, volume):
+        """Return physical device path of volume, None if unknown"""
+        return self.topology().get_device_path(volume)
+
+    def get_disk(self, device_path):
+        """Return disk descriptor (WMI Win32_DiskDrive like object) of device path"""
+        return self.topology().get_disk(device_path)
+
+    def get_volume(self, device_path):
+        """Return first mounted volume of device path"""
+        return self.topology().get_volume(device_path)
+
+    def get_capacity(self, volume):
+        """Return total capacity of volume in bytes"""
+        raise NotImplementedError
+
+    def get_free_space(self, volume):
+        """Return bytes available for new files on volume"""
+        return shutil.disk_usage(volume).free
+
+    def get_disk_size(self, device_path):
+        """Return size of the physical device in bytes"""
+        raise NotImplementedError
+
+    def list_partitions(self, device_path):
+        """Return (offset, size) in bytes of every partition of the physical device"""
+        raise NotImplementedError
+
+    def list_controllers(self):
+        """Return storage controllers (WMI Win32_SCSIController like objects)"""
+        return list(self.topology().controllers)
+
+    def get_controller_id(self, device_path):
+        """Return PNP device ID of the controller the disk is attached to, None if unknown"""
+        return self.topology().get_controller(device_path)
+
+    def set_sd4_mode(self, disable, registry_path, registry_item):
+        """Disable/enable SD4.0 mode and reinitialize the card, returns True on success"""
+        logger.warning(f"SD4.0 mode control not supported by {self.name} backend")
+        return False
+
+    def create_io_engine(self, queue_depth=1, block_size=1024 * 1024, engine="auto"):
+        """Create unbuffered I/O engine suitable for this backend"""
+        engine = create_io_engine(queue_depth=queue_depth, block_size=block_size, engine=engine)
+        engine.monitor = self.monitor
+        return engine
+
+    def preallocate(self, path, size):
+        """Create or extend path to size bytes with all clusters allocated
+
+        Later writes into the file need no cluster allocation or file size
+        update. Uses fallocate where available, zero fill otherwise.
+        """
+        with open(path, 'ab') as f:
+            if hasattr(os, 'posix_fallocate'):
+                try:
+                    os.posix_fallocate(f.fileno(), 0, size)
+                    return
+                except OSError as e:
+                    logger.debug(f"fallocate not supported for {path}, zero filling: {str(e)}")
+        _zero_fill(path, size)
+
+    def create_device_watcher(self):
+        """Return DeviceWatcher reporting card insert/remove events of this backend"""
+        return create_device_watcher(self.name, self)
+
+class WindowsBackend(StorageBackend):
+    """Win32/WMI backend"""
+    name = "windows"
+
+    # DeviceID="..." key of a WMI object path, backslashes and quotes are escaped
+    _OBJECT_PATH_KEY = re.compile(r'DeviceID="((?:[^"\\]|\\.)*)"')
+
+    def __init__(self):
+        if win32file is None:
+            raise RuntimeError("Windows backend requires pywin32")
+        super().__init__()
+        self.devcon_path = self._get_devcon_path()
+
+    def _list_drive_letters(self):
+        bitmask = win32api.GetLogicalDrives()
+        volumes = []
+        for letter in range(26):
+            if bitmask & (1 << letter):
+                drive_letter = f"{chr(65 + letter)}:\\"
+                drive_type = win32file.GetDriveType(drive_letter)
+                logger.debug(f"Checking drive {drive_letter}, type: {drive_type}")
+
+                # NVMe SD Express cards are not Removable, hard to distinguish from NVMe SSD
+                # So here we return all disk drives and analyze in _analyze_drive
+                volumes.append(drive_letter)
+        return volumes
+
+    def _object_key(self, object_path):
+        """DeviceID of a WMI association reference"""
+        match = self._OBJECT_PATH_KEY.search(object_path)
+        return re.sub(r'\\(.)', r'\1', match.group(1)) if match else None
+
+    def _build_topology(self):
+        # One query per class, the association classes link them without per disk walks
+        wmi = win32com.client.GetObject("winmgmts:")
+        disks = {}
+        for disk in wmi.ExecQuery("SELECT DeviceID, Model, Caption, Description, PNPDeviceID, MediaType, "
+                                  "SerialNumber FROM Win32_DiskDrive"):
+            disks[disk.DeviceID] = DeviceDescriptor(disk.DeviceID,
+                                                    model=disk.Model or "",
+                                                    caption=disk.Caption or "",
+                                                    description=disk.Description or "",
+                                                    pnp_device_id=disk.PNPDeviceID or "",
+                                                    media_type=disk.MediaType or "",
+                                                    serial_number=(disk.SerialNumber or "").strip())
+
+        partition_disks = {}
+        for link in wmi.ExecQuery("SELECT * FROM Win32_DiskDriveToDiskPartition"):
+            partition_disks[self._object_key(link.Dependent)] = self._object_key(link.Antecedent)
+
+        volume_disks = {}
+        for link in wmi.ExecQuery("SELECT * FROM Win32_LogicalDiskToPartition"):
+            device_path = partition_disks.get(self._object_key(link.Antecedent))
+            if device_path:
+                volume_disks[self._object_key(link.Dependent).upper() + "\\"] = device_path
+
+        controllers = [ControllerDescriptor(controller.Name or "", controller.PNPDeviceID or "")
+                       for controller in wmi.ExecQuery("SELECT Name, PNPDeviceID FROM Win32_SCSIController")]
+
+        # Win32_SCSIControllerDevice links controllers to the PnP entities of their disks
+        device_controllers = {}
+        for link in wmi.ExecQuery("SELECT * FROM Win32_SCSIControllerDevice"):
+            device = self._object_key(link.Dependent)
+            if device:
+                device_controllers[device.upper()] = self._object_key(link.Antecedent)
+        disk_controllers = {device_path: device_controllers.get(disk.PNPDeviceID.upper())
+                            for device_path, disk in disks.items()}
+
+        return DeviceTopology(self._list_drive_letters(), disks, volume_disks, controllers, disk_controllers)
+
+    def get_device_path(self, volume):
+        return self.topology().get_device_path(volume[0].upper() + ":\\")
+
+    def get_capacity(self, volume):
+        try:
+            # Use GetDiskFreeSpaceEx to get total capacity
+            free_bytes, total_bytes, total_free_bytes = win32file.GetDiskFreeSpaceEx(volume)
+            logger.debug(f"Available space of {volume}: {free_bytes/1024/1024/1024:.1f}GB")
+            return total_bytes
+        except Exception as e:
+            logger.error(f"Error getting drive capacity: {str(e)}", exc_info=True)
+            # Try alternative method, use wmi query to get capacity
+            wmi = win32com.client.GetObject("winmgmts:")
+            for disk in wmi.InstancesOf("Win32_LogicalDisk"):
+                if disk.DeviceID.lower() == volume[0].lower() + ":":
+                    return int(disk.Size)
+            return 0
+
+    def preallocate(self, path, size):
+        # SetFileValidData skips zeroing the clusters, it needs SeManageVolumePrivilege (administrator)
+        # and a file system with a valid data length (NTFS, exFAT), zero fill otherwise.
+        # SetEndOfFile moves EOF without making the new range valid, remember where valid data ends
+        valid_length = 0
+        handle = win32file.CreateFile(path, win32file.GENERIC_WRITE, 0, None, win32file.OPEN_ALWAYS, 0, None)
+        try:
+            valid_length = win32file.GetFileSize(handle)
+            win32file.SetFilePointer(handle, size, win32file.FILE_BEGIN)
+            win32file.SetEndOfFile(handle)
+            if self._enable_manage_volume_privilege() and \
+                    ctypes.windll.kernel32.SetFileValidData(int(handle), ctypes.c_longlong(size)):
+                return
+            logger.debug(f"SetFileValidData failed for {path} ({ctypes.GetLastError()}), zero filling")
+        except Exception as e:
+            logger.debug(f"Extending {path} failed, zero filling: {str(e)}")
+        finally:
+            handle.Close()
+        _zero_fill(path, size, start=valid_length)
+
+    def _enable_manage_volume_privilege(self):
+        if not hasattr(self, '_manage_volume_privilege'):
+            try:
+                token = win32security.OpenProcessToken(win32api.GetCurrentProcess(),
+                                                       win32security.TOKEN_ADJUST_PRIVILEGES |
+                                                       win32security.TOKEN_QUERY)
+                privilege = win32security.LookupPrivilegeValue(None, win32security.SE_MANAGE_VOLUME_NAME)
+                win32security.AdjustTokenPrivileges(token, False, [(privilege, win32security.SE_PRIVILEGE_ENABLED)])
+                # AdjustTokenPrivileges succeeds without assigning privileges the token does not hold
+                self._manage_volume_privilege = win32api.GetLastError() == 0
+            except Exception as e:
+                logger.debug(f"Failed to enable SeManageVolumePrivilege: {str(e)}")
+                self._manage_volume_privilege = False
+        return self._manage_volume_privilege
+
+    def get_disk_size(self, device_path):
+        # Win32_DiskDrive.Size is rounded down to whole cylinders, ask the disk driver
+        handle = win32file.CreateFile(device_path, 0,
+                                      win32file.FILE_SHARE_READ | win32file.FILE_SHARE_WRITE,
+                                      None, win32file.OPEN_EXISTING, 0, None)
+        try:
+            length = win32file.DeviceIoControl(handle, winioctlcon.IOCTL_DISK_GET_LENGTH_INFO, None, 8)
+            return struct.unpack('<q', length)[0]
+        finally:
+            handle.Close()
+
+    def list_partitions(self, device_path):
+        match = re.search(r'PHYSICALDRIVE(\d+)$', device_path, re.IGNORECASE)
+        if not match:
+            raise ValueError(f"Not a physical drive path: {device_path}")
+        wmi = win32com.client.GetObject("winmgmts:")
+        return [(int(partition.StartingOffset), int(partition.Size))
+                for partition in wmi.ExecQuery("SELECT StartingOffset, Size FROM Win32_DiskPartition "
+                                               f"WHERE DiskIndex = {match.group(1)}")]
+
+    def set_sd4_mode(self, disable, registry_path, registry_item):
+        # 打开注册表路径
+        key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE,
+                             registry_path,
+                             0,
+                             winreg.KEY_READ | winreg.KEY_WRITE)
+
+        # 读取当前registry_item值
+        try:
+            value, _ = winreg.QueryValueEx(key, registry_item)
+        except WindowsError:
+            value = 0
+
+        # 根据sd4_disable设置或清除bit 1 (dis_sd40_card)
+        if disable:
+            new_value = value | 0x02  # 设置bit 1为1
+            logger.debug(f"Setting dis_sd40_card bit to 1, value: 0x{value:02x} -> 0x{new_value:02x}")
+        else:
+            new_value = value & ~0x02  # 清除bit 1
+            logger.debug(f"Clearing dis_sd40_card bit to 0, value: 0x{value:02x} -> 0x{new_value:02x}")
+
+        winreg.SetValueEx(key, registry_item, 0, winreg.REG_DWORD, new_value)
+        winreg.CloseKey(key)
+
+        # 遍历SCSI控制器, 获取Bayhub SD Host controller设备实例路径
+        for controller in self.list_controllers():
+            logger.debug(f"Found SCSI controller: Name='{controller.Name}', DeviceID='{controller.DeviceID}'")
+
+            if "BAYHUB" in controller.Name.upper() and "SD" in controller.Name.upper():
+                logger.info(f"Found Bayhub SD controller: {controller.Name}")
+
+                # 使用PNPDeviceID而不是DeviceID, PNPDeviceID即device instance ID
+                # 参考：https://learn.microsoft.com/en-us/windows-hardware/drivers/devtest/devcon-examples
+                device_id = controller.PNPDeviceID
+                logger.debug(f"Using PNPDeviceID: {device_id}")
+
+                # 禁用设备
+                cmd_disable = f'{self.devcon_path} disable "@{device_id}"'  # 添加@符号
+                logger.debug(f"Executing command: {cmd_disable}")
+                result = os.system(cmd_disable)
+                if result != 0:
+                    logger.error(f"Failed to disable device, error code: {result}")
+                    return False
+
+                # 等待1s
+                time.sleep(1)
+
+                # 启用设备
+                cmd_enable = f'{self.devcon_path} enable "@{device_id}"'  # 添加@符号
+                logger.debug(f"Executing command: {cmd_enable}")
+                result = os.system(cmd_enable)
+                if result != 0:
+                    logger.error(f"Failed to enable device, error code: {result}")
+                    return False
+
+                return True
+
+        logger.warning("No Bayhub SD controller found")
+        return False
+
+    def _get_devcon_path(self):
+        """获取devcon.exe的完整路径"""
+        if getattr(sys, 'frozen', False):
+            # 如果是打包后的exe
+            base_path = os.path.dirname(sys.executable)
+        else:
+            # 如果是开发环境
+            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+        devcon_path = os.path.join(base_path, 'devcon.exe')
+        if not os.path.exists(devcon_path):
+            logger.error(f"devcon.exe not found at: {devcon_path}")
+            raise FileNotFoundError(f"devcon.exe not found at: {devcon_path}")
+
+        logger.debug(f"Found devcon.exe at: {devcon_path}")
+        return devcon_path
+
+class PosixBackend(StorageBackend):
+    """Linux backend based on /proc/mounts and sysfs, I/O with O_DIRECT"""
+    name = "posix"
+
+    # Whole disk name and partition suffix of block devices that may be SD cards
+    _BLOCK_DEVICE = re.compile(r'^/dev/(mmcblk\d+|nvme\d+n\d+|sd[a-z]+)(p?\d+)?$')
+
+    def _mounts(self):
+        """Return list of (disk name, mount point) of candidate block devices"""
+        mounts = []
+        try:
+            with open('/proc/mounts', 'r') as f:
+                for line in f:
+                    fields = line.split()
+                    match = self._BLOCK_DEVICE.match(fields[0])
+                    if match:
+                        # /proc/mounts escapes spaces in mount points as \040
+                        mounts.append((match.group(1), fields[1].replace('\\040', ' ')))
+        except OSError as e:
+            logger.error(f"Failed to read mount table: {str(e)}")
+        return mounts
+
+    def _read_sysfs(self, path, default=""):
+        try:
+            with open(path, 'r') as f:
+                return f.read().strip()
+        except OSError:
+            return default
+
+    def _build_topology(self):
+        controllers = self._list_controllers()
+        volumes = []
+        volume_disks = {}
+        disks = {}
+        disk_controllers = {}
+        for disk_name, mount_point in self._mounts():
+            device_path = f"/dev/{disk_name}"
+            volumes.append(mount_point)
+            volume_disks[mount_point] = device_path
+            if device_path not in disks:
+                disks[device_path] = self._describe_disk(device_path)
+                disk_controllers[device_path] = self._disk_controller(disk_name, controllers)
+        disks = {device_path: disk for device_path, disk in disks.items() if disk}
+        return DeviceTopology(volumes, disks, volume_disks, list(controllers.values()), disk_controllers)
+
+    def _disk_controller(self, disk_name, controllers):
+        """PNP device ID of the PCI controller in the sysfs path of the disk"""
+        device_link = os.path.realpath(f"/sys/block/{disk_name}/device")
+        for address in reversed(re.findall(r'[0-9a-f]{4}:[0-9a-f]{2}:[0-9a-f]{2}\.[0-9a-f]', device_link)):
+            if address in controllers:
+                return controllers[address].PNPDeviceID
+        return None
+
+    def _describe_disk(self, device_path):
+        disk_name = os.path.basename(device_path)
+        sys_path = f"/sys/block/{disk_name}"
+        if not os.path.exists(sys_path):
+            return None
+        device_link = os.path.realpath(os.path.join(sys_path, "device"))
+
+        if disk_name.startswith("mmcblk"):
+            card_type = self._read_sysfs(f"{sys_path}/device/type", "SD")
+            name = self._read_sysfs(f"{sys_path}/device/name")
+            return DeviceDescriptor(device_path,
+                                    model=f"{card_type} Card {name}".strip(),
+                                    caption=f"{card_type} Card",
+                                    pnp_device_id=f"MMC\\{card_type}\\{os.path.basename(device_link)}".upper(),
+                                    media_type="Removable Media",
+                                    serial_number=self._read_sysfs(f"{sys_path}/device/serial"))
+
+        model = self._read_sysfs(f"{sys_path}/device/model")
+        removable = self._read_sysfs(f"{sys_path}/removable", "0") == "1"
+        bus = "USB" if "/usb" in device_link else ("NVME" if disk_name.startswith("nvme") else "SCSI")
+        return DeviceDescriptor(device_path,
+                                model=model,
+                                description=f"{bus} Disk Device",
+                                pnp_device_id=f"{bus}\\{model}\\{os.path.basename(device_link)}".upper(),
+                                media_type="Removable Media" if removable else "Fixed hard disk media",
+                                serial_number=self._read_sysfs(f"{sys_path}/device/serial"))
+
+    def get_capacity(self, volume):
+        stat = os.statvfs(volume)
+        return stat.f_blocks * stat.f_frsize
+
+    def get_disk_size(self, device_path):
+        # sysfs sizes are in 512 byte sectors whatever the logical block size
+        return int(self._read_sysfs(f"/sys/block/{os.path.basename(device_path)}/size", "0")) * 512
+
+    def list_partitions(self, device_path):
+        disk_name = os.path.basename(device_path)
+        partitions = []
+        for partition in glob.glob(f"/sys/block/{disk_name}/{disk_name}*"):
+            if os.path.exists(f"{partition}/partition"):
+                partitions.append((int(self._read_sysfs(f"{partition}/start", "0")) * 512,
+                                   int(self._read_sysfs(f"{partition}/size", "0")) * 512))
+        return partitions
+
+    def _list_controllers(self):
+        """PCI address -> ControllerDescriptor of SD host and NVMe controllers"""
+        controllers = {}
+        for device in glob.glob('/sys/bus/pci/devices/*'):
+            pci_class = self._read_sysfs(f"{device}/class")
+            if pci_class.startswith("0x0805"):
+                name = "SD Host Controller"
+            elif pci_class.startswith("0x0108"):
+                name = "NVM Express Controller"
+            else:
+                continue
+            vendor = self._read_sysfs(f"{device}/vendor")[2:].upper()
+            device_id = self._read_sysfs(f"{device}/device")[2:].upper()
+            # 0000:03:00.0 -> bus 3, device 0, function 0
+            domain, bus, slot_func = os.path.basename(device).split(':')
+            slot, func = slot_func.split('.')
+            controllers[os.path.basename(device)] = ControllerDescriptor(
+                name, f"PCI\\VEN_{vendor}&DEV_{device_id}\\{int(bus, 16)}&{func}&{slot.upper()}")
+        return controllers
+
+class SimulatedBackend(StorageBackend):
+    """File backed simulated SD card
+
+    The card is a directory acting as mounted volume plus a sparse image file
+    of the configured capacity acting as raw device. I/O goes to real files and
+    is shaped to the bandwidth and latency of the simulated bus mode.
+    """
+    name = "simulated"
+
+    # Default bandwidth (MB/s, read/write) of each simulated bus mode
+    MODE_PROFILES = {
+        "8.0": (1700, 1200),
+        "7.0": (850, 600),
+        "4.0": (250, 180),
+        "3.0": (90, 60),
+        "2.0": (20, 15),
+    }
+
+    def __init__(self, path="sim_card", capacity=32, mode="8.0", model="",
+                 read_bandwidth=None, write_bandwidth=None, latency_us=100, unpartitioned=256):
+        """
+        Args:
+            path: Directory of simulated volume
+            capacity: Simulated capacity (GB)
+            mode: Simulated bus mode, key of MODE_PROFILES
+            model: Disk model name, empty for a name derived from mode
+            read_bandwidth/write_bandwidth: Bandwidth in MB/s, None for mode default, 0 for unlimited
+            latency_us: Per request latency in microseconds
+            unpartitioned: Space (MB) at the end of the image outside the simulated partition
+        """
+        if mode not in self.MODE_PROFILES:
+            raise ValueError(f"Unknown simulated card mode: {mode}")
+        super().__init__()
+        self.volume = os.path.abspath(path)
+        self.image_path = self.volume + ".img"
+        self.capacity = int(capacity * 1024 * 1024 * 1024)
+        self.base_mode = mode
+        self.mode = mode
+        self.model = model
+        self.read_bandwidth = read_bandwidth
+        self.write_bandwidth = write_bandwidth
+        self.latency = latency_us / 1000000
+        self.unpartitioned = min(int(unpartitioned * 1024 * 1024), self.capacity - 1024 * 1024)
+        self._create_card()
+
+    def _create_card(self):
+        os.makedirs(self.volume, exist_ok=True)
+        if not os.path.exists(self.image_path) or os.path.getsize(self.image_path) != self.capacity:
+            # Sparse file, no disk space is consumed until written
+            with open(self.image_path, 'ab') as f:
+                f.truncate(self.capacity)
+        logger.info(f"Simulated SD {self.mode} card: {self.volume} ({self.capacity/1024/1024/1024:.1f}GB)")
+
+    @property
+    def serial_number(self):
+        """Stable serial of the simulated card, cards of other modes or models are different cards"""
+        return f"SIM{zlib.crc32(f'{self.base_mode}|{self.model}'.encode()):08X}"
+
+    @property
+    def is_express(self):
+        return self.mode in ("7.0", "8.0")
+
+    def bandwidth(self, op):
+        """Bandwidth of current mode in bytes/s, 0 for unlimited"""
+        read_bw, write_bw = self.MODE_PROFILES[self.mode]
+        override = self.read_bandwidth if op == "read" else self.write_bandwidth
+        if override is not None:
+            return override * 1024 * 1024
+        return (read_bw if op == "read" else write_bw) * 1024 * 1024
+
+    def _build_topology(self):
+        if not os.path.isdir(self.volume):
+            return DeviceTopology([], {}, {}, self._controllers())
+        controllers = self._controllers()
+        return DeviceTopology([self.volume], {self.image_path: self._describe_disk()},
+                              {self.volume: self.image_path}, controllers,
+                              {self.image_path: controllers[0].PNPDeviceID})
+
+    def get_device_path(self, volume):
+        return self.topology().get_device_path(os.path.abspath(volume))
+
+    def _describe_disk(self):
+        device_path = self.image_path
+        if self.is_express:
+            return DeviceDescriptor(device_path,
+                                    model=self.model or "SD Express Simulated Card",
+                                    pnp_device_id="SCSI\\DISK&VEN_NVME&PROD_SDEX_SIMULATED\\0",
+                                    media_type="Fixed hard disk media",
+                                    serial_number=self.serial_number)
+        return DeviceDescriptor(device_path,
+                                model=self.model or "SD Card Simulated",
+                                caption="SD Card",
+                                pnp_device_id="SD\\VID_00&OID_0000&PID_SIMULATED\\0",
+                                media_type="Removable Media",
+                                serial_number=self.serial_number)
+
+    def get_capacity(self, volume):
+        return self.capacity
+
+    def get_free_space(self, volume):
+        # Host free space is unrelated to the simulated card, the partition holds the files of the volume
+        used = sum(os.path.getsize(os.path.join(root, name))
+                   for root, _, names in os.walk(volume) for name in names)
+        partition_size = sum(size for _, size in self.list_partitions(self.image_path))
+        return max(0, partition_size - used)
+
+    def get_disk_size(self, device_path):
+        return self.capacity
+
+    def list_partitions(self, device_path):
+        # One partition aligned at 1MB, like a card formatted by the SD Formatter
+        start = 1024 * 1024
+        return [(start, self.capacity - start - self.unpartitioned)]
+
+    def _controllers(self):
+        # Same PCIe location in both modes, like a Bayhub controller handing over to the card's NVMe function
+        if self.is_express:
+            return [ControllerDescriptor("Standard NVM Express Controller",
+                                         "PCI\\VEN_0000&DEV_0000&SUBSYS_00000000&REV_00\\3&11583659&0&E8")]
+        return [ControllerDescriptor("BayHub SD Host Controller (simulated)",
+                                     "PCI\\VEN_1217&DEV_9860&SUBSYS_98601217&REV_00\\3&11583659&0&E8")]
+
+    def set_sd4_mode(self, disable, registry_path, registry_item):
+        if self.is_express or self.base_mode == "2.0":
+            return False
+        self.mode = "3.0" if disable else self.base_mode
+        self.invalidate_topology()
+        logger.info(f"Simulated card reinitialized in SD {self.mode} mode")
+        return True
+
+    def create_io_engine(self, queue_depth=1, block_size=1024 * 1024, engine="auto"):
+        engine = SimulatedIOEngine(self, queue_depth=queue_depth, block_size=block_size)
+        engine.monitor = self.monitor
+        return engine
+
+    def create_device_watcher(self):
+        return SimulatedDeviceWatcher(self)
+
+class SimulatedIOEngine(ThreadPoolIOEngine):
+    """Thread pool engine shaped by simulated card bandwidth and latency
+
+    Requests share one simulated link: each request occupies the link for
+    length/bandwidth seconds and completes latency seconds after leaving it.
+    """
+    name = "simulated"
+
+    def __init__(self, backend, queue_depth=1, block_size=1024 * 1024):
+        super().__init__(queue_depth, block_size)
+        self.backend = backend
+        self._link_lock = threading.Lock()
+        self._link_free_at = 0.0
+
+    def _transfer(self, fd, op, slot, offset, length):
+        start = time.perf_counter()
+        transferred = super()._transfer(fd, op, slot, offset, length)
+        bandwidth = self.backend.bandwidth(op)
+        with self._link_lock:
+            begin = max(start, self._link_free_at)
+            self._link_free_at = begin + (transferred / bandwidth if bandwidth else 0)
+            finish = self._link_free_at + self.backend.latency
+        delay = finish - time.perf_counter()
+        if delay > 0:
+            time.sleep(delay)
+        return transferred
+
+def _zero_fill(path, size, start=None):
+    """Write zeros from start (default the current end) up to size so every cluster is allocated and valid"""
+    zeros = bytes(PREALLOCATE_CHUNK)
+    with open(path, 'r+b') as f:
+        if start is None:
+            # Clusters below the old end are allocated already
+            start = f.seek(0, os.SEEK_END)
+        f.seek(start)
+        for offset in range(start, size, PREALLOCATE_CHUNK):
+            f.write(zeros[:min(PREALLOCATE_CHUNK, size - offset)])
+        f.flush()
+        os.fsync(f.fileno())
+
+def create_backend(cfg=None):
+    """Create storage backend from config, backend.type "auto" selects the native backend"""
+    if cfg is None:
+        from utils.config import config as cfg
+    backend_type = cfg.get('backend.type', 'auto')
+    if backend_type == 'auto':
+        backend_type = 'windows' if win32file is not None else 'posix'
+
+    if backend_type == 'windows':
+        return WindowsBackend()
+    if backend_type == 'posix':
+        return PosixBackend()
+    if backend_type == 'simulated':
+        return SimulatedBackend(
+            path=cfg.get('backend.simulated.path', 'sim_card'),
+            capacity=cfg.get('backend.simulated.capacity', 32),
+            mode=str(cfg.get('backend.simulated.mode', '8.0')),
+            model=cfg.get('backend.simulated.model', ''),
+            read_bandwidth=cfg.get('backend.simulated.read_bandwidth', None),
+            write_bandwidth=cfg.get('backend.simulated.write_bandwidth', None),
+            latency_us=cfg.get('backend.simulated.latency_us', 100),
+            unpartitioned=cfg.get('backend.simulated.unpartitioned', 256)
+        )
+    raise ValueError(f"Unknown storage backend: {backend_type}")
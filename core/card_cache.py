@@ -0,0 +1,101 @@
+import os
+import json
+import time
+import threading
+from utils.logger import get_logger, get_app_dir
+
+logger = get_logger(__name__)
+
+CACHE_VERSION = 1
+
+class CardModeCache:
+    """Persistent mode detection results of known cards
+
+    Entries are keyed by card identity (serial number, model, capacity and the
+    PNP device ID of the controller the card is attached to) and hold the
+    detected mode, the probe read speed and when it was measured. Entries
+    expire after ttl seconds, beyond max_entries the least recently used
+    entries are evicted. The cache is a small JSON file rewritten atomically
+    on every change, a lookup only updates the last use time in memory.
+    """
+    def __init__(self, path, ttl=30 * 24 * 3600, max_entries=64):
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries = self._load()
+
+    @staticmethod
+    def key(card_info):
+        """Identity key of a card, None when the card cannot be identified"""
+        if not card_info.serial and not card_info.name:
+            return None
+        return "|".join(str(part or "") for part in (card_info.serial, card_info.name, card_info.capacity,
+                                                      card_info.controller_id))
+
+    def get(self, key):
+        """Return cached entry dict (mode, read_speed, confidence, time) or None if unknown or expired"""
+        if key is None:
+            return None
+        with self._lock:
+            entry = self._entries.get(key)
+            if not entry:
+                return None
+            if self.ttl and time.time() - entry['time'] > self.ttl:
+                logger.debug(f"Card mode cache entry expired: {key}")
+                del self._entries[key]
+                self._save()
+                return None
+            # Lookups run on every device event, the LRU time is saved with the next change
+            entry['used'] = time.time()
+            return dict(entry)
+
+    def put(self, key, mode, read_speed, confidence=None):
+        if key is None:
+            return
+        now = time.time()
+        with self._lock:
+            self._entries[key] = {'mode': mode, 'read_speed': round(read_speed, 2), 'confidence': confidence,
+                                  'time': now, 'used': now}
+            if len(self._entries) > self.max_entries:
+                for old_key in sorted(self._entries, key=lambda k: self._entries[k]['used'])[:-self.max_entries]:
+                    del self._entries[old_key]
+            self._save()
+
+    def remove(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self._save()
+
+    def _load(self):
+        if not os.path.exists(self.path):
+            return {}
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if data.get('version') != CACHE_VERSION:
+                logger.info(f"Ignoring card mode cache of version {data.get('version')}")
+                return {}
+            return data.get('cards', {})
+        except Exception as e:
+            logger.warning(f"Failed to load card mode cache {self.path}: {str(e)}")
+            return {}
+
+    def _save(self):
+        # Written to a temporary file first, so a crash never leaves a truncated cache
+        temp_path = self.path + ".tmp"
+        try:
+            with open(temp_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': CACHE_VERSION, 'cards': self._entries}, f, indent=2)
+            os.replace(temp_path, self.path)
+        except Exception as e:
+            logger.warning(f"Failed to save card mode cache {self.path}: {str(e)}")
+
+def create_card_cache(cfg):
+    """Create card mode cache of the card.mode_cache configuration, None when disabled"""
+    if not cfg or not cfg.get('card.mode_cache.enabled', True):
+        return None
+    path = cfg.get('card.mode_cache.path', '') or os.path.join(get_app_dir(), 'card_mode_cache.json')
+    return CardModeCache(path,
+                         ttl=cfg.get('card.mode_cache.ttl_days', 30) * 24 * 3600,
+                         max_entries=cfg.get('card.mode_cache.max_entries', 64))
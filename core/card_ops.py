@@ -1,40 +1,57 @@
 import time
-import win32file
-import win32api
-import win32com.client
-import winerror
 import os
-import sys
-import winreg
-import win32con
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from .controller import ControllerType
 from core.controller import SDController
+from core.backend import create_backend
+from core.card_cache import create_card_cache
+from core.mode_probe import AdaptiveSpeedProbe
 from utils.logger import get_logger
 
+try:
+    import pythoncom
+except ImportError:  # Non-Windows platform, no COM apartment needed
+    pythoncom = None
+
 logger = get_logger(__name__)
 
+MODE_PROBING = "probing"  # Mode of a provisional CardInfo while the mode probe runs
+
 class CardInfo:
     def __init__(self):
-        self.mode = None  # "8.0"/"7.0"/"4.0"/"3.0"
+        self.mode = None  # "8.0"/"7.0"/"4.0"/"3.0", MODE_PROBING while the mode probe runs
         self.controller_type = None
         self.device_path = None
         self.drive_letter = None
         self.capacity = 0  # Default value is 0
         self.name = None   # Add card name property
+        self.serial = None
+        self.controller_id = None  # PNP device ID of the controller the card is attached to
+        self.read_speed = 0.0      # Read speed (MB/s) measured by the mode probe
+        self.mode_cached = False   # Mode taken from the card mode cache instead of a probe
+        self.mode_confidence = 0.0 # Probability that the probe speed is on the side of the thresholds it was measured
  
 class CardOperations:
-    def __init__(self, controller=None, config=None):
+    def __init__(self, controller=None, config=None, backend=None):
         self.controller = controller
         self.timeout = 30
         self._last_card_info = None
         self.config = config
+        self.backend = backend or create_backend(config)
+        self.mode_cache = create_card_cache(config)
+        # Mode probes run in the background, one running probe per device path
+        self._probe_executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="mode_probe",
+                                                  initializer=_init_probe_thread)
+        self._probes = {}
+        self._probe_lock = threading.Lock()
         self._load_card_config()
-        self.devcon_path = self._get_devcon_path() # 获取devcon路径
 
     def _load_card_config(self):
         """加载所有卡相关配置"""
         self.card_config = {
             'sd_express_model': self.config.get('card.sd_express_model', ''),
+            'target': self.config.get('card.target', '') or '',
             'sd4_disable': self.config.get('card.sd4_disable', False),
             'registry_path': self.config.get('card.registry_path', ''),
             'registry_item': self.config.get('card.registry_item', ''),
@@ -42,14 +59,25 @@ class CardOperations:
                 'sd_express_8': self.config.get('card.speed_threshold.sd_express_8', 800),
                 'sd_4': self.config.get('card.speed_threshold.sd_4', 120),
                 'sd_3': self.config.get('card.speed_threshold.sd_3', 30)
+            },
+            'probe': {
+                'level': self.config.get('card.probe.confidence', 0.95),
+                'min_samples': self.config.get('card.probe.min_samples', 3),
+                'max_samples': self.config.get('card.probe.max_samples', 20),
+                'time_budget': self.config.get('card.probe.time_budget', 3.0)
             }
         }
         logger.debug(f"Loaded card configuration: {self.card_config}")
 
-    def check_card(self, quick_mode=True):
+    def check_card(self, quick_mode=True, reprobe=False, probe_callback=None):
         """Unified card detection entry
         Args:
             quick_mode: True for quick detection, False for full detection
+            reprobe: Measure the card mode again instead of using the card mode cache
+            probe_callback: Optional probe_callback(card_info). When set, a needed mode probe runs in the
+                background: a provisional CardInfo with mode MODE_PROBING is returned at once and the
+                detailed CardInfo is passed to the callback, from the probe thread, when the probe finished.
+                Without it check_card blocks until the mode is known.
         Returns:
             CardInfo: First valid SD card info found, returns None if not found
         """
@@ -67,18 +95,33 @@ class CardOperations:
                     # Update card info in controller
                     self.controller.update_card_info(card_info)
                     # Check if full check is needed
-                    if not quick_mode or self._is_card_changed(card_info):
-                        detailed_card_info = self._analyze_drive(drive_letter, full_check=True)
+                    # Blocking callers wait for a probe started by an earlier non-blocking check
+                    probing = (not probe_callback and self._last_card_info is not None and
+                               self._last_card_info.mode == MODE_PROBING)
+                    if not quick_mode or reprobe or probing or self._is_card_changed(card_info):
+                        probe = self._start_probe(drive_letter, card_info.device_path, reprobe)
+                        if probe_callback:
+                            card_info.mode = MODE_PROBING
+                            self._set_last_card_info(card_info)
+                            probe.add_done_callback(
+                                lambda future, provisional=card_info: self._probe_done(provisional, future,
+                                                                                       probe_callback))
+                            return card_info
+                        detailed_card_info = probe.result()
                         if detailed_card_info:
-                            self._last_card_info = detailed_card_info
+                            self._set_last_card_info(detailed_card_info)
                             return detailed_card_info
                     else:
                         # Use last performance info
-                        if self._last_card_info and self._last_card_info.device_path == card_info.device_path:
-                            card_info.mode = self._last_card_info.mode
-                            card_info.capacity = self._last_card_info.capacity
+                        last = self._last_card_info
+                        if last and last.device_path == card_info.device_path:
+                            card_info.mode = last.mode
+                            card_info.capacity = last.capacity
+                            card_info.read_speed = last.read_speed
+                            card_info.mode_cached = last.mode_cached
+                            card_info.mode_confidence = last.mode_confidence
                 
-                    self._last_card_info = card_info
+                    self._set_last_card_info(card_info)
                     return card_info
 
             # No valid SD card found
@@ -86,19 +129,51 @@ class CardOperations:
                 logger.info("SD card removed")
                 self.controller.update_card_info(None)
 
-            self._last_card_info = None
+            self._set_last_card_info(None)
             return None
 
         except Exception as e:
             logger.error(f"Card detection failed: {str(e)}", exc_info=True)
-            self._last_card_info = None
+            self._set_last_card_info(None)
             return None
     
-    def _analyze_drive(self, drive_letter, full_check=False):
+    def _set_last_card_info(self, card_info):
+        # Under the probe lock, a finishing background probe compares and replaces it atomically
+        with self._probe_lock:
+            self._last_card_info = card_info
+
+    def _start_probe(self, drive_letter, device_path, reprobe=False):
+        """Return Future of the full drive analysis, joining the running probe of the device if any"""
+        with self._probe_lock:
+            probe = self._probes.get(device_path)
+            if probe and not probe.done():
+                logger.debug(f"Mode probe of {device_path} already running")
+                return probe
+            probe = self._probe_executor.submit(self._analyze_drive, drive_letter, True, reprobe)
+            self._probes[device_path] = probe
+            return probe
+
+    def _probe_done(self, provisional, future, callback):
+        """Replace the provisional card info with the probe result, if the card is still the current one"""
+        detailed_card_info = future.result()
+        with self._probe_lock:
+            # A blocking check waiting for the same probe may have taken its result already
+            current = self._last_card_info
+            if current is not provisional and (detailed_card_info is None or current is not detailed_card_info):
+                logger.debug(f"Card changed during mode probe of {provisional.device_path}, result dropped")
+                return
+            if not detailed_card_info:
+                provisional.mode = "unknown"
+                detailed_card_info = provisional
+            self._last_card_info = detailed_card_info
+        callback(detailed_card_info)
+
+    def _analyze_drive(self, drive_letter, full_check=False, reprobe=False):
         """Analyze drive and return card info
         Args:
             drive_letter: Drive letter
             full_check: Whether to perform full check (including performance test)
+            reprobe: Skip the card mode cache and run the performance test
         """
         try:
             # Get device path
@@ -113,7 +188,7 @@ class CardOperations:
 
             # If full check is needed, add detailed info
             if full_check:
-                self._enhance_card_info(card_info)
+                self._enhance_card_info(card_info, reprobe)
                 
                 # 检查是否需要禁用SD4.0模式
                 if (self.card_config['sd4_disable'] is not None and  # 不为空时才处理
@@ -123,7 +198,8 @@ class CardOperations:
                         if self._disable_enable_sd4_mode():
                             # 重新检测卡信息
                             time.sleep(1)  # 等待重新初始化完成
-                            return self._analyze_drive(drive_letter, full_check=True)
+                            # Cached mode is the one before reinitialization
+                            return self._analyze_drive(drive_letter, full_check=True, reprobe=True)
             else:
                 # Only get capacity info, no performance test
                 card_info.capacity = self._get_drive_capacity(drive_letter)
@@ -192,60 +268,62 @@ class CardOperations:
     def _detect_device_type(self, device_path, drive_letter):
         """Detect device type (NVMe/SD/USB) and return basic card info"""
         try:
-            wmi = win32com.client.GetObject("winmgmts:")
-            for disk in wmi.InstancesOf("Win32_DiskDrive"):
-                if disk.DeviceID == device_path:
-                    # Create basic card info object
-                    card_info = CardInfo()
-                    card_info.name = disk.Model
-                    card_info.drive_letter = drive_letter
-                    card_info.device_path = device_path
-
-                    logger.debug(f"Disk media type: {disk.MediaType}")
-
-                    # Check if it's a traditional SD card (excluding USB devices)
-                    if "Removable Media" in disk.MediaType:
-                        if ("USB" in disk.Model or 
-                            "USB" in disk.Caption or 
-                            "USB" in disk.Description):
-                            return None
-
-                        if ("SD" in disk.Model or 
-                            "SD" in disk.Caption or 
-                            "MMC" in disk.Model or 
-                            "MMC" in disk.Caption or
-                            "Card" in disk.Model or
-                            "Card" in disk.Caption):
-                            card_info.controller_type = ControllerType.SD_HOST
-                            return card_info
+            disk = self.backend.get_disk(device_path)
+            if not disk:
+                return None
+
+            # Create basic card info object
+            card_info = CardInfo()
+            card_info.name = disk.Model
+            card_info.drive_letter = drive_letter
+            card_info.device_path = device_path
+            card_info.serial = (disk.SerialNumber or "").strip()
+
+            logger.debug(f"Disk media type: {disk.MediaType}")
+
+            # Check if it's a traditional SD card (excluding USB devices)
+            if "Removable Media" in disk.MediaType:
+                if ("USB" in disk.Model or 
+                    "USB" in disk.Caption or 
+                    "USB" in disk.Description):
+                    return None
 
-                    # Check SD Express card (NVMe mode) or NVMe SSD.
-                    # SD express card is not removable media, same as NVMe SSD.
-                    if any(keyword in disk.Model.upper() or 
-                           keyword in disk.Caption.upper() or
-                           keyword in disk.PNPDeviceID.upper() 
-                           for keyword in ["NVM", "NVME", "SD", "SDEX"]):
-                        
-                        # If specified SD Express model, directly match
-                        if self.card_config['sd_express_model']:
-                            if self.card_config['sd_express_model'].upper() in disk.Model.upper():
-                                card_info.controller_type = ControllerType.NVME
-                                card_info.is_sd_express = True
-                                logger.info(f"Matched SD Express model: {disk.Model}")
-                                return card_info
-                            else:
-                                # not match specified model, consider it as NVMe SSD
-                                return None
-                        
-                        # If not specified SD Express model, use automatic logic to determine
-                        else:
-                            # check detailed info
-                            if self._is_sd_express(disk):
-                                card_info.controller_type = ControllerType.NVME
-                                card_info.is_sd_express = True
-                                return card_info
-                            else:
-                                return None
+                if ("SD" in disk.Model or 
+                    "SD" in disk.Caption or 
+                    "MMC" in disk.Model or 
+                    "MMC" in disk.Caption or
+                    "Card" in disk.Model or
+                    "Card" in disk.Caption):
+                    card_info.controller_type = ControllerType.SD_HOST
+                    return card_info
+
+            # Check SD Express card (NVMe mode) or NVMe SSD.
+            # SD express card is not removable media, same as NVMe SSD.
+            if any(keyword in disk.Model.upper() or 
+                   keyword in disk.Caption.upper() or
+                   keyword in disk.PNPDeviceID.upper() 
+                   for keyword in ["NVM", "NVME", "SD", "SDEX"]):
+                
+                # If specified SD Express model, directly match
+                if self.card_config['sd_express_model']:
+                    if self.card_config['sd_express_model'].upper() in disk.Model.upper():
+                        card_info.controller_type = ControllerType.NVME
+                        card_info.is_sd_express = True
+                        logger.info(f"Matched SD Express model: {disk.Model}")
+                        return card_info
+                    else:
+                        # not match specified model, consider it as NVMe SSD
+                        return None
+                
+                # If not specified SD Express model, use automatic logic to determine
+                else:
+                    # check detailed info
+                    if self._is_sd_express(disk):
+                        card_info.controller_type = ControllerType.NVME
+                        card_info.is_sd_express = True
+                        return card_info
+                    else:
+                        return None
 
             return None
 
@@ -253,17 +331,39 @@ class CardOperations:
             logger.error(f"Device type detection failed: {str(e)}", exc_info=True)
             return None
     
-    def _enhance_card_info(self, card_info):
-        """Enhance card info (add mode and capacity info)"""
+    def _enhance_card_info(self, card_info, reprobe=False):
+        """Enhance card info (add mode and capacity info)
+        Args:
+            reprobe: Measure the mode even if the card is in the card mode cache
+        """
         try:
+            # Get capacity info, part of the card identity
+            card_info.capacity = self._get_drive_capacity(card_info.drive_letter)
+            card_info.controller_id = self.backend.get_controller_id(card_info.device_path)
+
+            cache_key = self.mode_cache.key(card_info) if self.mode_cache else None
+            if cache_key and not reprobe:
+                entry = self.mode_cache.get(cache_key)
+                if entry:
+                    card_info.mode = entry['mode']
+                    card_info.read_speed = entry['read_speed']
+                    card_info.mode_confidence = entry.get('confidence') or 0.0
+                    card_info.mode_cached = True
+                    logger.info(f"Known card {card_info.name}, cached mode {card_info.mode} "
+                                f"({card_info.read_speed:.2f}MB/s, confidence {card_info.mode_confidence:.1%})")
+                    return
+
             # Determine mode based on controller type
             if card_info.controller_type == ControllerType.NVME:
-                card_info.mode = self._determine_express_mode(card_info.device_path)
+                card_info.mode, card_info.read_speed, card_info.mode_confidence = \
+                    self._determine_express_mode(card_info.device_path)
             else:
-                card_info.mode = self._determine_sd_mode(card_info.device_path)
+                card_info.mode, card_info.read_speed, card_info.mode_confidence = \
+                    self._determine_sd_mode(card_info.device_path)
 
-            # Get capacity info
-            card_info.capacity = self._get_drive_capacity(card_info.drive_letter)
+            # Failed probes are not cached, the next detection measures again
+            if cache_key and card_info.mode in ("8.0", "7.0", "4.0", "3.0", "2.0"):
+                self.mode_cache.put(cache_key, card_info.mode, card_info.read_speed, card_info.mode_confidence)
 
         except Exception as e:
             logger.error(f"Failed to enhance card info: {str(e)}", exc_info=True)
@@ -271,14 +371,10 @@ class CardOperations:
     def _get_device_path(self, drive_letter):
         """Get device path of the drive"""
         try:
-            # Use WMI to query device path
-            wmi = win32com.client.GetObject("winmgmts:")
-            for disk in wmi.InstancesOf("Win32_DiskDrive"):
-                for partition in disk.Associators_("Win32_DiskDriveToDiskPartition"):
-                    for logical_disk in partition.Associators_("Win32_LogicalDiskToPartition"):
-                        if logical_disk.DeviceID.lower() == drive_letter[0].lower() + ":":
-                            logger.debug(f"Found device path: {disk.DeviceID} for drive: {drive_letter}")
-                            return disk.DeviceID
+            device_path = self.backend.get_device_path(drive_letter)
+            if device_path:
+                logger.debug(f"Found device path: {device_path} for drive: {drive_letter}")
+                return device_path
             
             logger.warning(f"Device path not found for drive {drive_letter}")
             return None
@@ -373,381 +469,221 @@ class CardOperations:
 
     # Use asnyc I/O for NVMe disk to get better performance.    
     def _determine_express_mode(self, device_path):
-        """Determine Express mode (7.0 or 8.0) based on read speed"""
+        """Determine Express mode (7.0 or 8.0) based on read speed
+        Returns:
+            tuple: (mode, measured read speed in MB/s, classification confidence)
+        """
         try:
-            # Get drive letter
-            drive_letter = None
-            wmi = win32com.client.GetObject("winmgmts:")
-            for disk in wmi.InstancesOf("Win32_DiskDrive"):
-                if disk.DeviceID == device_path:
-                    for partition in disk.Associators_("Win32_DiskDriveToDiskPartition"):
-                        for logical_disk in partition.Associators_("Win32_LogicalDiskToPartition"):
-                            drive_letter = logical_disk.DeviceID + "\\"
-                            break
-                    break
-            
-            if not drive_letter:
-                logger.error("Unable to get drive letter")
-                return "error drive"  # Conservative return
-
-            # Create test file
-            test_file = os.path.join(drive_letter, "express_mode_test.bin")
-            test_size = 16 * 1024 * 1024  # 16MB is good for nvme disk performance check
-            block_size = 1024 * 1024  # 1MB block size
-            
-            try:
-                # First create and write test file
-                with open(test_file, 'wb') as f:
-                    f.write(os.urandom(test_size))
-                
-                # Wait for data to be written
-                time.sleep(1)
-                
-                # Perform read test with async IO
-                max_read_speed = 0
-                for _ in range(2):  # Test 2 times and take maximum
-                    handle = win32file.CreateFile(
-                        test_file,
-                        win32file.GENERIC_READ,
-                        0,  # Not shared
-                        None,
-                        win32file.OPEN_EXISTING,
-                        win32file.FILE_FLAG_NO_BUFFERING | 
-                        win32file.FILE_FLAG_SEQUENTIAL_SCAN |
-                        win32file.FILE_FLAG_OVERLAPPED,  # Enable async I/O
-                        None
-                    )
-                    
-                    try:
-                        # Create OVERLAPPED structure
-                        overlapped = win32file.OVERLAPPED()
-                        overlapped.Offset = 0
-                        overlapped.OffsetHigh = 0
-                        
-                        buffer = win32file.AllocateReadBuffer(block_size)
-                        bytes_read = 0
-                        start_time = time.perf_counter()
-                        
-                        while bytes_read < test_size:
-                            # Use async read
-                            result, _ = win32file.ReadFile(handle, buffer, overlapped)
-                            if result == winerror.ERROR_IO_PENDING:
-                                # Wait for async operation to complete
-                                win32file.GetOverlappedResult(handle, overlapped, True)
-                            
-                            overlapped.Offset += block_size  # Update next read position
-                            bytes_read += block_size
-                            
-                        read_time = time.perf_counter() - start_time
-                        read_speed = test_size / read_time / (1024 * 1024)  # MB/s
-                        max_read_speed = max(max_read_speed, read_speed)
-                        
-                    finally:
-                        handle.Close()
-                        time.sleep(0.1)  # Wait between tests
-                
-                logger.debug(f"Express mode test result: Read={max_read_speed:.1f}MB/s")
-                
-                # Determine mode based on read speed
-                # SD Express 8.0 (PCIe Gen4) theoretical speed up to 2000MB/s
-                # SD Express 7.0 (PCIe Gen3) theoretical speed up to 1000MB/s
-                thresholds = self.card_config['speed_threshold']
-                #if max_read_speed >= 800:  # 8.0 mode minimum speed threshold
-                if max_read_speed >= thresholds['sd_express_8']:
-                    logger.info(f"Based on speed({max_read_speed:.2f}MB/s) determined as SD Express 8.0 card")
-                    return "8.0"
-                else:
-                    logger.info(f"Based on speed({max_read_speed:.2f}MB/s) determined as SD Express 7.0 card")
-                    return "7.0"
-                    
-            finally:
-                # Clean up test file
-                if os.path.exists(test_file):
-                    try:
-                        os.remove(test_file)
-                    except:
-                        pass
-                        
+            # SD Express 8.0 (PCIe Gen4) theoretical speed up to 2000MB/s
+            # SD Express 7.0 (PCIe Gen3) theoretical speed up to 1000MB/s
+            thresholds = self.card_config['speed_threshold']
+            # 16MB is good for nvme disk performance check
+            estimate = self._probe_read_speed(device_path, "express_mode_test.bin", 16 * 1024 * 1024,
+                                              [thresholds['sd_express_8']])
+            if not estimate:
+                return "error drive", 0.0, 0.0  # Conservative return
+
+            speed = estimate.speed
+            confidence = estimate.confidence([thresholds['sd_express_8']])
+            logger.debug(f"Express mode test result: Read={estimate.summary()}")
+
+            # Determine mode based on read speed
+            if speed >= thresholds['sd_express_8']:
+                logger.info(f"Based on speed({speed:.2f}MB/s) determined as SD Express 8.0 card "
+                            f"(confidence {confidence:.1%})")
+                return "8.0", speed, confidence
+            else:
+                logger.info(f"Based on speed({speed:.2f}MB/s) determined as SD Express 7.0 card "
+                            f"(confidence {confidence:.1%})")
+                return "7.0", speed, confidence
+
         except Exception as e:
             logger.error(f"SD Express mode detection failed: {str(e)}", exc_info=True)
-            return "unknown"  # Return conservative estimate on error
+            return "unknown", 0.0, 0.0  # Return conservative estimate on error
         
     def _determine_sd_mode(self, device_path):
-        """Determine SD card mode through performance test (4.0/3.0/2.0)"""
+        """Determine SD card mode through performance test (4.0/3.0/2.0)
+        Returns:
+            tuple: (mode, measured read speed in MB/s, classification confidence)
+        """
         try:
-            perf_info = self._get_disk_performance(device_path)
-            if not perf_info:
+            thresholds = self.card_config['speed_threshold']
+            mode_thresholds = [thresholds['sd_4'], thresholds['sd_3']]
+            estimate = self._get_disk_performance(device_path, mode_thresholds)
+            if not estimate:
                 logger.error("Unable to get performance info")
-                return "unknown"
+                return "unknown", 0.0, 0.0
             
-            max_speed = perf_info['read_speed']
-            logger.debug(f"Measured max speed: {max_speed:.2f}MB/s")
+            speed = estimate.speed
+            confidence = estimate.confidence(mode_thresholds)
+            logger.debug(f"Measured speed: {estimate.summary()}")
             
-            thresholds = self.card_config['speed_threshold']
             # UHS-II speed range: FD156 is 156MB/s, HD312 is 312MB/s
-            #if max_speed >= 120:  # UHS-II minimum speed threshold
-            if max_speed >= thresholds['sd_4']:
-                logger.info(f"Based on speed({max_speed:.2f}MB/s) determined as SD 4.0 (UHS-II) card")
-                return "4.0"
+            if speed >= thresholds['sd_4']:
+                logger.info(f"Based on speed({speed:.2f}MB/s) determined as SD 4.0 (UHS-II) card "
+                            f"(confidence {confidence:.1%})")
+                return "4.0", speed, confidence
             # UHS-I speed range: SDR50 is 50MB/s, SDR104 is 104MB/s
-            #elif max_speed >= 30:  # UHS-I minimum speed threshold
-            elif max_speed >= thresholds['sd_3']:
-                logger.info(f"Based on speed({max_speed:.2f}MB/s) determined as SD 3.0 (UHS-I) card")
-                return "3.0"
+            elif speed >= thresholds['sd_3']:
+                logger.info(f"Based on speed({speed:.2f}MB/s) determined as SD 3.0 (UHS-I) card "
+                            f"(confidence {confidence:.1%})")
+                return "3.0", speed, confidence
             else:
-                logger.info(f"Based on speed({max_speed:.2f}MB/s) determined as SD 2.0 card")
-                return "2.0"
+                logger.info(f"Based on speed({speed:.2f}MB/s) determined as SD 2.0 card "
+                            f"(confidence {confidence:.1%})")
+                return "2.0", speed, confidence
                 
         except Exception as e:
             logger.error(f"SD card mode detection failed: {str(e)}", exc_info=True)
-            return "unknown"  # Error
+            return "unknown", 0.0, 0.0  # Error
         
-    # Use sync I/O for SD mode performance is OK.
-    def _get_disk_performance(self, device_path):
-        """Get disk performance characteristics"""
+    def _get_disk_performance(self, device_path, thresholds):
+        """Get disk read speed estimate, None on failure"""
         try:
-            # Get drive letter
-            drive_letter = None
-            wmi = win32com.client.GetObject("winmgmts:")
-            for disk in wmi.InstancesOf("Win32_DiskDrive"):
-                if disk.DeviceID == device_path:
-                    for partition in disk.Associators_("Win32_DiskDriveToDiskPartition"):
-                        for logical_disk in partition.Associators_("Win32_LogicalDiskToPartition"):
-                            drive_letter = logical_disk.DeviceID + "\\"
-                            break
-                    break
-            
-            if not drive_letter:
-                logger.error("Unable to get drive letter")
-                return None
-
             # Wait for disk activity to finish
             time.sleep(1)
-            
-            # Create test file
-            test_file = os.path.join(drive_letter, "speed_test.bin")
-            test_size = 4 * 1024 * 1024  # 4MB is good for sd card performance check
-            block_size = 1024 * 1024  # 1MB
-            
-            try:
-                # First create and write test file
-                with open(test_file, 'wb') as f:
-                    f.write(os.urandom(test_size))
-                
-                # Perform read test
-                max_read_speed = 0
-                for _ in range(2):  # Test 2 times and take the maximum
-                    handle = win32file.CreateFile(
-                        test_file,
-                        win32file.GENERIC_READ,
-                        win32file.FILE_SHARE_READ,  # Allow shared read
-                        None,
-                        win32file.OPEN_EXISTING,
-                        win32file.FILE_FLAG_NO_BUFFERING | 
-                        win32file.FILE_FLAG_SEQUENTIAL_SCAN,
-                        None
-                    )
-                    
-                    # Use high-precision timer to avoid small data timing being considered as 0
-                    start_time = time.perf_counter()  
-                    bytes_read = 0
-                    
-                    while bytes_read < test_size:
-                        win32file.ReadFile(handle, block_size)
-                        bytes_read += block_size
-                    
-                    read_time = time.perf_counter() - start_time
-                    read_speed = test_size / read_time / (1024 * 1024)  # MB/s
-                    max_read_speed = max(max_read_speed, read_speed)
-                    handle.Close()
-                    
-                    time.sleep(0.1)  # Wait between tests
-                
-                logger.debug(f"Performance test result: Read={max_read_speed:.1f}MB/s")
-                return {'read_speed': max_read_speed}
-                
-            finally:
-                # Clean up test file
-                if os.path.exists(test_file):
-                    try:
-                        os.remove(test_file)
-                    except:
-                        pass
+
+            # 4MB is good for sd card performance check
+            return self._probe_read_speed(device_path, "speed_test.bin", 4 * 1024 * 1024, thresholds)
         
         except Exception as e:
             logger.error(f"Failed to get disk performance characteristics: {str(e)}", exc_info=True)
             return None
+
+    def _probe_read_speed(self, device_path, file_name, test_size, thresholds):
+        """Write a probe file and sample its read speed until it is clear of the thresholds
+        Returns:
+            SpeedEstimate: Mean read speed with confidence interval, None if the volume is unknown
+        """
+        # Get drive letter
+        drive_letter = self.backend.get_volume(device_path)
+        if not drive_letter:
+            logger.error("Unable to get drive letter")
+            return None
+
+        test_file = os.path.join(drive_letter, file_name)
+        block_size = 1024 * 1024  # 1MB block size
+        try:
+            # First create and write test file
+            with open(test_file, 'wb') as f:
+                f.write(os.urandom(test_size))
+
+            # Wait for data to be written
+            time.sleep(1)
+
+            engine = self.backend.create_io_engine(queue_depth=1, block_size=block_size)
+            try:
+                probe = AdaptiveSpeedProbe(engine, test_file, test_size, thresholds,
+                                           **self.card_config['probe'])
+                return probe.run()
+            finally:
+                engine.close()
+
+        finally:
+            # Clean up test file
+            if os.path.exists(test_file):
+                try:
+                    os.remove(test_file)
+                except:
+                    pass
     
     def _get_drive_capacity(self, drive_letter):
         """Get drive capacity"""
         try:
-            # Use GetDiskFreeSpaceEx to get total capacity
-            free_bytes, total_bytes, total_free_bytes = win32file.GetDiskFreeSpaceEx(drive_letter)
-            logger.debug(f"Drive {drive_letter} capacity info:")
-            logger.debug(f"Total capacity: {total_bytes/1024/1024/1024:.1f}GB")
-            logger.debug(f"Available space: {free_bytes/1024/1024/1024:.1f}GB")
+            total_bytes = self.backend.get_capacity(drive_letter)
+            logger.debug(f"Drive {drive_letter} total capacity: {total_bytes/1024/1024/1024:.1f}GB")
             return total_bytes
         except Exception as e:
             logger.error(f"Error getting drive capacity: {str(e)}", exc_info=True)
-            
-            # Try alternative method
-            try:
-                # Use wmi query to get capacity
-                wmi = win32com.client.GetObject("winmgmts:")
-                for disk in wmi.InstancesOf("Win32_LogicalDisk"):
-                    if disk.DeviceID.lower() == drive_letter[0].lower() + ":":
-                        size = int(disk.Size)
-                        logger.debug(f"Got drive {drive_letter} capacity through WMI: {size/1024/1024/1024:.1f}GB")
-                        return size
-            except Exception as e2:
-                logger.error(f"WMI drive capacity query failed: {str(e2)}", exc_info=True)
-            
             return 0
     
     def _get_drives(self):
         """Get all possible SD card drives (including removable drives and NVMe drives)"""
         try:
-            drives = []
-            bitmask = win32api.GetLogicalDrives()
-            
-            # Use WMI to query all disk information
-            wmi = win32com.client.GetObject("winmgmts:")
-            physical_disks = {disk.DeviceID: disk for disk in wmi.InstancesOf("Win32_DiskDrive")}
-            
-            for letter in range(26):
-                if bitmask & (1 << letter):
-                    drive_letter = f"{chr(65 + letter)}:\\"
-                    drive_type = win32file.GetDriveType(drive_letter)
-                    logger.debug(f"Checking drive {drive_letter}, type: {drive_type}")
-                    
-                    # NVMe SD Express cards are not Removable, hard to distinguish from NVMe SSD
-                    # So here we return all disk drives and analyze in _analyze_drive
-                    logger.debug(f"Found disk drive: {drive_letter} ")
-                    drives.append(drive_letter)
-            
+            # NVMe SD Express cards are not Removable, hard to distinguish from NVMe SSD
+            # So here we return all disk drives and analyze in _analyze_drive
+            drives = self.backend.list_volumes()
             logger.debug(f"Scan complete, found drives: {drives}")
+            if self.card_config['target']:
+                drives = [drive for drive in drives if self._is_target(drive)]
             return drives
             
         except Exception as e:
             logger.error(f"Error getting drives: {str(e)}", exc_info=True)
             return []
     
-    def wait_for_card(self, timeout=300):
+    def _is_target(self, drive):
+        """Check drive against card.target: its volume, device path or serial number"""
+        target = _normalize_target(self.card_config['target'])
+        if _normalize_target(drive) == target:
+            return True
+        device_path = self.backend.get_device_path(drive)
+        if not device_path:
+            return False
+        if _normalize_target(device_path) == target:
+            return True
+        disk = self.backend.get_disk(device_path)
+        return bool(disk and disk.SerialNumber and _normalize_target(disk.SerialNumber) == target)
+
+    def wait_for_card(self, timeout=300, reprobe=False):
         """Wait for SD card insertion
         Args:
             timeout: Timeout in seconds
+            reprobe: Measure the card mode again instead of using the card mode cache
         Returns:
             CardInfo: Detected SD card info, returns None if timeout
         """
+        watcher = None
         try:
             logger.info(f"Waiting for SD card insertion, timeout: {timeout} seconds")
-            start_time = time.time()
+            deadline = time.time() + timeout
             
-            while time.time() - start_time < timeout:
-                card_info = self.check_card()
+            # Cards are only checked again after a device event
+            changed = threading.Event()
+            watcher = self.backend.create_device_watcher()
+            watcher.start(lambda reason: changed.set())
+            
+            while True:
+                changed.clear()
+                card_info = self.check_card(reprobe=reprobe)
                 if card_info:
                     logger.info(f"SD card detected: {card_info}")
                     return card_info
                 
-                # Check every second
-                time.sleep(1)
-            
-            logger.warning("Wait for SD card timeout")
-            return None
+                remaining = deadline - time.time()
+                if remaining <= 0 or not changed.wait(remaining):
+                    logger.warning("Wait for SD card timeout")
+                    return None
             
         except Exception as e:
             logger.error(f"Error waiting for SD card: {str(e)}", exc_info=True)
             return None
+        finally:
+            if watcher:
+                watcher.stop()
 
     def _disable_enable_sd4_mode(self):
         """根据配置控制SD4.0模式"""
         try:
-            # 打开注册表路径
-            key = winreg.OpenKey(winreg.HKEY_LOCAL_MACHINE, 
-                                 self.card_config['registry_path'], 
-                                 0, 
-                                 winreg.KEY_READ | winreg.KEY_WRITE)
-            
-            # 读取当前registry_item值
-            try:
-                value, _ = winreg.QueryValueEx(key, self.card_config['registry_item'])
-            except WindowsError:
-                value = 0
-                
-            # 根据sd4_disable设置或清除bit 1 (dis_sd40_card)
-            if self.card_config['sd4_disable']:
-                new_value = value | 0x02  # 设置bit 1为1
-                logger.debug(f"Setting dis_sd40_card bit to 1, value: 0x{value:02x} -> 0x{new_value:02x}")
-            else:
-                new_value = value & ~0x02  # 清除bit 1
-                logger.debug(f"Clearing dis_sd40_card bit to 0, value: 0x{value:02x} -> 0x{new_value:02x}")
-                
-            winreg.SetValueEx(key, self.card_config['registry_item'], 0, winreg.REG_DWORD, new_value)
-            winreg.CloseKey(key)
-            
-            # 获取Bayhub SD Host controller设备实例路径
-            wmi = win32com.client.GetObject("winmgmts:")
-            found = False
-            
-            # 遍历SCSI控制器
-            for controller in wmi.InstancesOf("Win32_SCSIController"):
-                logger.debug(f"Found SCSI controller: Name='{controller.Name}', DeviceID='{controller.DeviceID}'")
-                
-                if "BAYHUB" in controller.Name.upper() and "SD" in controller.Name.upper():
-                    found = True
-                    logger.info(f"Found Bayhub SD controller: {controller.Name}")
-                    
-                    try:
-                        # 使用PNPDeviceID而不是DeviceID, PNPDeviceID即device instance ID
-                        # 参考：https://learn.microsoft.com/en-us/windows-hardware/drivers/devtest/devcon-examples
-                        device_id = controller.PNPDeviceID  
-                        logger.debug(f"Using PNPDeviceID: {device_id}")
-                        
-                        # 禁用设备
-                        logger.debug(f"Disabling device: {device_id}")
-                        cmd_disable = f'{self.devcon_path} disable "@{device_id}"'  # 添加@符号
-                        logger.debug(f"Executing command: {cmd_disable}")
-                        result = os.system(cmd_disable)
-                        if result != 0:
-                            logger.error(f"Failed to disable device, error code: {result}")
-                            return False
-                            
-                        # 等待1s
-                        time.sleep(1)
-                        
-                        # 启用设备
-                        logger.debug(f"Enabling device: {device_id}")
-                        cmd_enable = f'{self.devcon_path} enable "@{device_id}"'  # 添加@符号
-                        logger.debug(f"Executing command: {cmd_enable}")
-                        result = os.system(cmd_enable)
-                        if result != 0:
-                            logger.error(f"Failed to enable device, error code: {result}")
-                            return False
-                        
-                        logger.info("SD4.0 mode disabled and reinitialized as SD3.0")
-                        return True
-                    
-                    except Exception as e:
-                        logger.error(f"Error while managing device: {str(e)}")
-                        return False
-                    
+            if self.backend.set_sd4_mode(self.card_config['sd4_disable'],
+                                         self.card_config['registry_path'],
+                                         self.card_config['registry_item']):
+                # Controller and disk are re-enumerated after reinitialization
+                self.backend.invalidate_topology()
+                logger.info(f"SD4.0 mode {'disabled' if self.card_config['sd4_disable'] else 'enabled'}, card reinitialized")
+                return True
+            return False
         except Exception as e:
             logger.error(f"Failed to disable SD4.0 mode: {str(e)}")
             return False
-        
-    def _get_devcon_path(self):
-        """获取devcon.exe的完整路径"""
-        if getattr(sys, 'frozen', False):
-            # 如果是打包后的exe
-            base_path = os.path.dirname(sys.executable)
-        else:
-            # 如果是开发环境
-            base_path = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-            
-        devcon_path = os.path.join(base_path, 'devcon.exe')
-        if not os.path.exists(devcon_path):
-            logger.error(f"devcon.exe not found at: {devcon_path}")
-            raise FileNotFoundError(f"devcon.exe not found at: {devcon_path}")
-            
-        logger.debug(f"Found devcon.exe at: {devcon_path}")
-        return devcon_path
\ No newline at end of file
+
+def _init_probe_thread():
+    # Device enumeration in probe threads uses WMI, it needs a COM apartment
+    if pythoncom:
+        pythoncom.CoInitialize()
+
+def _normalize_target(value):
+    """Comparable form of a volume, device path or serial number: "E:\\", "e:" and "E" are equal"""
+    value = str(value).strip()
+    normalized = value.rstrip('\\/').rstrip(':')
+    return (normalized or value).lower()
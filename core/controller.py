@@ -1,8 +1,11 @@
-import wmi
-import win32com.client
 from enum import Enum
 from utils.logger import get_logger
 
+try:
+    import wmi
+except ImportError:  # Non-Windows platform
+    wmi = None
+
 logger = get_logger(__name__)
 
 class ControllerType(Enum):
@@ -16,9 +19,13 @@ class SDMode(Enum):
     SD_2 = "SD 2.0"
 
 class SDController:
-    def __init__(self):
+    def __init__(self, backend=None):
         logger.debug("Initializing SD controller")
-        self.wmi = wmi.WMI()
+        self.wmi = wmi.WMI() if wmi else None
+        if backend is None:
+            from core.backend import create_backend
+            backend = create_backend()
+        self.backend = backend
         self.bayhub_vid = "VEN_1217"
         self.last_bayhub_info = None  # Save historical Bayhub controller info
         self.controller_capabilities = {
@@ -34,15 +41,12 @@ class SDController:
     def _controller_info(self):
         """Get all modes supported by the controller"""
         try:
-            # First, get all PCIe device information
-            wmi = win32com.client.GetObject("winmgmts:")
-            
             # Find Bayhub controller and NVMe controller
             current_bayhub_info = None
             nvme_info = None
             
             # Search from storage controllers
-            for controller in wmi.InstancesOf("Win32_SCSIController"):
+            for controller in self.backend.list_controllers():
                 pcie_info = self._extract_pcie_info(controller.PNPDeviceID)
                 if not pcie_info:
                     continue
@@ -0,0 +1,205 @@
+import os
+import sys
+import select
+import socket
+import threading
+from utils.logger import get_logger
+
+try:
+    import pythoncom
+    import pywintypes
+    import win32com.client
+except ImportError:  # Non-Windows platform
+    pythoncom = None
+    pywintypes = None
+    win32com = None
+
+logger = get_logger(__name__)
+
+WBEM_E_TIMED_OUT = -2147209215  # 0x80043001, NextEvent returned without event
+NETLINK_KOBJECT_UEVENT = 15
+
+class DeviceWatcher:
+    """Background watcher calling back on device insert/remove events
+
+    Raw events come in bursts (controller, disk, partition and volume of one
+    card), the callback fires once per burst after SETTLE_TIME without new
+    events, from the watcher's timer thread. Reasons are "add", "remove" or
+    "change".
+
+    With a backend, its device topology snapshot is kept while the watcher
+    runs and invalidated before every callback.
+    """
+    SETTLE_TIME = 0.5
+
+    def __init__(self, backend=None):
+        self.backend = backend
+        self._callback = None
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._timer = None
+        self._lock = threading.Lock()
+        self._reason = None
+
+    def start(self, callback):
+        self._callback = callback
+        self._stop_event.clear()
+        if self.backend:
+            self.backend._watcher_started()
+        self._thread = threading.Thread(target=self._watch, name=f"{type(self).__name__}", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._stop_event.is_set():
+            return
+        self._stop_event.set()
+        if self.backend:
+            self.backend._watcher_stopped()
+        with self._lock:
+            if self._timer:
+                self._timer.cancel()
+                self._timer = None
+        if self._thread and self._thread is not threading.current_thread():
+            self._thread.join(timeout=2)
+        self._thread = None
+
+    def _watch(self):
+        try:
+            self._run()
+        except Exception as e:
+            logger.error(f"Device watcher stopped: {str(e)}", exc_info=True)
+            # Without events the cached topology would go stale
+            self.stop()
+
+    def _run(self):
+        raise NotImplementedError
+
+    def _notify(self, reason):
+        """Record a raw event, restarting the settle timer"""
+        with self._lock:
+            if self._stop_event.is_set():
+                return
+            # Removal wins over other events of the same burst
+            if self._reason != "remove":
+                self._reason = reason
+            if self._timer:
+                self._timer.cancel()
+            self._timer = threading.Timer(self.SETTLE_TIME, self._fire)
+            self._timer.daemon = True
+            self._timer.start()
+
+    def _fire(self):
+        with self._lock:
+            reason, self._reason, self._timer = self._reason, None, None
+        if not self._stop_event.is_set():
+            logger.debug(f"Device event: {reason}")
+            if self.backend:
+                self.backend.invalidate_topology()
+            self._callback(reason)
+
+class PollingDeviceWatcher(DeviceWatcher):
+    """Fallback when no device event source is available, calls back every interval"""
+    def __init__(self, backend=None, interval=1.0):
+        super().__init__(backend)
+        self.interval = interval
+
+    def _run(self):
+        while not self._stop_event.wait(self.interval):
+            if self.backend:
+                self.backend.invalidate_topology()
+            self._callback("change")
+
+class WmiDeviceWatcher(DeviceWatcher):
+    """Windows watcher on the WMI Win32_DeviceChangeEvent subscription (WM_DEVICECHANGE events)
+
+    Covers volume arrival/removal as well as the SD host/NVMe controller
+    switch of SD Express cards, without any WMI polling.
+    """
+    EVENT_TYPES = {1: "change", 2: "add", 3: "remove", 4: "change"}
+
+    def _run(self):
+        pythoncom.CoInitialize()
+        try:
+            wmi = win32com.client.GetObject("winmgmts:")
+            events = wmi.ExecNotificationQuery("SELECT * FROM Win32_DeviceChangeEvent")
+            while not self._stop_event.is_set():
+                try:
+                    event = events.NextEvent(500)
+                except pywintypes.com_error as e:
+                    if e.excepinfo and e.excepinfo[5] == WBEM_E_TIMED_OUT:
+                        continue
+                    raise
+                self._notify(self.EVENT_TYPES.get(event.EventType, "change"))
+        finally:
+            pythoncom.CoUninitialize()
+
+class LinuxDeviceWatcher(DeviceWatcher):
+    """Linux watcher on kernel block device uevents (the udev event source) and mount table changes
+
+    Volumes are mount points, so /proc/self/mounts changes (signalled with
+    POLLPRI) are watched too: a card becomes testable once it is mounted.
+    """
+    def _run(self):
+        poller = select.poll()
+        uevents = None
+        try:
+            uevents = socket.socket(socket.AF_NETLINK, socket.SOCK_DGRAM, NETLINK_KOBJECT_UEVENT)
+            uevents.bind((0, 1))  # Group 1: kernel uevents
+            poller.register(uevents, select.POLLIN)
+        except OSError as e:
+            logger.warning(f"Kernel uevents not available, watching mount table only: {str(e)}")
+            if uevents:
+                uevents.close()
+            uevents = None
+
+        with open('/proc/self/mounts', 'r') as mounts:
+            mounts.read()
+            poller.register(mounts, select.POLLPRI | select.POLLERR)
+            try:
+                while not self._stop_event.is_set():
+                    for fd, _ in poller.poll(500):
+                        if uevents and fd == uevents.fileno():
+                            self._handle_uevent(uevents.recv(65536))
+                        else:
+                            mounts.seek(0)
+                            mounts.read()
+                            self._notify("change")
+            finally:
+                if uevents:
+                    uevents.close()
+
+    def _handle_uevent(self, message):
+        # "ACTION@DEVPATH\0KEY=VALUE\0..."
+        fields = message.split(b'\0')
+        if b'SUBSYSTEM=block' not in fields:
+            return
+        action = fields[0].split(b'@', 1)[0].decode('ascii', 'replace')
+        self._notify(action if action in ("add", "remove") else "change")
+
+class SimulatedDeviceWatcher(DeviceWatcher):
+    """Simulated card watcher, the card is inserted while its volume directory exists"""
+    def __init__(self, backend, interval=0.5):
+        super().__init__(backend)
+        self.interval = interval
+
+    def _state(self):
+        return os.path.isdir(self.backend.volume), self.backend.mode
+
+    def _run(self):
+        state = self._state()
+        while not self._stop_event.wait(self.interval):
+            current = self._state()
+            if current != state:
+                if current[0] != state[0]:
+                    self._notify("add" if current[0] else "remove")
+                else:
+                    self._notify("change")
+                state = current
+
+def create_device_watcher(kind, backend=None):
+    """Create the watcher of a platform, falling back to polling"""
+    if kind == "windows" and pythoncom is not None:
+        return WmiDeviceWatcher(backend)
+    if kind == "posix" and sys.platform.startswith('linux'):
+        return LinuxDeviceWatcher(backend)
+    return PollingDeviceWatcher(backend)
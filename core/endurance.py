@@ -0,0 +1,312 @@
+import os
+import json
+import time
+from datetime import datetime
+from core.latency import LatencyHistogram
+from core.patterns import PatternGenerator
+from core.verify import MismatchReport
+from utils.logger import get_logger, get_app_dir
+
+logger = get_logger(__name__)
+
+CHECKPOINT_VERSION = 1
+MAX_ERROR_RANGES = 256  # Error map entries kept over the whole run
+
+class EnduranceState:
+    """Cumulative state of an endurance run
+
+    Rebuilt by replaying the checkpoint records one by one, its size does not
+    depend on the number of cycles: counters, running speed extremes, two
+    latency histograms and a capped error map.
+    """
+    def __init__(self):
+        self.cycles = 0
+        self.started = 0  # Last cycle whose write pass was started
+        self.sessions = 0
+        self.bytes_written = 0
+        self.bytes_read = 0
+        self.elapsed = 0.0
+        self.error_cycles = 0
+        self.bad_sectors = 0
+        self.first_error_cycle = None
+        self.error_map = []  # [first_lba, last_lba, first cycle, cycle count], sorted by first_lba
+        self.dropped_ranges = 0
+        self.speeds = {'write': [None, 0.0, None], 'read': [None, 0.0, None]}  # min, sum, max
+        self.latency = {'write': LatencyHistogram(), 'read': LatencyHistogram()}
+        self.complete = False
+
+    def apply(self, record):
+        """Update the state with one checkpoint record"""
+        kind = record['type']
+        if kind == 'session':
+            self.sessions += 1
+        elif kind == 'cycle_start':
+            self.started = record['cycle']
+        elif kind == 'cycle':
+            self.cycles = record['cycle']
+            self.bytes_written += record['written']
+            self.bytes_read += record['read']
+            self.elapsed += record['elapsed']
+            for op in ('write', 'read'):
+                speed = record[f'{op}_speed']
+                low, total, high = self.speeds[op]
+                self.speeds[op] = [speed if low is None else min(low, speed), total + speed,
+                                   speed if high is None else max(high, speed)]
+                self.latency[op].merge(LatencyHistogram.from_dict(record[f'{op}_latency']))
+            self._add_errors(record)
+        elif kind == 'retention':
+            self._add_errors(record)
+        elif kind == 'done':
+            self.complete = True
+
+    def _add_errors(self, record):
+        if not record.get('bad_sectors'):
+            return
+        self.error_cycles += 1
+        self.bad_sectors += record['bad_sectors']
+        if self.first_error_cycle is None:
+            self.first_error_cycle = record['cycle']
+        for first, last in record['ranges']:
+            for entry in self.error_map:
+                if entry[0] == first and entry[1] == last:
+                    entry[3] += 1
+                    break
+            else:
+                if len(self.error_map) < MAX_ERROR_RANGES:
+                    self.error_map.append([first, last, record['cycle'], 1])
+                    self.error_map.sort()
+                else:
+                    self.dropped_ranges += 1
+        self.dropped_ranges += record.get('dropped_ranges', 0)
+
+    def mean_speed(self, op):
+        return self.speeds[op][1] / self.cycles if self.cycles else 0.0
+
+class EnduranceCheckpoint:
+    """Append-only JSON lines checkpoint of an endurance run
+
+    The first line is a header with the run parameters, then one line per
+    session start, cycle start, completed cycle and retention check, and a
+    final "done" line. Every line is fsynced, a torn last line of an interrupted write is
+    dropped when the checkpoint is loaded.
+    """
+    def __init__(self, path):
+        self.path = path
+
+    def load(self):
+        """Replay the checkpoint
+        Returns:
+            (header, EnduranceState), or None without a readable checkpoint
+        """
+        if not os.path.exists(self.path):
+            return None
+        header = None
+        state = EnduranceState()
+        good_size = 0
+        with open(self.path, 'rb') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    logger.warning(f"Dropping torn checkpoint record at byte {good_size} of {self.path}")
+                    break
+                if header is None:
+                    if record.get('type') != 'header' or record.get('version') != CHECKPOINT_VERSION:
+                        logger.warning(f"Ignoring endurance checkpoint {self.path} of another version")
+                        return None
+                    header = record
+                else:
+                    state.apply(record)
+                good_size += len(line)
+        if header is None:
+            return None
+        if good_size < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as f:
+                f.truncate(good_size)
+        return header, state
+
+    def start(self, header):
+        """Start a new checkpoint, replacing any previous one"""
+        with open(self.path, 'w', encoding='utf-8') as f:
+            record = dict(header, type='header', version=CHECKPOINT_VERSION)
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+    def append(self, record):
+        with open(self.path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, separators=(',', ':')) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+
+class EnduranceTest:
+    """Write/verify cycles over one file until the duration or cycle count is reached
+
+    Cycle n writes the file with the pattern of (seed, n) and reads it back
+    verifying every block. Every finished cycle is appended to the
+    checkpoint, so a run interrupted by a crash or reboot resumes after its
+    last finished cycle; before resuming, the data of that cycle is verified
+    once more as a retention check. The check is skipped when the run was
+    interrupted inside a cycle, the file then holds data of the unfinished
+    cycle.
+    """
+    def __init__(self, backend, path, checkpoint, card_key, cycle_size, block_size=1024 * 1024, queue_depth=4,
+                 duration=0, max_cycles=0, engine="auto", seed=None, resume=True, data_kept=False,
+                 stop_event=None, progress_callback=None):
+        """
+        Args:
+            path: Cycle file on the card, at least cycle_size bytes
+            checkpoint: EnduranceCheckpoint
+            card_key: Card identity, a checkpoint of another card is not resumed
+            duration: Total run time in seconds over all sessions, 0 for no limit
+            max_cycles: Total cycle count, 0 for no limit
+            data_kept: path still holds the data of an interrupted run, checked before resuming
+            progress_callback: Optional progress_callback(state, fraction), called after every cycle
+        """
+        if not duration and not max_cycles:
+            raise ValueError("Endurance test needs a duration or a cycle count")
+        self.backend = backend
+        self.path = path
+        self.checkpoint = checkpoint
+        self.card_key = card_key
+        self.cycle_size = cycle_size
+        self.block_size = block_size
+        self.queue_depth = queue_depth
+        self.duration = duration
+        self.max_cycles = max_cycles
+        self.engine_name = engine
+        self.seed = seed
+        self.resume = resume
+        self.data_kept = data_kept
+        self.stop_event = stop_event
+        self.progress_callback = progress_callback
+        self.resumed = False
+
+    def _header(self):
+        return {'card': self.card_key, 'cycle_size': self.cycle_size, 'block_size': self.block_size,
+                'seed': self.seed, 'started': datetime.now().isoformat(timespec='seconds')}
+
+    def _open(self):
+        """Resume a matching unfinished checkpoint or start a new one, returns (header, state)"""
+        loaded = self.checkpoint.load() if self.resume else None
+        if loaded:
+            header, state = loaded
+            if state.complete:
+                logger.info(f"Endurance checkpoint {self.checkpoint.path} is complete, starting a new run")
+            elif any(header[key] != value for key, value in self._header().items() if key not in ('seed', 'started')):
+                logger.warning(f"Endurance checkpoint {self.checkpoint.path} belongs to another card or "
+                               f"cycle size, starting a new run")
+            else:
+                self.resumed = True
+                logger.info(f"Resuming endurance run after cycle {state.cycles} from {self.checkpoint.path}")
+                return header, state
+        header = self._header()
+        if header['seed'] is None:
+            header['seed'] = int.from_bytes(os.urandom(8), 'little') >> 1
+        self.checkpoint.start(header)
+        return header, EnduranceState()
+
+    def _finished(self, state):
+        return ((self.max_cycles and state.cycles >= self.max_cycles) or
+                (self.duration and state.elapsed >= self.duration))
+
+    def _fraction(self, state):
+        fractions = []
+        if self.max_cycles:
+            fractions.append(state.cycles / self.max_cycles)
+        if self.duration:
+            fractions.append(state.elapsed / self.duration)
+        return min(1.0, max(fractions))
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def run(self):
+        """Run cycles until finished or stopped
+        Returns:
+            (EnduranceState, stopped)
+        """
+        header, state = self._open()
+        seed = header['seed']
+        session = {'type': 'session', 'cycle': state.cycles, 'time': datetime.now().isoformat(timespec='seconds')}
+        self.checkpoint.append(session)
+        state.apply(session)
+
+        engine = self.backend.create_io_engine(queue_depth=self.queue_depth, block_size=self.block_size,
+                                               engine=self.engine_name)
+        try:
+            if self.resumed and state.cycles and self.data_kept:
+                if state.started > state.cycles:
+                    logger.info(f"Skipping retention check, the run was interrupted inside cycle {state.started} "
+                                f"and the file no longer holds the data of cycle {state.cycles}")
+                else:
+                    record = self._retention_check(engine, seed, state.cycles)
+                    if record is not None:
+                        self.checkpoint.append(record)
+                        state.apply(record)
+
+            while not self._finished(state):
+                if self._stopped():
+                    return state, True
+                record = self._cycle(engine, seed, state.cycles + 1)
+                if record is None:
+                    return state, True
+                self.checkpoint.append(record)
+                state.apply(record)
+                if self.progress_callback:
+                    self.progress_callback(state, self._fraction(state))
+        finally:
+            engine.close()
+
+        self.checkpoint.append({'type': 'done', 'cycle': state.cycles})
+        state.complete = True
+        return state, False
+
+    def _verify(self, engine, pattern):
+        report = MismatchReport()
+        result = engine.run(self.path, "read", self.cycle_size,
+                            consume=lambda view, offset: pattern.verify(view, offset, report),
+                            stop_event=self.stop_event)
+        if not result.stopped:
+            report.add_missing(result.bytes, self.cycle_size)
+        return result, report
+
+    def _error_fields(self, report):
+        return {'bad_sectors': report.bad_sectors, 'ranges': report.lba_ranges,
+                'dropped_ranges': report.dropped_ranges}
+
+    def _retention_check(self, engine, seed, cycle):
+        """Verify the data of the last finished cycle after the interruption"""
+        logger.info(f"Verifying data of cycle {cycle} written before the interruption")
+        result, report = self._verify(engine, PatternGenerator(seed, pass_number=cycle))
+        if result.stopped:
+            return None
+        if not report.passed:
+            logger.error(f"Retention check of cycle {cycle} failed: {report.summary()}")
+        return dict({'type': 'retention', 'cycle': cycle}, **self._error_fields(report))
+
+    def _cycle(self, engine, seed, cycle):
+        """Write and verify one cycle, returns its checkpoint record or None when stopped"""
+        pattern = PatternGenerator(seed, pass_number=cycle)
+        # Marks the file as overwritten, a resume must not verify it against the previous cycle
+        self.checkpoint.append({'type': 'cycle_start', 'cycle': cycle})
+        start = time.perf_counter()
+        write = engine.run(self.path, "write", self.cycle_size, fill=pattern.fill, stop_event=self.stop_event,
+                           create=False)
+        if write.stopped:
+            return None
+        read, report = self._verify(engine, pattern)
+        if read.stopped:
+            return None
+        if not report.passed:
+            logger.error(f"Endurance cycle {cycle} verification failed: {report.summary()}")
+        return dict({'type': 'cycle', 'cycle': cycle, 'written': write.bytes, 'read': read.bytes,
+                     'elapsed': round(time.perf_counter() - start, 3),
+                     'write_speed': round(write.speed, 2), 'read_speed': round(read.speed, 2),
+                     'write_latency': write.latency.to_dict(), 'read_latency': read.latency.to_dict()},
+                    **self._error_fields(report))
+
+def create_checkpoint(cfg):
+    """Checkpoint of the test.endurance configuration"""
+    path = cfg.get('test.endurance.checkpoint', '') or os.path.join(get_app_dir(), 'endurance_checkpoint.jsonl')
+    return EnduranceCheckpoint(path)
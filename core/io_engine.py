@@ -0,0 +1,414 @@
+import os
+import mmap
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from core.latency import LatencyHistogram
+from utils.logger import get_logger
+
+try:
+    import win32file
+    import win32event
+    import winerror
+except ImportError:  # Non-Windows platform, only the thread pool engine is available
+    win32file = None
+    win32event = None
+    winerror = None
+
+logger = get_logger(__name__)
+
+MIN_QUEUE_DEPTH = 1
+MAX_QUEUE_DEPTH = 64  # WaitForMultipleObjects can wait on at most 64 handles
+ALIGNMENT = mmap.PAGESIZE  # Page alignment satisfies sector alignment for unbuffered I/O
+
+class AlignedBuffer:
+    """Page aligned, reusable I/O buffer backed by anonymous memory mapping"""
+    def __init__(self, size):
+        self.size = _align_up(size)
+        self._mmap = mmap.mmap(-1, self.size)
+        self.view = memoryview(self._mmap)
+
+    def close(self):
+        self.view.release()
+        self._mmap.close()
+
+class IOResult:
+    """Result of one engine run"""
+    def __init__(self, op, queue_depth, block_size):
+        self.op = op
+        self.queue_depth = queue_depth
+        self.block_size = block_size
+        self.bytes = 0
+        self.io_count = 0
+        self.elapsed = 0.0
+        self.stopped = False
+        self.latency = LatencyHistogram()  # Submission to completion time of every request
+
+    @property
+    def speed(self):
+        """Throughput in MB/s"""
+        return self.bytes / self.elapsed / (1024 * 1024) if self.elapsed > 0 else 0.0
+
+    @property
+    def iops(self):
+        return self.io_count / self.elapsed if self.elapsed > 0 else 0.0
+
+    def __repr__(self):
+        return (f"IOResult(op={self.op}, qd={self.queue_depth}, bytes={self.bytes}, "
+                f"speed={self.speed:.2f}MB/s, iops={self.iops:.0f})")
+
+class IOEngine:
+    """Base class of queue depth aware I/O engines
+
+    An engine keeps up to queue_depth requests of block_size bytes outstanding
+    against a single file, reusing one aligned buffer per queue slot.
+    """
+    name = "base"
+
+    def __init__(self, queue_depth=1, block_size=1024 * 1024):
+        if not MIN_QUEUE_DEPTH <= queue_depth <= MAX_QUEUE_DEPTH:
+            raise ValueError(f"Queue depth must be in range {MIN_QUEUE_DEPTH}-{MAX_QUEUE_DEPTH}: {queue_depth}")
+        if block_size <= 0 or block_size % 512:
+            raise ValueError(f"Block size must be a positive multiple of 512 bytes: {block_size}")
+        self.queue_depth = queue_depth
+        self.block_size = block_size
+        self.buffers = [AlignedBuffer(block_size) for _ in range(queue_depth)]
+        self.monitor = None  # Optional LiveMonitor fed with every completion of every run
+
+    def run(self, path, op, total_size, offset=0, fill=None, consume=None, stop_event=None, sampler=None,
+            create=True):
+        """Transfer total_size bytes sequentially starting at offset
+        Args:
+            path: Target file path
+            op: "read" or "write"
+            total_size: Number of bytes to transfer
+            offset: Start offset in bytes
+            fill: Optional callback fill(view, file_offset) to populate a write buffer before submission
+            consume: Optional callback consume(view, file_offset) called with the data of each completed read
+            stop_event: Optional threading.Event, stop submitting new requests once set
+            sampler: Optional ThroughputSampler fed with every completion
+            create: Write only, False writes into the existing file without truncating it,
+                e.g. one of several disjoint ranges of a shared file
+        Returns:
+            IOResult: Transfer statistics
+        """
+        if op not in ("read", "write"):
+            raise ValueError(f"Unsupported operation: {op}")
+        result = IOResult(op, self.queue_depth, self.block_size)
+        mode = op if create or op == "read" else "readwrite"
+        handle = self._open(path, mode, offset + total_size)
+        try:
+            requests = ((op, request_offset, length)
+                        for request_offset, length in self._requests(offset, offset + total_size))
+            self._run(handle, requests, fill, consume, stop_event, sampler, {op: result})
+        finally:
+            self._close(handle, mode)
+        logger.debug(f"{self.name} engine: {result}")
+        return result
+
+    def run_random(self, path, region_size, duration, read_percent=100, seed=None, fill=None, consume=None,
+                   stop_event=None, offset=0):
+        """Random block aligned reads/writes within region_size bytes of an existing file
+        Args:
+            path: Target file path, must already hold region_size bytes after offset
+            region_size: Size of the random I/O region in bytes
+            duration: Run time in seconds
+            read_percent: Percentage of reads, the remaining requests are writes
+            seed: Optional seed of the offset and operation sequence
+            fill: Optional callback fill(view, file_offset) to populate a write buffer before submission
+            consume: Optional callback consume(view, file_offset) called with the data of each completed read
+            stop_event: Optional threading.Event, stop submitting new requests once set
+            offset: Start offset of the region in bytes
+        Returns:
+            dict: IOResult of "read" and "write", both cover the whole run time
+        """
+        blocks = region_size // self.block_size
+        if blocks < 1:
+            raise ValueError(f"Random I/O region smaller than block size: {region_size}")
+        results = {op: IOResult(op, self.queue_depth, self.block_size) for op in ("read", "write")}
+        requests = self._random_requests(random.Random(seed), blocks, read_percent, duration, offset)
+        handle = self._open(path, "readwrite", offset + region_size)
+        try:
+            self._run(handle, requests, fill, consume, stop_event, None, results)
+        finally:
+            self._close(handle, "readwrite")
+        logger.debug(f"{self.name} engine: {results['read']}, {results['write']}")
+        return results
+
+    def close(self):
+        """Release engine buffers"""
+        for buffer in self.buffers:
+            buffer.close()
+        self.buffers = []
+
+    def _requests(self, start, end):
+        """Yield (offset, length) of every block request in [start, end)"""
+        for offset in range(start, end, self.block_size):
+            yield offset, min(self.block_size, end - offset)
+
+    def _random_requests(self, rng, blocks, read_percent, duration, offset=0):
+        """Yield (op, offset, length) of random block requests until duration has passed"""
+        deadline = time.perf_counter() + duration
+        while time.perf_counter() < deadline:
+            op = "read" if rng.random() * 100 < read_percent else "write"
+            yield op, offset + rng.randrange(blocks) * self.block_size, self.block_size
+
+    def _open(self, path, op, file_size):
+        raise NotImplementedError
+
+    def _close(self, handle, op):
+        raise NotImplementedError
+
+    def _run(self, handle, requests, fill, consume, stop_event, sampler, results):
+        """Process (op, offset, length) requests, accounting completions into results[op]"""
+        raise NotImplementedError
+
+class OverlappedIOEngine(IOEngine):
+    """Windows overlapped I/O engine, one OVERLAPPED structure and event per queue slot"""
+    name = "overlapped"
+
+    def __init__(self, queue_depth=1, block_size=1024 * 1024):
+        if win32file is None:
+            raise RuntimeError("Overlapped I/O engine requires pywin32")
+        super().__init__(queue_depth, block_size)
+        self.overlapped = []
+        for _ in range(queue_depth):
+            overlapped = win32file.OVERLAPPED()
+            overlapped.hEvent = win32event.CreateEvent(None, True, False, None)
+            self.overlapped.append(overlapped)
+
+    def _open(self, path, op, file_size):
+        if op == "write":
+            handle = win32file.CreateFile(
+                path,
+                win32file.GENERIC_WRITE,
+                0,  # Not shared
+                None,
+                win32file.CREATE_ALWAYS,
+                win32file.FILE_FLAG_NO_BUFFERING |
+                win32file.FILE_FLAG_WRITE_THROUGH |
+                win32file.FILE_FLAG_OVERLAPPED,
+                None
+            )
+            # Extend file first, writes beyond EOF are serialized by the file system
+            win32file.SetFilePointer(handle, file_size, win32file.FILE_BEGIN)
+            win32file.SetEndOfFile(handle)
+            return handle
+        if op == "readwrite":
+            return win32file.CreateFile(
+                path,
+                win32file.GENERIC_READ | win32file.GENERIC_WRITE,
+                _share_mode(path),
+                None,
+                win32file.OPEN_EXISTING,
+                win32file.FILE_FLAG_NO_BUFFERING |
+                win32file.FILE_FLAG_WRITE_THROUGH |
+                win32file.FILE_FLAG_RANDOM_ACCESS |
+                win32file.FILE_FLAG_OVERLAPPED,
+                None
+            )
+        return win32file.CreateFile(
+            path,
+            win32file.GENERIC_READ,
+            _share_mode(path),
+            None,
+            win32file.OPEN_EXISTING,
+            win32file.FILE_FLAG_NO_BUFFERING |
+            win32file.FILE_FLAG_SEQUENTIAL_SCAN |
+            win32file.FILE_FLAG_OVERLAPPED,
+            None
+        )
+
+    def _close(self, handle, op):
+        handle.Close()
+
+    def _submit(self, handle, op, slot, offset, length):
+        overlapped = self.overlapped[slot]
+        overlapped.Offset = offset & 0xFFFFFFFF
+        overlapped.OffsetHigh = offset >> 32
+        win32event.ResetEvent(overlapped.hEvent)
+        view = self.buffers[slot].view[:length]
+        if op == "write":
+            rc, _ = win32file.WriteFile(handle, view, overlapped)
+        else:
+            rc, _ = win32file.ReadFile(handle, view, overlapped)
+        if rc not in (0, winerror.ERROR_IO_PENDING):
+            raise OSError(rc, f"Overlapped {op} submission failed at offset {offset}")
+
+    def _run(self, handle, requests, fill, consume, stop_event, sampler, results):
+        in_flight = {}  # slot -> (op, offset, submit time)
+        free_slots = list(range(self.queue_depth))
+
+        start_time = time.perf_counter()
+        if sampler:
+            sampler.start(start_time)
+        while True:
+            # Keep the queue full
+            while free_slots and not (stop_event and stop_event.is_set()):
+                request = next(requests, None)
+                if request is None:
+                    break
+                op, offset, length = request
+                slot = free_slots.pop()
+                if op == "write" and fill:
+                    fill(self.buffers[slot].view[:length], offset)
+                in_flight[slot] = (op, offset, time.perf_counter())
+                self._submit(handle, op, slot, offset, length)
+
+            if not in_flight:
+                break
+
+            # Reap whichever request completes first
+            slots = list(in_flight)
+            rc = win32event.WaitForMultipleObjects(
+                [self.overlapped[slot].hEvent for slot in slots], False, win32event.INFINITE)
+            slot = slots[rc - win32event.WAIT_OBJECT_0]
+            transferred = win32file.GetOverlappedResult(handle, self.overlapped[slot], False)
+            op, offset, submit_time = in_flight.pop(slot)
+            now = time.perf_counter()
+            result = results[op]
+            result.latency.record(now - submit_time)
+            if sampler:
+                sampler.add(transferred, now)
+            if self.monitor:
+                self.monitor.add(transferred, now - submit_time, now)
+            if consume and op == "read":
+                consume(self.buffers[slot].view[:transferred], offset)
+            free_slots.append(slot)
+
+            result.bytes += transferred
+            result.io_count += 1
+
+        _finish(results, start_time, stop_event, sampler)
+
+    def close(self):
+        for overlapped in self.overlapped:
+            overlapped.hEvent.Close()
+        self.overlapped = []
+        super().close()
+
+class ThreadPoolIOEngine(IOEngine):
+    """Portable engine, queue depth is emulated with one worker thread per queue slot
+
+    Used on Linux/POSIX where neither io_uring nor libaio is reachable from the
+    standard library; pread/pwrite release the GIL so requests really overlap.
+    """
+    name = "threadpool"
+
+    def __init__(self, queue_depth=1, block_size=1024 * 1024):
+        super().__init__(queue_depth, block_size)
+        self._executor = ThreadPoolExecutor(max_workers=queue_depth, thread_name_prefix="io_engine")
+
+    def _open(self, path, op, file_size):
+        if op == "write":
+            flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
+        else:
+            flags = os.O_RDWR if op == "readwrite" else os.O_RDONLY
+        flags |= getattr(os, 'O_BINARY', 0)
+        direct = getattr(os, 'O_DIRECT', 0)
+        try:
+            fd = os.open(path, flags | direct)
+        except OSError as e:
+            # Some file systems (tmpfs etc.) reject O_DIRECT, fall back to buffered I/O
+            if not direct:
+                raise
+            logger.warning(f"O_DIRECT not supported for {path}, using buffered I/O: {str(e)}")
+            fd = os.open(path, flags)
+        if op == "write":
+            os.ftruncate(fd, file_size)
+        return fd
+
+    def _close(self, fd, op):
+        try:
+            if op != "read":
+                os.fsync(fd)
+        finally:
+            os.close(fd)
+
+    def _transfer(self, fd, op, slot, offset, length):
+        view = self.buffers[slot].view[:length]
+        if op == "write":
+            return os.pwrite(fd, view, offset)
+        return os.preadv(fd, [view], offset)
+
+    def _timed_transfer(self, fd, op, slot, offset, length):
+        """Run transfer in worker thread, returns (bytes transferred, latency)"""
+        start = time.perf_counter()
+        transferred = self._transfer(fd, op, slot, offset, length)
+        return transferred, time.perf_counter() - start
+
+    def _run(self, fd, requests, fill, consume, stop_event, sampler, results):
+        in_flight = {}  # future -> (op, slot, offset)
+        free_slots = list(range(self.queue_depth))
+
+        start_time = time.perf_counter()
+        if sampler:
+            sampler.start(start_time)
+        while True:
+            # Keep the queue full
+            while free_slots and not (stop_event and stop_event.is_set()):
+                request = next(requests, None)
+                if request is None:
+                    break
+                op, offset, length = request
+                slot = free_slots.pop()
+                if op == "write" and fill:
+                    fill(self.buffers[slot].view[:length], offset)
+                future = self._executor.submit(self._timed_transfer, fd, op, slot, offset, length)
+                in_flight[future] = (op, slot, offset)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                op, slot, offset = in_flight.pop(future)
+                transferred, latency = future.result()
+                result = results[op]
+                result.latency.record(latency)
+                if sampler:
+                    sampler.add(transferred)
+                if self.monitor:
+                    self.monitor.add(transferred, latency)
+                if consume and op == "read":
+                    consume(self.buffers[slot].view[:transferred], offset)
+                free_slots.append(slot)
+                result.bytes += transferred
+                result.io_count += 1
+
+        _finish(results, start_time, stop_event, sampler)
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+        super().close()
+
+IO_ENGINES = {
+    OverlappedIOEngine.name: OverlappedIOEngine,
+    ThreadPoolIOEngine.name: ThreadPoolIOEngine,
+}
+
+def create_io_engine(queue_depth=1, block_size=1024 * 1024, engine="auto"):
+    """Create I/O engine by name, "auto" selects the native engine of current platform"""
+    if engine == "auto":
+        engine = OverlappedIOEngine.name if win32file is not None else ThreadPoolIOEngine.name
+    if engine not in IO_ENGINES:
+        raise ValueError(f"Unknown I/O engine: {engine}")
+    return IO_ENGINES[engine](queue_depth=queue_depth, block_size=block_size)
+
+def _finish(results, start_time, stop_event, sampler):
+    """Close run accounting, every result covers the whole run time"""
+    elapsed = time.perf_counter() - start_time
+    if sampler:
+        sampler.stop(start_time + elapsed)
+    for result in results.values():
+        result.elapsed = elapsed
+        result.stopped = bool(stop_event and stop_event.is_set())
+
+def _share_mode(path):
+    """Test files are not shared, physical devices must be, their mounted volumes keep them open"""
+    if path.startswith("\\\\.\\"):
+        return win32file.FILE_SHARE_READ | win32file.FILE_SHARE_WRITE
+    return 0
+
+def _align_up(size, alignment=ALIGNMENT):
+    return (size + alignment - 1) // alignment * alignment
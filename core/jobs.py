@@ -0,0 +1,238 @@
+import re
+import time
+import random
+from concurrent.futures import ThreadPoolExecutor
+from core.patterns import StreamingDataGenerator, PatternGenerator
+from core.verify import MismatchReport
+from core.latency import LatencyHistogram, PhaseStats
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SIZE_UNITS = {'': 1, 'k': 1024, 'm': 1024 ** 2, 'g': 1024 ** 3, 't': 1024 ** 4}
+PRECONDITION_BLOCK_SIZE = 1024 * 1024
+
+def parse_size(value):
+    """Parse fio style size: bytes as int, or string with k/m/g/t suffix ("4k", "128MB")"""
+    if isinstance(value, int):
+        return value
+    match = re.match(r'^\s*(\d+)\s*([kmgt]?)i?b?\s*$', str(value), re.IGNORECASE)
+    if not match:
+        raise ValueError(f"Invalid size: {value}")
+    return int(match.group(1)) * SIZE_UNITS[match.group(2).lower()]
+
+def format_size(size):
+    """Format byte count with the largest exact binary unit"""
+    for unit, factor in (('GB', 1024 ** 3), ('MB', 1024 ** 2), ('KB', 1024)):
+        if size >= factor and size % factor == 0:
+            return f"{size // factor}{unit}"
+    return f"{size}B"
+
+class Job:
+    """Declarative workload, one entry of test.jobs (fio job file style)
+
+    Keys:
+        name: Job name shown in results
+        rw: read, write, rw (write then read back), randread, randwrite, randrw
+        bs: Block size (default 1m sequential, 4k random)
+        iodepth: Queue depth (1-64)
+        size: File size per worker, random jobs use it as their I/O region
+        runtime: Seconds, sequential jobs repeat passes until it has elapsed (time based)
+        rwmixread: Read percentage of randrw
+        verify: none or pattern, data is checked against the seeded block pattern
+        numjobs: Number of workers, each with its own file and I/O engine
+        min_speed / min_iops: Optional pass thresholds of every measured operation (MB/s, IOPS)
+        seed: Data and offset seed, null for random
+    """
+    PATTERNS = ("read", "write", "rw", "randread", "randwrite", "randrw")
+    VERIFY_MODES = ("none", "pattern")
+    KEYS = ("name", "rw", "bs", "iodepth", "size", "runtime", "rwmixread", "verify",
+            "numjobs", "min_speed", "min_iops", "seed")
+    DEFAULT_RANDOM_RUNTIME = 10
+
+    def __init__(self, name, rw="write", bs=None, iodepth=1, size="128m", runtime=None, rwmixread=50,
+                 verify="none", numjobs=1, min_speed=None, min_iops=None, seed=None):
+        if rw not in self.PATTERNS:
+            raise ValueError(f"Job {name}: unknown rw pattern {rw}, expected one of {', '.join(self.PATTERNS)}")
+        if verify not in self.VERIFY_MODES:
+            raise ValueError(f"Job {name}: unknown verify mode {verify}, expected one of {', '.join(self.VERIFY_MODES)}")
+        self.name = str(name)
+        self.rw = rw
+        self.bs = parse_size(bs if bs is not None else ("4k" if rw.startswith("rand") else "1m"))
+        self.iodepth = int(iodepth)
+        self.size = parse_size(size)
+        self.runtime = runtime
+        self.rwmixread = {"randread": 100, "randwrite": 0}.get(rw, rwmixread)
+        self.verify = verify
+        self.numjobs = int(numjobs)
+        self.min_speed = min_speed
+        self.min_iops = min_iops
+        self.seed = seed
+        if self.numjobs < 1:
+            raise ValueError(f"Job {name}: numjobs must be at least 1")
+        if not 0 <= self.rwmixread <= 100:
+            raise ValueError(f"Job {name}: rwmixread must be in range 0-100")
+        if self.size < self.bs:
+            raise ValueError(f"Job {name}: size smaller than block size")
+
+    @classmethod
+    def from_dict(cls, spec):
+        """Build job from a test.jobs entry"""
+        if not isinstance(spec, dict) or 'name' not in spec:
+            raise ValueError(f"Job entry needs a name: {spec}")
+        unknown = set(spec) - set(cls.KEYS)
+        if unknown:
+            raise ValueError(f"Job {spec['name']}: unknown keys {', '.join(sorted(unknown))}")
+        return cls(**spec)
+
+    @property
+    def is_random(self):
+        return self.rw.startswith("rand")
+
+    def describe(self):
+        description = (f"rw={self.rw} bs={format_size(self.bs)} iodepth={self.iodepth} "
+                       f"size={format_size(self.size)}")
+        if self.rw == "randrw":
+            description += f" rwmixread={self.rwmixread}"
+        if self.runtime:
+            description += f" runtime={self.runtime}s"
+        if self.numjobs > 1:
+            description += f" numjobs={self.numjobs}"
+        if self.verify != "none":
+            description += f" verify={self.verify}"
+        return description
+
+def load_jobs(specs):
+    """Compile test.jobs entries into Job objects, names must be unique"""
+    jobs = [Job.from_dict(spec) for spec in specs or []]
+    names = [job.name for job in jobs]
+    duplicates = sorted({name for name in names if names.count(name) > 1})
+    if duplicates:
+        raise ValueError(f"Duplicate job names: {', '.join(duplicates)}")
+    return jobs
+
+class JobRunner:
+    """Execute a Job against the card through the storage backend
+
+    Worker files come from the TestArea of the session, they are allocated
+    once and overwritten in place by every pass and round.
+    """
+    def __init__(self, job, backend, test_area, engine="auto", stop_event=None):
+        self.job = job
+        self.backend = backend
+        self.test_area = test_area
+        self.engine = engine
+        self.stop_event = stop_event
+        self.seed = job.seed if job.seed is not None else random.getrandbits(63)
+
+    def run(self):
+        """Run all workers of the job
+        Returns:
+            tuple: (passed, details)
+        """
+        job = self.job
+        logger.info(f"Starting job {job.name}: {job.describe()}, seed {self.seed}")
+        if job.numjobs == 1:
+            workers = [self._run_worker(0)]
+        else:
+            with ThreadPoolExecutor(max_workers=job.numjobs, thread_name_prefix="job_worker") as executor:
+                workers = list(executor.map(self._run_worker, range(job.numjobs)))
+
+        if self.stop_event and self.stop_event.is_set():
+            return False, "Test stopped by user"
+
+        passed = True
+        lines = [f"{job.describe()} (seed {self.seed})"]
+        for op in ("write", "read"):
+            stats = [worker[op] for worker in workers if worker[op].io_count]
+            if not stats:
+                continue
+            # Workers run concurrently, aggregate rates are the sum of worker rates
+            speed = sum(worker_stats.speed for worker_stats in stats)
+            iops = sum(worker_stats.iops for worker_stats in stats)
+            latency = LatencyHistogram()
+            for worker_stats in stats:
+                latency.merge(worker_stats.latency)
+            lines.append(f"{op}: {speed:.2f}MB/s, IOPS={iops:.0f}, latency {latency.summary()}")
+            if job.min_speed is not None and speed < job.min_speed:
+                lines.append(f"{op} speed below min_speed {job.min_speed}MB/s")
+                passed = False
+            if job.min_iops is not None and iops < job.min_iops:
+                lines.append(f"{op} IOPS below min_iops {job.min_iops}")
+                passed = False
+
+        if job.verify != "none":
+            failed = [(index, worker['report']) for index, worker in enumerate(workers)
+                      if not worker['report'].passed]
+            checked = sum(worker['report'].bytes_checked for worker in workers)
+            if failed:
+                passed = False
+                lines.extend(f"verify worker {index}: {report.summary()}" for index, report in failed[:5])
+            else:
+                lines.append(f"verify: {checked} bytes verified, no mismatch")
+        return passed, "\n".join(lines)
+
+    def _worker_path(self, index):
+        """Preallocated test area file of a worker"""
+        name = re.sub(r'[^\w.-]', '_', self.job.name)
+        return self.test_area.file(f"job_{name}_{index}.bin", self.job.size)
+
+    def _run_worker(self, index):
+        """Run the job workload on the worker's own file with its own engine"""
+        job = self.job
+        path = self._worker_path(index)
+        stats = {'write': PhaseStats("write"), 'read': PhaseStats("read")}
+        report = MismatchReport()
+        if job.verify == "pattern":
+            pattern = PatternGenerator(self.seed, pass_number=index)
+            fill = pattern.fill
+
+            def consume(view, offset):
+                pattern.verify(view, offset, report)
+        else:
+            fill = StreamingDataGenerator(self.seed + index).fill
+            consume = None
+
+        if job.rw not in ("write", "rw"):
+            self._precondition(path, fill)
+        engine = self.backend.create_io_engine(queue_depth=job.iodepth, block_size=job.bs, engine=self.engine)
+        try:
+            if job.is_random:
+                results = engine.run_random(path, job.size, job.runtime or Job.DEFAULT_RANDOM_RUNTIME,
+                                            job.rwmixread, seed=self.seed + index, fill=fill,
+                                            consume=consume, stop_event=self.stop_event)
+                for op, result in results.items():
+                    stats[op].add(result)
+            else:
+                self._run_sequential(engine, path, fill, consume, stats, report)
+        finally:
+            engine.close()
+        return dict(stats, report=report)
+
+    def _run_sequential(self, engine, path, fill, consume, stats, report):
+        """Sequential passes over the file, repeated until runtime when it is set"""
+        job = self.job
+        deadline = time.perf_counter() + job.runtime if job.runtime else None
+        while True:
+            if job.rw in ("write", "rw"):
+                result = engine.run(path, "write", job.size, fill=fill, stop_event=self.stop_event, create=False)
+                stats['write'].add(result)
+                if result.stopped:
+                    break
+            if job.rw in ("read", "rw"):
+                result = engine.run(path, "read", job.size, consume=consume, stop_event=self.stop_event)
+                stats['read'].add(result)
+                if result.stopped:
+                    break
+                if consume:
+                    report.add_missing(result.bytes, job.size)
+            if deadline is None or time.perf_counter() >= deadline:
+                break
+
+    def _precondition(self, path, fill):
+        """Write the whole file once so reads hit written blocks, not measured"""
+        engine = self.backend.create_io_engine(queue_depth=4, block_size=PRECONDITION_BLOCK_SIZE, engine=self.engine)
+        try:
+            engine.run(path, "write", self.job.size, fill=fill, stop_event=self.stop_event, create=False)
+        finally:
+            engine.close()
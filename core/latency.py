@@ -0,0 +1,146 @@
+import math
+
+class LatencyHistogram:
+    """Log bucketed latency histogram with fixed memory cost (HDR histogram style)
+
+    Values are nanoseconds. Below 64ns every value has its own bucket, above
+    that every power of two range is split into 32 linear sub buckets, so any
+    recorded value is reproduced within 1/32 (~3%) whatever the range.
+    """
+    SUB_BUCKET_BITS = 5
+    SUB_BUCKET_COUNT = 1 << SUB_BUCKET_BITS
+    MAX_SHIFT = 44  # Up to ~2^50ns (13 days)
+
+    def __init__(self):
+        self.counts = [0] * ((self.MAX_SHIFT + 2) * self.SUB_BUCKET_COUNT)
+        self.count = 0
+        self.total = 0
+        self.min = 0
+        self.max = 0
+
+    def record(self, seconds):
+        """Record one latency sample in seconds"""
+        ns = int(seconds * 1000000000)
+        if ns < 0:
+            ns = 0
+        self.counts[self._index(ns)] += 1
+        if self.count == 0 or ns < self.min:
+            self.min = ns
+        if ns > self.max:
+            self.max = ns
+        self.count += 1
+        self.total += ns
+
+    def _index(self, ns):
+        shift = ns.bit_length() - self.SUB_BUCKET_BITS - 1
+        if shift <= 0:
+            return ns
+        shift = min(shift, self.MAX_SHIFT)
+        sub_bucket = min(ns >> shift, 2 * self.SUB_BUCKET_COUNT - 1)
+        return shift * self.SUB_BUCKET_COUNT + sub_bucket
+
+    def _value(self, index):
+        """Middle value (ns) of bucket index"""
+        if index < 2 * self.SUB_BUCKET_COUNT:
+            return index
+        shift = index // self.SUB_BUCKET_COUNT - 1
+        sub_bucket = index % self.SUB_BUCKET_COUNT + self.SUB_BUCKET_COUNT
+        return (sub_bucket << shift) + (1 << shift) // 2
+
+    def merge(self, other):
+        """Add all samples of another histogram"""
+        if not other.count:
+            return
+        for index, count in enumerate(other.counts):
+            if count:
+                self.counts[index] += count
+        if self.count == 0 or other.min < self.min:
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self):
+        """Compact JSON serializable form, only non empty buckets are kept"""
+        return {'counts': {index: count for index, count in enumerate(self.counts) if count},
+                'min': self.min, 'max': self.max, 'total': self.total}
+
+    @classmethod
+    def from_dict(cls, data):
+        histogram = cls()
+        for index, count in data['counts'].items():
+            histogram.counts[int(index)] = count
+        histogram.count = sum(data['counts'].values())
+        histogram.min = data['min']
+        histogram.max = data['max']
+        histogram.total = data['total']
+        return histogram
+
+    def percentile(self, percent):
+        """Latency (seconds) below which percent of samples fall"""
+        if not self.count:
+            return 0.0
+        target = max(1, math.ceil(self.count * percent / 100))
+        seen = 0
+        for index, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                # Clamp bucket value to the exact extremes
+                return min(max(self._value(index), self.min), self.max) / 1000000000
+        return self.max / 1000000000
+
+    @property
+    def mean(self):
+        return self.total / self.count / 1000000000 if self.count else 0.0
+
+    def summary(self):
+        """One line percentile summary"""
+        if not self.count:
+            return "no samples"
+        return (f"p50={format_latency(self.percentile(50))}, "
+                f"p90={format_latency(self.percentile(90))}, "
+                f"p99={format_latency(self.percentile(99))}, "
+                f"p99.9={format_latency(self.percentile(99.9))}, "
+                f"max={format_latency(self.max / 1000000000)}")
+
+class PhaseStats:
+    """Latency and IOPS of one I/O phase (e.g. QD32 read) accumulated over runs"""
+    def __init__(self, name):
+        self.name = name
+        self.latency = LatencyHistogram()
+        self.io_count = 0
+        self.bytes = 0
+        self.elapsed = 0.0
+
+    def add(self, result):
+        """Add an engine IOResult"""
+        self.latency.merge(result.latency)
+        self.io_count += result.io_count
+        self.bytes += result.bytes
+        self.elapsed += result.elapsed
+
+    def record(self, seconds):
+        """Add a single synchronous I/O"""
+        self.latency.record(seconds)
+        self.io_count += 1
+        self.elapsed += seconds
+
+    @property
+    def iops(self):
+        return self.io_count / self.elapsed if self.elapsed > 0 else 0.0
+
+    @property
+    def speed(self):
+        """Throughput in MB/s"""
+        return self.bytes / self.elapsed / (1024 * 1024) if self.elapsed > 0 else 0.0
+
+    def summary(self):
+        return f"{self.name}: IOPS={self.iops:.0f}, latency {self.latency.summary()}"
+
+def format_latency(seconds):
+    """Format latency with a unit suited to its magnitude"""
+    if seconds >= 1:
+        return f"{seconds:.2f}s"
+    if seconds >= 0.001:
+        return f"{seconds * 1000:.2f}ms"
+    return f"{seconds * 1000000:.0f}us"
@@ -0,0 +1,105 @@
+import time
+import threading
+import numpy as np
+
+class LiveMonitor:
+    """Live throughput and latency of the running I/O in fixed time windows
+
+    Engines call add() for every completion, from any thread. Every closed
+    window is one entry of a fixed size ring buffer (MB/s, mean and max
+    latency), so memory is the same for a minute or a day of testing and the
+    oldest windows are overwritten. Readers such as the GUI chart take a
+    snapshot() at their own rate, independent of the I/O rate.
+    """
+    def __init__(self, interval=0.1, capacity=36000):
+        """
+        Args:
+            interval: Window length in seconds
+            capacity: Windows kept, history is capacity x interval seconds
+        """
+        self.interval = interval
+        self.capacity = capacity
+        self._speed = np.zeros(capacity, dtype=np.float32)         # MB/s
+        self._latency = np.zeros(capacity, dtype=np.float32)       # Mean latency in seconds
+        self._latency_max = np.zeros(capacity, dtype=np.float32)   # Max latency in seconds
+        self._count = 0  # Windows closed since start
+        self._lock = threading.Lock()
+        self._window_end = None
+        self._stopped = False
+        self._bytes = 0
+        self._ios = 0
+        self._latency_sum = 0.0
+        self._latency_peak = 0.0
+
+    def add(self, nbytes, latency, now=None):
+        """Account a request of nbytes completed at now after latency seconds"""
+        now = now if now is not None else time.perf_counter()
+        with self._lock:
+            if self._window_end is None:
+                self._window_end = now + self.interval
+            self._advance(now)
+            self._bytes += nbytes
+            self._ios += 1
+            self._latency_sum += latency
+            self._latency_peak = max(self._latency_peak, latency)
+
+    def _advance(self, now):
+        """Close the windows ended before now, idle windows count as 0MB/s"""
+        if self._stopped or self._window_end is None or now < self._window_end:
+            return
+        index = self._count % self.capacity
+        self._speed[index] = self._bytes / self.interval / (1024 * 1024)
+        self._latency[index] = self._latency_sum / self._ios if self._ios else 0.0
+        self._latency_max[index] = self._latency_peak
+        self._count += 1
+        self._window_end += self.interval
+        self._bytes = self._ios = 0
+        self._latency_sum = self._latency_peak = 0.0
+        if now >= self._window_end:
+            # Idle gap, clear its windows in at most two slices whatever its length
+            idle = int((now - self._window_end) // self.interval) + 1
+            for start, end in _ring_slices(self._count, min(idle, self.capacity), self.capacity):
+                self._speed[start:end] = 0.0
+                self._latency[start:end] = 0.0
+                self._latency_max[start:end] = 0.0
+            self._count += idle
+            self._window_end += idle * self.interval
+
+    def stop(self):
+        """Close the running window, the snapshot no longer advances"""
+        with self._lock:
+            self._advance(time.perf_counter())
+            self._stopped = True
+
+    def snapshot(self):
+        """Windows of the ring buffer, oldest first
+        Returns:
+            (count, speed, latency, latency_max): count of windows closed since start (changes whenever new
+            windows closed), MB/s, mean and max latency in seconds of the kept windows
+        """
+        with self._lock:
+            self._advance(time.perf_counter())
+            kept = min(self._count, self.capacity)
+            order = np.arange(self._count - kept, self._count) % self.capacity
+            return self._count, self._speed[order], self._latency[order], self._latency_max[order]
+
+def _ring_slices(first, count, capacity):
+    """Index slices of count ring entries starting at entry number first"""
+    start = first % capacity
+    end = start + count
+    if end <= capacity:
+        return [(start, end)]
+    return [(start, capacity), (0, end - capacity)]
+
+def decimate(values, buckets):
+    """Min and max of values in each of buckets equal slices
+
+    Drawing the min/max envelope of one slice per pixel column keeps every
+    spike visible while the drawing cost depends on the chart width only.
+    Returns:
+        (mins, maxs), the values themselves when there are no more values than buckets
+    """
+    if len(values) <= buckets:
+        return values, values
+    edges = np.arange(buckets) * len(values) // buckets
+    return np.minimum.reduceat(values, edges), np.maximum.reduceat(values, edges)
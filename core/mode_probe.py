@@ -0,0 +1,131 @@
+import math
+import time
+from statistics import NormalDist, mean, stdev
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+def t_quantile(p, df):
+    """Student t quantile, exact for df 1 and 2, Cornish-Fisher expansion (within 1%) above"""
+    if df == 1:
+        return math.tan(math.pi * (p - 0.5))
+    if df == 2:
+        return (2 * p - 1) / math.sqrt(2 * p * (1 - p))
+    z = NormalDist().inv_cdf(p)
+    return (z + (z ** 3 + z) / (4 * df)
+            + (5 * z ** 5 + 16 * z ** 3 + 3 * z) / (96 * df ** 2)
+            + (3 * z ** 7 + 19 * z ** 5 + 17 * z ** 3 - 15 * z) / (384 * df ** 3))
+
+def t_cdf(t, df):
+    """Student t distribution function, exact for integer df (closed form series of A(t|df))"""
+    theta = math.atan(abs(t) / math.sqrt(df))
+    cos2 = math.cos(theta) ** 2
+    # A is the probability of |T| < t
+    if df % 2:
+        term = total = 1.0
+        for k in range(1, (df - 1) // 2):
+            term *= cos2 * (2 * k) / (2 * k + 1)
+            total += term
+        a = 2 / math.pi * (theta + (math.sin(theta) * math.cos(theta) * total if df > 1 else 0.0))
+    else:
+        term = total = 1.0
+        for k in range(1, df // 2):
+            term *= cos2 * (2 * k - 1) / (2 * k)
+            total += term
+        a = math.sin(theta) * total
+    return 0.5 + math.copysign(a / 2, t)
+
+class SpeedEstimate:
+    """Mean read speed of the probe passes with its confidence interval"""
+    def __init__(self, samples, level, elapsed):
+        self.samples = samples  # MB/s of every pass
+        self.level = level      # Two sided confidence level of the interval
+        self.elapsed = elapsed
+
+    @property
+    def count(self):
+        return len(self.samples)
+
+    @property
+    def speed(self):
+        return mean(self.samples) if self.samples else 0.0
+
+    @property
+    def stderr(self):
+        return stdev(self.samples) / math.sqrt(self.count) if self.count > 1 else math.inf
+
+    @property
+    def half_width(self):
+        """Half width of the confidence interval of the mean speed"""
+        if self.count < 2:
+            return math.inf
+        return t_quantile(0.5 + self.level / 2, self.count - 1) * self.stderr
+
+    def excludes(self, threshold):
+        return abs(self.speed - threshold) > self.half_width
+
+    def confidence(self, thresholds):
+        """Probability that the mean speed is on its measured side of every threshold
+
+        Uses the t distribution with count - 1 degrees of freedom, like the
+        interval that stops the probe.
+        """
+        if not self.samples:
+            return 0.0
+        if self.stderr == 0:
+            return 1.0
+        if math.isinf(self.stderr):
+            return 0.5
+        return min((t_cdf(abs(self.speed - threshold) / self.stderr, self.count - 1) for threshold in thresholds),
+                   default=1.0)
+
+    def summary(self):
+        return (f"{self.speed:.2f}MB/s ±{self.half_width:.2f} ({self.level:.0%} CI, "
+                f"{self.count} passes, {self.elapsed:.2f}s)")
+
+class AdaptiveSpeedProbe:
+    """Read passes over a probe file until the speed is clearly on one side of every threshold
+
+    Sampling stops once the confidence interval of the mean speed excludes
+    all mode thresholds (after min_samples passes), or when max_samples
+    passes or the time budget are used up. Clear cases finish after a few
+    passes, cards near a threshold get more passes and a reported confidence
+    below the level instead of a coin flip.
+    """
+    def __init__(self, engine, path, size, thresholds, level=0.95, min_samples=3, max_samples=20,
+                 time_budget=3.0):
+        """
+        Args:
+            engine: I/O engine used for the read passes
+            path: Probe file, already written
+            size: Bytes read per pass
+            thresholds: Mode speed thresholds (MB/s)
+            level: Confidence level of the interval (0-1)
+            min_samples/max_samples: Pass count limits
+            time_budget: Seconds after which sampling stops whatever the interval
+        """
+        if not 0 < level < 1:
+            raise ValueError(f"Confidence level must be between 0 and 1: {level}")
+        self.engine = engine
+        self.path = path
+        self.size = size
+        self.thresholds = thresholds
+        self.level = level
+        self.min_samples = max(2, min_samples)
+        self.max_samples = max(self.min_samples, max_samples)
+        self.time_budget = time_budget
+
+    def run(self):
+        """Returns SpeedEstimate of the measured passes"""
+        samples = []
+        start = time.perf_counter()
+        while True:
+            result = self.engine.run(self.path, "read", self.size)
+            samples.append(result.speed)
+            estimate = SpeedEstimate(samples, self.level, time.perf_counter() - start)
+            if estimate.count >= self.min_samples and all(estimate.excludes(t) for t in self.thresholds):
+                break
+            if estimate.count >= self.max_samples or estimate.elapsed >= self.time_budget:
+                logger.debug(f"Probe budget used up before the interval cleared the thresholds: {estimate.summary()}")
+                break
+        return estimate
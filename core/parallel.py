@@ -0,0 +1,191 @@
+import time
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait
+import numpy as np
+from core.io_engine import create_io_engine
+from core.patterns import StreamingDataGenerator
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+LAYOUTS = ("file", "range")
+
+class StreamCounters:
+    """Per worker byte and I/O counters in shared memory
+
+    Every worker only writes its own row, so no lock is needed: readers take a
+    snapshot and sum the rows. The rows live in a multiprocessing RawArray, so
+    worker processes update the same memory as worker threads do.
+    """
+    BYTES = 0
+    IOS = 1
+
+    def __init__(self, workers, raw=None):
+        self.workers = workers
+        self.raw = raw if raw is not None else multiprocessing.RawArray('q', workers * 2)
+        self.values = np.frombuffer(self.raw, dtype=np.int64).reshape(workers, 2)
+
+    def sink(self, index):
+        """Engine sampler hook of one worker"""
+        return WorkerCounter(self.values[index])
+
+    def snapshot(self):
+        """Copy of all rows, [worker][bytes, ios]"""
+        return self.values.copy()
+
+class WorkerCounter:
+    """Sampler compatible hook adding every completion to one counters row"""
+    def __init__(self, row):
+        self.row = row
+
+    def start(self, now=None):
+        pass
+
+    def add(self, nbytes, now=None):
+        self.row[StreamCounters.BYTES] += nbytes
+        self.row[StreamCounters.IOS] += 1
+
+    def stop(self, now=None):
+        pass
+
+class StreamPhase:
+    """Result of one phase (all workers reading or all writing concurrently)"""
+    def __init__(self, op, results, elapsed):
+        self.op = op
+        self.results = results  # IOResult per worker
+        self.elapsed = elapsed  # Wall time until the last worker finished
+
+    @property
+    def speed(self):
+        """Aggregate throughput in MB/s"""
+        total = sum(result.bytes for result in self.results)
+        return total / self.elapsed / (1024 * 1024) if self.elapsed > 0 else 0.0
+
+    @property
+    def worker_speeds(self):
+        return [result.speed for result in self.results]
+
+    @property
+    def stopped(self):
+        return any(result.stopped for result in self.results)
+
+class ParallelStreams:
+    """Sequential streams driven concurrently by N workers
+
+    Every worker has its own I/O engine and either its own file (layout "file")
+    or a disjoint range of one shared file (layout "range"). Workers are threads
+    by default; with processes=True they run in worker processes using the
+    native engine of the platform, which avoids GIL contention at high IOPS.
+    The files come from the TestArea of the session and are overwritten in
+    place, so the worker count sweep measures I/O rather than allocation.
+    """
+    def __init__(self, backend, test_area, workers, size, block_size, queue_depth,
+                 layout="file", processes=False, engine="auto", seed=None, stop_event=None):
+        if layout not in LAYOUTS:
+            raise ValueError(f"Unknown stream layout: {layout}, expected one of {', '.join(LAYOUTS)}")
+        if workers < 1:
+            raise ValueError(f"Worker count must be at least 1: {workers}")
+        self.backend = backend
+        self.test_area = test_area
+        self.workers = workers
+        self.size = size
+        self.block_size = block_size
+        self.queue_depth = queue_depth
+        self.layout = layout
+        self.processes = processes
+        self.engine = engine
+        self.seed = seed
+        self.stop_event = stop_event
+
+    def _target(self, index):
+        """(path, offset) of a worker, a preallocated test area file"""
+        if self.layout == "file":
+            return self.test_area.file(f"stream_{index}.bin", self.size), 0
+        # Workers write disjoint ranges of the shared file in place
+        return self.test_area.file("streams.bin", self.workers * self.size), index * self.size
+
+    def _specs(self, op):
+        specs = []
+        for index in range(self.workers):
+            path, offset = self._target(index)
+            specs.append({
+                'index': index, 'path': path, 'op': op, 'offset': offset, 'size': self.size,
+                'block_size': self.block_size, 'queue_depth': self.queue_depth, 'engine': self.engine,
+                'seed': None if self.seed is None else self.seed + index, 'create': False
+            })
+        return specs
+
+    def run(self, op, progress=None, interval=0.5):
+        """Run one phase with all workers concurrently
+        Args:
+            op: "read" or "write", reads expect a previous write phase
+            progress: Optional callback progress(aggregate MB/s, per worker MB/s list) every interval
+        Returns:
+            StreamPhase: Per worker results and aggregate throughput
+        """
+        counters = StreamCounters(self.workers)
+        specs = self._specs(op)
+        if self.processes:
+            worker_stop = multiprocessing.Event()
+            executor = ProcessPoolExecutor(max_workers=self.workers, initializer=_init_process_worker,
+                                           initargs=(counters.raw, self.workers, worker_stop))
+            # Start every worker process before timing, spawning is not part of the phase
+            list(executor.map(_process_ready, range(self.workers)))
+            start = time.perf_counter()
+            futures = [executor.submit(_process_stream, spec) for spec in specs]
+        else:
+            executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="stream")
+            start = time.perf_counter()
+            futures = [executor.submit(self._thread_stream, spec, counters) for spec in specs]
+
+        try:
+            last, last_time = counters.snapshot(), start
+            pending = futures
+            while pending:
+                _, pending = wait(pending, timeout=interval)
+                if self.processes and self.stop_event and self.stop_event.is_set():
+                    worker_stop.set()
+                if progress and pending:
+                    now, current = time.perf_counter(), counters.snapshot()
+                    delta = current[:, StreamCounters.BYTES] - last[:, StreamCounters.BYTES]
+                    speeds = delta / (now - last_time) / (1024 * 1024)
+                    progress(float(speeds.sum()), speeds.tolist())
+                    last, last_time = current, now
+            elapsed = time.perf_counter() - start
+            results = [future.result() for future in futures]
+        finally:
+            executor.shutdown(wait=True)
+        phase = StreamPhase(op, results, elapsed)
+        logger.debug(f"{self.workers} {op} streams: {phase.speed:.2f}MB/s aggregate, "
+                     f"per worker {', '.join(f'{speed:.2f}' for speed in phase.worker_speeds)}MB/s")
+        return phase
+
+    def _thread_stream(self, spec, counters):
+        engine = self.backend.create_io_engine(queue_depth=spec['queue_depth'], block_size=spec['block_size'],
+                                               engine=spec['engine'])
+        return _run_stream(spec, engine, counters, self.stop_event)
+
+def _run_stream(spec, engine, counters, stop_event):
+    """Transfer one worker's file or range, returns its IOResult"""
+    fill = StreamingDataGenerator(spec['seed']).fill if spec['op'] == "write" else None
+    try:
+        return engine.run(spec['path'], spec['op'], spec['size'], offset=spec['offset'], fill=fill,
+                          stop_event=stop_event, sampler=counters.sink(spec['index']), create=spec['create'])
+    finally:
+        engine.close()
+
+# Worker process state, set once per process by the pool initializer
+_process_counters = None
+_process_stop = None
+
+def _init_process_worker(raw, workers, stop_event):
+    global _process_counters, _process_stop
+    _process_counters = StreamCounters(workers, raw)
+    _process_stop = stop_event
+
+def _process_ready(index):
+    return index
+
+def _process_stream(spec):
+    engine = create_io_engine(queue_depth=spec['queue_depth'], block_size=spec['block_size'], engine=spec['engine'])
+    return _run_stream(spec, engine, _process_counters, _process_stop)
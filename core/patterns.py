@@ -0,0 +1,68 @@
+import os
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class StreamingDataGenerator:
+    """Seeded pseudo random data stream for write workloads
+
+    Fills I/O buffers in place through their memoryview, so a test of any size
+    only needs the engine's queue_depth x block_size buffers. SFC64 produces
+    several GB/s, far above card bandwidth, and compresses/deduplicates as
+    poorly as os.urandom data.
+    """
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'little')
+        self._bit_generator = np.random.SFC64(self.seed)
+        logger.debug(f"Streaming data generator seed: {self.seed}")
+
+    def fill(self, view, offset=0):
+        """Fill writable buffer view with the next bytes of the stream (engine fill callback)"""
+        buffer = np.frombuffer(view, dtype=np.uint8)
+        words = len(buffer) // 8
+        if words:
+            buffer[:words * 8].view(np.uint64)[:] = self._bit_generator.random_raw(words)
+        tail = len(buffer) - words * 8
+        if tail:
+            buffer[words * 8:] = np.frombuffer(
+                self._bit_generator.random_raw(1).tobytes()[:tail], dtype=np.uint8)
+
+class PatternGenerator:
+    """Deterministic block addressable data pattern
+
+    Bytes at any offset are a pure function of (seed, pass number, offset):
+    Philox4x64 is counter based, key is (seed, pass number) and the counter is
+    the 32 byte chunk index. Any block can be regenerated on its own, so
+    written data is verified without keeping a copy, also in a later
+    verify-only run after a power cycle.
+    """
+    CHUNK_SIZE = 32  # Bytes produced per Philox4x64 counter value
+
+    def __init__(self, seed=None, pass_number=0):
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'little')
+        self.pass_number = pass_number
+        self._key = [self.seed & 0xFFFFFFFFFFFFFFFF, pass_number & 0xFFFFFFFFFFFFFFFF]
+
+    def generate(self, offset, length):
+        """Return expected bytes of [offset, offset + length) as uint8 array"""
+        start = offset // self.CHUNK_SIZE
+        skip = offset - start * self.CHUNK_SIZE
+        words = (skip + length + 7) // 8
+        bit_generator = np.random.Philox(key=self._key, counter=start)
+        data = bit_generator.random_raw(words).view(np.uint8)
+        return data[skip:skip + length]
+
+    def fill(self, view, offset):
+        """Fill writable buffer view with the pattern of offset (engine fill callback)"""
+        np.frombuffer(view, dtype=np.uint8)[:] = self.generate(offset, len(view))
+
+    def verify(self, view, offset, report=None):
+        """Check buffer view read from offset against the pattern
+        Args:
+            report: Optional MismatchReport collecting mismatch location details
+        """
+        expected = self.generate(offset, len(view))
+        if report is not None:
+            return report.compare(view, expected, offset)
+        return np.array_equal(np.frombuffer(view, dtype=np.uint8), expected)
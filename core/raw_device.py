@@ -0,0 +1,73 @@
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WINDOW_ALIGNMENT = 1024 * 1024  # Window start and size, keeps every request erase block and sector aligned
+
+class RawDeviceError(Exception):
+    """Raw device mode refused by a safety interlock"""
+
+class RawWindow:
+    """Reserved LBA window of the card's physical device
+
+    Workloads address the window with offsets relative to its start, the
+    window checks that every region stays inside it, so test I/O never
+    reaches partitions of the card.
+    """
+    def __init__(self, device_path, offset, size):
+        self.device_path = device_path
+        self.offset = offset
+        self.size = size
+
+    def region(self, size, start=0):
+        """Absolute device offset of a size bytes region at start within the window"""
+        if start < 0 or start + size > self.size:
+            raise RawDeviceError(f"Region of {size / 1024 / 1024:.0f}MB at {start / 1024 / 1024:.0f}MB "
+                                 f"exceeds the {self.size / 1024 / 1024:.0f}MB raw window")
+        return self.offset + start
+
+    def describe(self):
+        return (f"raw device {self.device_path}, LBA {self.offset // 512}-{(self.offset + self.size) // 512 - 1} "
+                f"({self.size / 1024 / 1024:.0f}MB window)")
+
+def open_raw_window(backend, card_info, cfg):
+    """Reserve the test.raw window on the device of the detected card
+
+    Interlocks, any failure raises RawDeviceError:
+        - test.raw.confirm names the detected card, by serial number or device path
+        - The window is 1MB aligned and inside the device
+        - The window does not overlap any partition of the device
+    Returns:
+        RawWindow
+    """
+    device_path = card_info.device_path
+    confirm = str(cfg.get('test.raw.confirm', '') or '').strip()
+    identities = {value.strip().lower() for value in (card_info.serial, device_path) if value and value.strip()}
+    if not confirm or confirm.lower() not in identities:
+        raise RawDeviceError(f"test.raw.confirm must name the card to overwrite, serial number "
+                             f"\"{card_info.serial or ''}\" or device path \"{device_path}\"")
+
+    size = int(cfg.get('test.raw.window_size', 1024) * 1024 * 1024)
+    disk_size = backend.get_disk_size(device_path)
+    window_offset = cfg.get('test.raw.window_offset', None)
+    if window_offset is None:
+        # Last aligned window of the device
+        offset = (disk_size - size) // WINDOW_ALIGNMENT * WINDOW_ALIGNMENT
+    else:
+        offset = int(window_offset * 1024 * 1024)
+    if size <= 0 or size % WINDOW_ALIGNMENT or offset % WINDOW_ALIGNMENT:
+        raise RawDeviceError("Raw window offset and size must be positive multiples of 1MB")
+    if offset < 0 or offset + size > disk_size:
+        raise RawDeviceError(f"Raw window {offset // 1024 // 1024}-{(offset + size) // 1024 // 1024}MB "
+                             f"outside of the {disk_size / 1024 / 1024:.0f}MB device {device_path}")
+
+    for partition_offset, partition_size in backend.list_partitions(device_path):
+        if offset < partition_offset + partition_size and partition_offset < offset + size:
+            raise RawDeviceError(f"Raw window {offset // 1024 // 1024}-{(offset + size) // 1024 // 1024}MB overlaps "
+                                 f"partition at {partition_offset // 1024 // 1024}-"
+                                 f"{(partition_offset + partition_size) // 1024 // 1024}MB, "
+                                 f"leave unpartitioned space on the card for the window")
+
+    window = RawWindow(device_path, offset, size)
+    logger.warning(f"Raw device mode enabled, data in {window.describe()} is overwritten")
+    return window
@@ -0,0 +1,107 @@
+import os
+from datetime import datetime
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class RunningStats:
+    """Count, min, mean and max of a value without keeping the values"""
+    def __init__(self):
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = None
+
+    def add(self, value):
+        self.count += 1
+        self.total += value
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    @property
+    def mean(self):
+        return self.total / self.count if self.count else 0.0
+
+class ReportWriter:
+    """Text test report written round by round
+
+    The header goes out when the run starts, every finished round is appended
+    with the running pass/fail counts and min/mean/max throughput of every
+    phase, and finish() appends the summary footer. The report of a run
+    killed at any point holds all rounds finished so far; memory holds only
+    the running aggregates, whatever the number of rounds.
+    """
+    def __init__(self, output_path, config):
+        self.output_path = output_path
+        self.config = config
+        self.loop_enabled = config.get('test.loop.enabled', False)
+        self.loop_count = config.get('test.loop.count', 1) if self.loop_enabled else 1
+        self.rounds = 0
+        self.passed_rounds = 0
+        self.throughput = {}  # (test, phase) -> RunningStats of MB/s
+        self._write(self._header(), mode='w')
+
+    def _write(self, text, mode='a'):
+        with open(self.output_path, mode, encoding='utf-8') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _header(self):
+        config = self.config
+        lines = ["=== SD Express Tester Test Report ===",
+                 f"Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}",
+                 "",
+                 "Test configuration:",
+                 f"- Loop test: {'Enabled' if self.loop_enabled else 'Disabled'}"]
+        if self.loop_enabled:
+            lines.append(f"- Loop count: {self.loop_count}")
+        lines.extend([f"- Total size of performance test: {config.get('test.performance.total_size')}MB",
+                      f"- Performance test block size: {config.get('test.performance.block_size')}MB",
+                      f"- Performance test iterations: {config.get('test.performance.iterations')}",
+                      ""])
+        if not self.loop_enabled:
+            lines.append("Test results:")
+        return "\n".join(lines) + "\n"
+
+    def add_iteration(self, test, phase, queue_depth, iteration, result):
+        """Iteration callback of TestSuite, accumulates the throughput of every phase"""
+        self.throughput.setdefault((test, phase), RunningStats()).add(result.speed)
+
+    def add_round(self, round_number, results):
+        """Append the results of a finished round"""
+        self.rounds += 1
+        if all(result.get('passed', False) for result in results.values()):
+            self.passed_rounds += 1
+        lines = []
+        if self.loop_enabled:
+            lines.append(f"\n=== Test round {round_number}/{self.loop_count} ===")
+        for test_name, result in results.items():
+            lines.append(f"\n{test_name}: {'Passed' if result['passed'] else 'Failed'}")
+            lines.extend(f"  {detail}" for detail in result['details'].split('\n') if detail.strip())
+        if self.loop_enabled:
+            lines.append(f"\nRunning totals after round {round_number}: {self.passed_rounds} passed, "
+                         f"{self.rounds - self.passed_rounds} failed")
+            lines.extend(self._throughput_lines())
+        self._write("\n".join(lines) + "\n")
+
+    def _throughput_lines(self):
+        return [f"  {test} {phase}: min={stats.min:.2f}MB/s, mean={stats.mean:.2f}MB/s, "
+                f"max={stats.max:.2f}MB/s ({stats.count} runs)"
+                for (test, phase), stats in self.throughput.items()]
+
+    def finish(self, stopped=False):
+        """Append the summary footer"""
+        lines = ["", "Test result summary:",
+                 f"- Total number of test rounds: {self.rounds}" +
+                 (f" of {self.loop_count}" if self.rounds < self.loop_count else ""),
+                 f"- Passed rounds: {self.passed_rounds}",
+                 f"- Failed rounds: {self.rounds - self.passed_rounds}"]
+        if self.throughput:
+            lines.append("- Throughput over all rounds:")
+            lines.extend(self._throughput_lines())
+        if stopped:
+            lines.append("- Test stopped before all rounds finished")
+        lines.append(f"Test end time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+        self._write("\n".join(lines) + "\n")
+        logger.info(f"Test report saved to: {self.output_path}")
@@ -0,0 +1,144 @@
+import os
+import json
+import glob
+import time
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+STORE_VERSION = 1
+CHUNK_ROWS = 4096      # Rows buffered per table before a chunk is written
+FLUSH_INTERVAL = 60.0  # Seconds, buffered rows are written at the end of a round once this old
+
+# Record types, test and phase columns are ids of strings.txt
+TABLES = {
+    # One row per test case of a round
+    'tests': np.dtype([('round', '<u4'), ('test', '<u4'), ('passed', '?'), ('start', '<f8'), ('duration', '<f4')]),
+    # One row per engine run (phase of an iteration)
+    'iterations': np.dtype([('round', '<u4'), ('test', '<u4'), ('phase', '<u4'), ('queue_depth', '<u2'),
+                            ('iteration', '<u4'), ('bytes', '<u8'), ('elapsed', '<f8'), ('speed', '<f4'),
+                            ('iops', '<f4'), ('p50', '<f4'), ('p99', '<f4'), ('max', '<f4')]),
+    # One row per throughput sampler window
+    'samples': np.dtype([('round', '<u4'), ('test', '<u4'), ('phase', '<u4'), ('iteration', '<u4'),
+                         ('time', '<f4'), ('speed', '<f4')]),
+}
+
+class ResultsStore:
+    """Append-only columnar store of typed test results
+
+    Rows of every table are buffered in a fixed size NumPy structured array
+    and written as numbered .npy chunks (<table>_00000.npy, ...), written
+    once and never rewritten, so memory stays flat over any number of rounds
+    and a crash loses at most the rows since the last flush. Test and phase
+    names are interned into strings.txt, one name per line, the line number
+    is the id used in the tables.
+    """
+    def __init__(self, directory, chunk_rows=CHUNK_ROWS):
+        self.directory = str(directory)
+        self.chunk_rows = chunk_rows
+        os.makedirs(self.directory, exist_ok=True)
+        schema_path = os.path.join(self.directory, "schema.json")
+        if not os.path.exists(schema_path):
+            with open(schema_path, 'w', encoding='utf-8') as f:
+                json.dump({'version': STORE_VERSION,
+                           'tables': {name: dtype.descr for name, dtype in TABLES.items()}}, f, indent=2)
+        self._strings = {name: index for index, name in enumerate(load_strings(self.directory))}
+        self._buffers = {name: np.zeros(chunk_rows, dtype=dtype) for name, dtype in TABLES.items()}
+        self._rows = dict.fromkeys(TABLES, 0)
+        self._chunks = {name: len(_chunk_paths(self.directory, name)) for name in TABLES}
+        self._last_flush = time.monotonic()
+
+    def intern(self, name):
+        """Id of a test or phase name"""
+        index = self._strings.get(name)
+        if index is None:
+            index = len(self._strings)
+            self._strings[name] = index
+            with open(os.path.join(self.directory, "strings.txt"), 'a', encoding='utf-8') as f:
+                f.write(name.replace("\n", " ") + "\n")
+        return index
+
+    def add_test(self, round_number, test, passed, start, duration):
+        self._append('tests', (round_number, self.intern(test), passed, start, duration))
+
+    def add_iteration(self, round_number, test, phase, queue_depth, iteration, result):
+        """Add an engine IOResult"""
+        latency = result.latency
+        self._append('iterations', (round_number, self.intern(test), self.intern(phase), queue_depth, iteration,
+                                    result.bytes, result.elapsed, result.speed, result.iops,
+                                    latency.percentile(50), latency.percentile(99), latency.max / 1000000000))
+
+    def add_samples(self, round_number, test, phase, iteration, sampler):
+        """Add the windows of a ThroughputSampler"""
+        speeds = sampler.speeds()
+        rows = np.zeros(len(speeds), dtype=TABLES['samples'])
+        rows['round'] = round_number
+        rows['test'] = self.intern(test)
+        rows['phase'] = self.intern(phase)
+        rows['iteration'] = iteration
+        rows['time'] = np.arange(len(speeds)) * sampler.interval
+        rows['speed'] = speeds
+        self._extend('samples', rows)
+
+    def _append(self, table, row):
+        if self._rows[table] == self.chunk_rows:
+            self._write_chunk(table)
+        self._buffers[table][self._rows[table]] = row
+        self._rows[table] += 1
+
+    def _extend(self, table, rows):
+        while len(rows):
+            if self._rows[table] == self.chunk_rows:
+                self._write_chunk(table)
+            count = min(len(rows), self.chunk_rows - self._rows[table])
+            self._buffers[table][self._rows[table]:self._rows[table] + count] = rows[:count]
+            self._rows[table] += count
+            rows = rows[count:]
+
+    def _write_chunk(self, table):
+        rows = self._rows[table]
+        if not rows:
+            return
+        path = os.path.join(self.directory, f"{table}_{self._chunks[table]:05d}.npy")
+        # Temporary name first, readers never see a partial chunk
+        temp_path = path + ".tmp"
+        with open(temp_path, 'wb') as f:
+            np.save(f, self._buffers[table][:rows])
+        os.replace(temp_path, path)
+        self._chunks[table] += 1
+        self._rows[table] = 0
+
+    def flush(self, max_age=0):
+        """Write buffered rows of every table, only if the last flush is older than max_age seconds"""
+        if time.monotonic() - self._last_flush < max_age:
+            return
+        for table in TABLES:
+            self._write_chunk(table)
+        self._last_flush = time.monotonic()
+
+    def close(self):
+        self.flush()
+
+def _chunk_paths(directory, table):
+    return sorted(glob.glob(os.path.join(glob.escape(str(directory)), f"{table}_[0-9]*.npy")))
+
+def load_strings(directory):
+    """Names of the ids used in the tables, index is the id"""
+    path = os.path.join(str(directory), "strings.txt")
+    if not os.path.exists(path):
+        return []
+    with open(path, 'r', encoding='utf-8') as f:
+        return [line.rstrip("\n") for line in f]
+
+def iter_chunks(directory, table):
+    """Yield the chunks of a table as memory mapped structured arrays"""
+    for path in _chunk_paths(directory, table):
+        yield np.load(path, mmap_mode='r')
+
+def load_table(directory, table):
+    """Whole table as one structured array"""
+    chunks = list(iter_chunks(directory, table))
+    if not chunks:
+        return np.zeros(0, dtype=TABLES[table])
+    return np.concatenate(chunks)
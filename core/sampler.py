@@ -0,0 +1,106 @@
+import os
+import time
+from array import array
+
+class ThroughputSampler:
+    """Throughput time series in fixed time windows
+
+    Completed bytes are accumulated into the current window, one float is kept
+    per window, so a one hour run at 100ms windows costs about 280KB.
+    """
+    def __init__(self, interval=0.1):
+        self.interval = interval
+        self.samples = array('d')  # Bytes completed in each window
+        self.last_window = interval  # Duration of the last (partial) window
+        self._start = None
+        self._window_end = None
+        self._bytes = 0
+
+    def start(self, now=None):
+        self._start = now if now is not None else time.perf_counter()
+        self._window_end = self._start + self.interval
+
+    def add(self, nbytes, now=None):
+        """Account nbytes completed at now"""
+        now = now if now is not None else time.perf_counter()
+        while now >= self._window_end:
+            self.samples.append(self._bytes)
+            self._bytes = 0
+            self._window_end += self.interval
+        self._bytes += nbytes
+
+    def stop(self, now=None):
+        """Close the current window"""
+        now = now if now is not None else time.perf_counter()
+        self.add(0, now)
+        duration = now - (self._window_end - self.interval)
+        if self.samples and duration < self.interval / 2:
+            # Too short to stand alone, fold into the previous window
+            self.samples[-1] += self._bytes
+            self.last_window = self.interval + duration
+        elif duration > 0:
+            self.samples.append(self._bytes)
+            self.last_window = duration
+        self._bytes = 0
+
+    def speeds(self):
+        """Throughput of every window in MB/s"""
+        speeds = [nbytes / self.interval / (1024 * 1024) for nbytes in self.samples]
+        if speeds:
+            speeds[-1] = self.samples[-1] / self.last_window / (1024 * 1024)
+        return speeds
+
+    def detect_steps(self, span=5, threshold=0.3):
+        """Find step changes of throughput (SLC cache exhaustion, thermal throttling)
+
+        Compares the mean of span windows before and after every window
+        boundary, a relative change above threshold is a step candidate and the
+        strongest candidate of each neighbourhood is reported.
+        Returns:
+            list: dict(time, offset, before, after) per step, speeds in MB/s
+        """
+        speeds = self.speeds()
+        if len(speeds) < 2 * span:
+            return []
+
+        prefix = [0.0]
+        for speed in speeds:
+            prefix.append(prefix[-1] + speed)
+
+        candidates = []
+        for i in range(span, len(speeds) - span + 1):
+            before = (prefix[i] - prefix[i - span]) / span
+            after = (prefix[i + span] - prefix[i]) / span
+            peak = max(before, after)
+            if peak > 0 and abs(after - before) / peak >= threshold:
+                candidates.append((abs(after - before) / peak, i, before, after))
+
+        steps = []
+        for change, i, before, after in sorted(candidates, reverse=True):
+            if all(abs(i - step_index) >= span for step_index, _ in steps):
+                steps.append((i, {
+                    'time': i * self.interval,
+                    'offset': int(sum(self.samples[:i])),
+                    'before': before,
+                    'after': after
+                }))
+        return [step for _, step in sorted(steps, key=lambda item: item[0])]
+
+    def write_csv(self, path, **labels):
+        """Append the series to a CSV file, one row per window
+
+        Args:
+            labels: Constant columns (e.g. round, phase) written in front of every row
+        """
+        new_file = not os.path.exists(path)
+        with open(path, 'a', encoding='utf-8') as f:
+            if new_file:
+                f.write(",".join(list(labels) + ['time_s', 'mb_per_s']) + "\n")
+            prefix = "".join(f"{value}," for value in labels.values())
+            for index, speed in enumerate(self.speeds()):
+                f.write(f"{prefix}{index * self.interval:.3f},{speed:.2f}\n")
+
+def format_steps(steps):
+    """Describe detected steps, one per line"""
+    return [f"throughput step at {step['time']:.1f}s ({step['offset']/1024/1024:.0f}MB): "
+            f"{step['before']:.1f} -> {step['after']:.1f}MB/s" for step in steps]
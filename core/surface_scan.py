@@ -0,0 +1,372 @@
+import os
+import time
+import bisect
+import numpy as np
+from core.verify import SECTOR_SIZE
+from core.sampler import ThroughputSampler
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+WORDS_PER_SECTOR = SECTOR_SIZE // 8
+MAX_REGIONS = 256  # Keep memory bounded on fake or badly corrupted cards
+PROGRESS_INTERVAL = 1.0  # Seconds between progress callbacks
+
+# Kinds of bad sectors, index is the kind code of SurfaceMap
+CORRUPTED = 0    # Holds its own LBA tag, but flipped bits
+ALIASED = 1      # Holds intact data written to another LBA: the card wraps or remaps addresses
+LOST = 2         # Holds no data of this scan at all (zeros, stale or foreign data)
+UNREADABLE = 3   # Read failed or returned short
+UNWRITTEN = 4    # Not written, the write phase failed before reaching it
+REGION_KINDS = ("corrupted", "aliased", "lost", "unreadable", "unwritten")
+
+_LBA_MIX = np.uint64(0x9E3779B97F4A7C15)
+
+class LbaPattern:
+    """Seeded data pattern tagging every 512 byte sector with its LBA
+
+    Word 0 of a sector is its LBA and word 1 the key of the scan, the other
+    words are a seeded random template XOR the LBA times a mixing constant.
+    Every sector is unique and regenerated from its LBA with two vectorized
+    passes, fast enough to keep up with SD Express sequential speed. A sector
+    read back with the scan key but another LBA holds data written elsewhere,
+    the signature of a fake capacity card.
+    """
+    def __init__(self, seed=None):
+        self.seed = seed if seed is not None else int.from_bytes(os.urandom(8), 'little')
+        words = np.random.SFC64(self.seed).random_raw(WORDS_PER_SECTOR + 1)
+        self.template = words[:WORDS_PER_SECTOR]
+        self.key = words[WORDS_PER_SECTOR]
+
+    def generate_into(self, sectors, first_lba):
+        """Write the pattern of the sectors starting at first_lba into a (n, 64) uint64 array
+        Returns:
+            LBA of every sector
+        """
+        lbas = np.arange(first_lba, first_lba + len(sectors), dtype=np.uint64)
+        np.bitwise_xor(self.template[None, :], (lbas * _LBA_MIX)[:, None], out=sectors)
+        sectors[:, 0] = lbas
+        sectors[:, 1] = self.key
+        return lbas
+
+    def fill(self, view, first_lba):
+        """Fill writable buffer view, a whole number of sectors, with the pattern of first_lba"""
+        self.generate_into(_sectors(view), first_lba)
+
+    def classify(self, actual, expected, lbas):
+        """Locate and classify the bad sectors of a block read back
+        Args:
+            actual/expected: (n, 64) uint64 arrays of the block
+            lbas: LBA of every sector
+        Returns:
+            (LBAs, kind codes, alias deltas) of the bad sectors, delta is source LBA - LBA for ALIASED
+        """
+        bad = np.flatnonzero((actual != expected).any(axis=1))
+        sectors = actual[bad]
+        found = sectors[:, 0]
+        own_key = sectors[:, 1] == self.key
+        # Is the sector intact data of the LBA its tag names?
+        intact = ((sectors[:, 2:] ^ (found * _LBA_MIX)[:, None]) == self.template[None, 2:]).all(axis=1)
+        aliased = own_key & intact & (found != lbas[bad])
+        kinds = np.where(own_key, CORRUPTED, LOST)
+        kinds[aliased] = ALIASED
+        deltas = np.where(aliased, found.astype(np.int64) - lbas[bad].astype(np.int64), 0)
+        return lbas[bad], kinds, deltas
+
+class SurfaceMap:
+    """Bad region map of a surface scan
+
+    Regions are [first_lba, last_lba, kind, delta] sorted by LBA, adjacent
+    sectors of the same kind (and the same alias delta) are merged whatever
+    order blocks complete in, beyond max_regions only the sector counts are
+    kept.
+    """
+    def __init__(self, max_regions=MAX_REGIONS):
+        self.max_regions = max_regions
+        self.regions = []
+        self._firsts = []  # First LBA of every region, bisect index of regions
+        self.dropped_regions = 0
+        self.sectors = [0] * len(REGION_KINDS)  # Bad sectors of each kind
+
+    @property
+    def bad_sectors(self):
+        return sum(self.sectors)
+
+    def count(self, kind):
+        return self.sectors[kind]
+
+    def add(self, lbas, kinds, deltas):
+        """Add bad sectors, LBAs ascending"""
+        if not len(lbas):
+            return
+        breaks = np.flatnonzero((np.diff(lbas.astype(np.int64)) != 1) | (np.diff(kinds) != 0) |
+                                (np.diff(deltas) != 0)) + 1
+        starts = np.concatenate(([0], breaks))
+        ends = np.concatenate((breaks, [len(lbas)])) - 1
+        for start, end in zip(starts.tolist(), ends.tolist()):
+            self._add_region(int(lbas[start]), int(lbas[end]), int(kinds[start]), int(deltas[start]))
+        for kind, count in enumerate(np.bincount(kinds, minlength=len(REGION_KINDS)).tolist()):
+            self.sectors[kind] += count
+
+    def add_range(self, first_lba, last_lba, kind):
+        """Add every sector of [first_lba, last_lba] as kind"""
+        if last_lba < first_lba:
+            return
+        self._add_region(first_lba, last_lba, kind, 0)
+        self.sectors[kind] += last_lba - first_lba + 1
+
+    def _add_region(self, first, last, kind, delta):
+        index = bisect.bisect(self._firsts, first)
+        previous = self.regions[index - 1] if index else None
+        following = self.regions[index] if index < len(self.regions) else None
+        joins_previous = previous and previous[1] + 1 == first and previous[2:] == [kind, delta]
+        joins_following = following and last + 1 == following[0] and following[2:] == [kind, delta]
+        if joins_previous and joins_following:
+            previous[1] = following[1]
+            del self.regions[index]
+            del self._firsts[index]
+        elif joins_previous:
+            previous[1] = last
+        elif joins_following:
+            following[0] = first
+            self._firsts[index] = first
+        elif len(self.regions) < self.max_regions:
+            self.regions.insert(index, [first, last, kind, delta])
+            self._firsts.insert(index, first)
+        else:
+            self.dropped_regions += 1
+
+    def alias_distances(self):
+        """Distinct alias distances in bytes, the wrap size of a fake capacity card"""
+        return sorted({abs(delta) * SECTOR_SIZE for _, _, kind, delta in self.regions if kind == ALIASED})
+
+    def describe(self, limit=16):
+        """One line per region"""
+        lines = []
+        for first, last, kind, delta in self.regions[:limit]:
+            line = (f"LBA {first}-{last} ({_format_size((last - first + 1) * SECTOR_SIZE)} at "
+                    f"{first * SECTOR_SIZE / 1024 ** 3:.2f}GB): {REGION_KINDS[kind]}")
+            if kind == ALIASED:
+                line += f", holds data of LBA {first + delta}-{last + delta}"
+            lines.append(line)
+        hidden = len(self.regions) - limit + self.dropped_regions
+        if hidden > 0:
+            lines.append(f"... {hidden} more regions")
+        return lines
+
+class ScanTarget:
+    """Range of a file or device covered by the scan, first_lba is the LBA of its first sector"""
+    def __init__(self, path, offset, size, first_lba, create=True):
+        self.path = path
+        self.offset = offset
+        self.size = size
+        self.first_lba = first_lba
+        self.create = create
+
+    @property
+    def last_lba(self):
+        return self.first_lba + self.size // SECTOR_SIZE - 1
+
+    def lba(self, offset):
+        """LBA of an offset within path"""
+        return self.first_lba + (offset - self.offset) // SECTOR_SIZE
+
+def file_targets(directory, total_size, file_size, block_size):
+    """Targets filling total_size bytes with files of file_size (h2testw style), sizes block aligned"""
+    file_size = max(block_size, file_size // block_size * block_size)
+    total_size = total_size // block_size * block_size
+    targets = []
+    for index, start in enumerate(range(0, total_size, file_size)):
+        size = min(file_size, total_size - start)
+        targets.append(ScanTarget(os.path.join(directory, f"surface_{index:05d}.bin"), 0, size,
+                                  start // SECTOR_SIZE))
+    return targets
+
+class SurfaceScanResult:
+    def __init__(self, seed, total_size):
+        self.seed = seed
+        self.total_size = total_size
+        self.map = SurfaceMap()
+        self.written = 0
+        self.verified = 0
+        self.write_time = 0.0
+        self.read_time = 0.0
+        self.write_error = None
+        self.stopped = False
+        self.write_sampler = None
+        self.read_sampler = None
+
+    @property
+    def passed(self):
+        return not self.stopped and self.write_error is None and self.map.bad_sectors == 0
+
+    @property
+    def write_speed(self):
+        return self.written / self.write_time / (1024 * 1024) if self.write_time > 0 else 0.0
+
+    @property
+    def read_speed(self):
+        return self.verified / self.read_time / (1024 * 1024) if self.read_time > 0 else 0.0
+
+    @property
+    def good_bytes(self):
+        return max(0, self.verified - (self.map.bad_sectors - self.map.count(UNWRITTEN)) * SECTOR_SIZE)
+
+    def verdict(self):
+        """Counterfeit / bad region diagnosis"""
+        if self.map.bad_sectors == 0 and self.write_error is None:
+            return "No errors, the whole scanned capacity holds data"
+        if self.map.bad_sectors == self.map.count(UNWRITTEN):
+            return f"Write failed after {self.written / 1024 ** 3:.2f}GB, the rest was not verified"
+        distances = self.map.alias_distances()
+        if distances:
+            return (f"FAKE CAPACITY: addresses wrap every {distances[0] / 1024 ** 3:.2f}GB, "
+                    f"real capacity is likely about {distances[0] / 1024 ** 3:.2f}GB")
+        first_bad = min(first for first, *_ in self.map.regions) if self.map.regions else 0
+        lost = self.map.count(LOST) * SECTOR_SIZE
+        if lost > self.total_size / 2:
+            return (f"FAKE CAPACITY: {lost / 1024 ** 3:.2f}GB of written data lost, "
+                    f"data is intact only below {first_bad * SECTOR_SIZE / 1024 ** 3:.2f}GB")
+        return f"Bad regions found, first at {first_bad * SECTOR_SIZE / 1024 ** 3:.2f}GB"
+
+class SurfaceScan:
+    """Full capacity write-then-verify scan (h2testw/f3 style)
+
+    All targets are written with the LBA tagged pattern first and only read
+    back afterwards, so addresses a fake card wraps onto earlier data show up
+    as aliased sectors. Large sequential requests at queue depth keep the card
+    streaming; memory is the engine buffers, one expected block and the
+    bounded region map, whatever the capacity.
+    """
+    def __init__(self, backend, targets, block_size=4 * 1024 * 1024, queue_depth=4, engine="auto", seed=None,
+                 stop_event=None, sample_interval=0.1, progress_callback=None):
+        """
+        Args:
+            targets: ScanTarget list, LBAs ascending
+            progress_callback: Optional progress_callback(phase, done_bytes, total_bytes, speed)
+        """
+        self.backend = backend
+        self.targets = targets
+        self.block_size = block_size
+        self.queue_depth = queue_depth
+        self.engine_name = engine
+        self.pattern = LbaPattern(seed)
+        self.stop_event = stop_event
+        self.sample_interval = sample_interval
+        self.progress_callback = progress_callback
+        self._expected = np.empty((block_size // SECTOR_SIZE, WORDS_PER_SECTOR), dtype=np.uint64)
+
+    def run(self):
+        """Returns SurfaceScanResult"""
+        result = SurfaceScanResult(self.pattern.seed, sum(target.size for target in self.targets))
+        written = self._write(result)
+        if not result.stopped:
+            self._verify(result, written)
+        return result
+
+    def _stopped(self):
+        return self.stop_event is not None and self.stop_event.is_set()
+
+    def _write(self, result):
+        """Write phase, returns the targets written completely"""
+        result.write_sampler = ThroughputSampler(self.sample_interval)
+        written = []
+        engine = self.backend.create_io_engine(queue_depth=self.queue_depth, block_size=self.block_size,
+                                               engine=self.engine_name)
+        progress = _Progress(self.progress_callback, "write", result.total_size)
+        try:
+            for index, target in enumerate(self.targets):
+                if self._stopped():
+                    result.stopped = True
+                    break
+
+                def fill(view, offset, target=target):
+                    self.pattern.fill(view, target.lba(offset))
+                    progress.add(len(view))
+
+                try:
+                    run = engine.run(target.path, "write", target.size, offset=target.offset, fill=fill,
+                                     stop_event=self.stop_event, sampler=result.write_sampler,
+                                     create=target.create)
+                except OSError as e:
+                    # Typically the card is full or rejects writes above its real capacity
+                    logger.error(f"Surface scan write failed at {target.path}: {str(e)}")
+                    result.write_error = f"write of {os.path.basename(target.path)} failed: {str(e)}"
+                    for unwritten in self.targets[index:]:
+                        result.map.add_range(unwritten.first_lba, unwritten.last_lba, UNWRITTEN)
+                    break
+                result.written += run.bytes
+                result.write_time += run.elapsed
+                if run.stopped:
+                    result.stopped = True
+                    break
+                written.append(target)
+        finally:
+            engine.close()
+        return written
+
+    def _verify(self, result, targets):
+        """Read phase, every sector is compared with its regenerated pattern"""
+        result.read_sampler = ThroughputSampler(self.sample_interval)
+        engine = self.backend.create_io_engine(queue_depth=self.queue_depth, block_size=self.block_size,
+                                               engine=self.engine_name)
+        progress = _Progress(self.progress_callback, "verify", sum(target.size for target in targets))
+        try:
+            for target in targets:
+                if self._stopped():
+                    result.stopped = True
+                    break
+
+                def consume(view, offset, target=target):
+                    actual = _sectors(view)
+                    expected = self._expected[:len(actual)]
+                    lbas = self.pattern.generate_into(expected, target.lba(offset))
+                    if not np.array_equal(actual, expected):
+                        result.map.add(*self.pattern.classify(actual, expected, lbas))
+                    progress.add(len(view))
+
+                try:
+                    run = engine.run(target.path, "read", target.size, offset=target.offset, consume=consume,
+                                     stop_event=self.stop_event, sampler=result.read_sampler)
+                except OSError as e:
+                    logger.error(f"Surface scan read failed at {target.path}: {str(e)}")
+                    result.map.add_range(target.first_lba, target.last_lba, UNREADABLE)
+                    result.verified += target.size
+                    continue
+                result.verified += run.bytes
+                result.read_time += run.elapsed
+                if run.stopped:
+                    result.stopped = True
+                    break
+                if run.bytes < target.size:
+                    result.map.add_range(target.first_lba + run.bytes // SECTOR_SIZE, target.last_lba, UNREADABLE)
+                    result.verified += target.size - run.bytes
+        finally:
+            engine.close()
+
+def _format_size(nbytes):
+    if nbytes >= 1024 ** 3:
+        return f"{nbytes / 1024 ** 3:.2f}GB"
+    if nbytes >= 1024 * 1024:
+        return f"{nbytes / 1024 / 1024:.1f}MB"
+    return f"{nbytes / 1024:.1f}KB"
+
+def _sectors(view):
+    return np.frombuffer(view, dtype=np.uint64).reshape(-1, WORDS_PER_SECTOR)
+
+class _Progress:
+    """Rate limited progress callback of one scan phase"""
+    def __init__(self, callback, phase, total):
+        self.callback = callback
+        self.phase = phase
+        self.total = total
+        self.done = 0
+        self._start = time.perf_counter()
+        self._next = self._start + PROGRESS_INTERVAL
+
+    def add(self, nbytes):
+        self.done += nbytes
+        now = time.perf_counter()
+        if self.callback and now >= self._next:
+            self._next = now + PROGRESS_INTERVAL
+            self.callback(self.phase, self.done, self.total, self.done / (now - self._start) / (1024 * 1024))
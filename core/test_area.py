@@ -0,0 +1,48 @@
+import os
+import time
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class TestArea:
+    """Pool of preallocated test files reused by the workloads of a session
+
+    Every named file is allocated once, at its largest requested size, so
+    timed writes overwrite allocated clusters instead of growing the file,
+    and no file is created or deleted between iterations. The files are
+    removed by release() at the end of the session.
+    """
+    def __init__(self, backend, directory):
+        self.backend = backend
+        self.directory = directory
+        self._sizes = {}  # File name -> allocated bytes
+
+    def file(self, name, size):
+        """Path of the preallocated file name of at least size bytes"""
+        path = os.path.join(self.directory, name)
+        if self._sizes.get(name, -1) < size or not os.path.exists(path):
+            os.makedirs(self.directory, exist_ok=True)
+            start = time.perf_counter()
+            self.backend.preallocate(path, size)
+            self._sizes[name] = size
+            logger.debug(f"Preallocated {name} ({size / 1024 / 1024:.1f}MB) in {time.perf_counter() - start:.2f}s")
+        return path
+
+    def names(self):
+        return set(self._sizes)
+
+    def release(self):
+        """Remove the pool files, and the directory once empty"""
+        for name in list(self._sizes):
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"Failed to remove test area file {name}: {str(e)}")
+            del self._sizes[name]
+        try:
+            if os.path.isdir(self.directory) and not os.listdir(self.directory):
+                os.rmdir(self.directory)
+        except Exception as e:
+            logger.error(f"Failed to remove test area directory: {str(e)}")
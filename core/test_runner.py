@@ -0,0 +1,61 @@
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+class TestRunner:
+    """Runs the configured test rounds of a TestSuite
+
+    Has no Qt dependency and only reports through the plain callbacks of
+    test_config, so the CLI calls run() directly while the GUI calls it from a
+    worker thread whose callbacks emit queued signals.
+    """
+    def __init__(self, test_suite, config):
+        self.test_suite = test_suite
+        self.config = config
+
+    @property
+    def loop_enabled(self):
+        return self.config.get('test.loop.enabled', False)
+
+    @property
+    def loop_count(self):
+        return self.config.get('test.loop.count', 1) if self.loop_enabled else 1
+
+    def stop(self):
+        """Request stop, the running test case returns at its next check"""
+        self.test_suite._stop_event.set()
+
+    def run(self, test_config, round_callback=None, round_finished=None):
+        """Run all rounds
+
+        Results of a round are handed to round_finished and not kept, so
+        memory does not grow with the loop count.
+        Args:
+            test_config: Test options and callbacks passed to TestSuite.run_tests
+            round_callback: Optional round_callback(round, count), called before each round of a loop test
+            round_finished: Optional round_finished(round, results), called with the results of every round
+        Returns:
+            int: Number of finished rounds
+        """
+        rounds = 0
+        # Preallocated test files are reused by every round and removed after the last one
+        self.test_suite.begin_session()
+        try:
+            for i in range(self.loop_count):
+                if self.test_suite._stop_event.is_set():
+                    logger.info("Test stopped by user, exit loop")
+                    break
+                if self.loop_enabled:
+                    logger.info(f"Starting test {i+1}/{self.loop_count}")
+                    if round_callback:
+                        round_callback(i + 1, self.loop_count)
+
+                results = self.test_suite.run_tests(test_config)
+                if not results:
+                    break
+                rounds += 1
+                if round_finished:
+                    round_finished(rounds, results)
+        finally:
+            self.test_suite.end_session()
+        return rounds
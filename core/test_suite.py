@@ -1,19 +1,36 @@
 import time
 import os
+import json
 import random
+from functools import partial
 from threading import Event
 from utils.logger import get_logger
 from core.controller import ControllerType
-import win32file
-import winerror
+from core.patterns import StreamingDataGenerator, PatternGenerator
+from core.verify import MismatchReport
+from core.latency import PhaseStats
+from core.sampler import ThroughputSampler, format_steps
+from core.jobs import JobRunner, load_jobs
+from core.parallel import ParallelStreams
+from core.raw_device import open_raw_window, RawDeviceError
+from core.test_area import TestArea
+from core.surface_scan import SurfaceScan, ScanTarget, file_targets, REGION_KINDS
+from core.endurance import EnduranceTest, create_checkpoint
+from core.results_store import ResultsStore, FLUSH_INTERVAL
 from utils.config import config
 
 logger = get_logger(__name__)
 
+STABILITY_SLOTS = 4  # Stability iterations rotate over this many preallocated files
+STABILITY_MAX_SIZE = 2 * 1024 * 1024
+# Keys of test.workloads, in run order
+WORKLOADS = ("controller", "basic", "performance", "iops", "stability", "parallel", "surface", "endurance", "jobs")
+
 class TestCase:
-    def __init__(self, name, func):
+    def __init__(self, name, func, timed=True):
         self.name = name
         self.func = func
+        self.timed = timed  # Counts against test.timeout, long tests with their own bounds are exempt
         self.passed = False
         self.details = ""
 
@@ -23,19 +40,63 @@ class TestSuite:
         self._stop_event = Event()
         self.test_cases = []
         self.card_ops = card_ops
+        self.backend = card_ops.backend
         self.config = config #from utils.config import config
         self.timeout = self.config.get('test.timeout', 600)  # 默认单轮10分钟超时
         self.start_time = None
+        self.round = 0  # Number of run_tests calls, labels time series of loop tests
+        self.raw_window = None  # RawWindow of the card in raw device mode (test.raw)
+        self.test_area = None  # Preallocated test files, kept across the rounds of a session
+        self.results_store = None  # ResultsStore of config['results_path'], kept across the rounds of a session
+        self._current_test = None
+        self._session = False
         self._setup_test_cases()
     
     def _setup_test_cases(self):
-        """Setup test cases"""
-        self.test_cases = [
-            TestCase("Controller Detection", self._test_controller),
-            TestCase("Basic Read/Write", self._test_basic_rw),
-            TestCase("Performance Test", self._test_performance),
-            TestCase("Stability Test", self._test_stability)
-        ]
+        """Setup test cases
+
+        test.workloads selects test cases by WORKLOADS key, a selected
+        optional test runs even when its enabled flag is off. Without a
+        selection the default tests and the enabled optional tests run.
+        """
+        workloads = self.config.get('test.workloads', []) or []
+        if isinstance(workloads, str):
+            workloads = [name.strip() for name in workloads.split(',') if name.strip()]
+        unknown = [name for name in workloads if name not in WORKLOADS]
+        if unknown:
+            message = f"Unknown workloads {', '.join(map(str, unknown))}, valid: {', '.join(WORKLOADS)}"
+            logger.error(f"Invalid test.workloads configuration: {message}")
+            self.test_cases = [TestCase("Workload Selection", lambda config: (False, message))]
+            return
+
+        def selected(name, default=True):
+            return name in workloads if workloads else default
+
+        self.test_cases = []
+        for name, test_name, func in (("controller", "Controller Detection", self._test_controller),
+                                      ("basic", "Basic Read/Write", self._test_basic_rw),
+                                      ("performance", "Performance Test", self._test_performance),
+                                      ("iops", "Random IOPS Test", self._test_random_iops),
+                                      ("stability", "Stability Test", self._test_stability)):
+            if selected(name):
+                self.test_cases.append(TestCase(test_name, func))
+        if selected("parallel", self.config.get('test.parallel.enabled', False)):
+            self.test_cases.append(TestCase("Parallel Stream Test", self._test_parallel_streams))
+        if selected("surface", self.config.get('test.surface.enabled', False)):
+            self.test_cases.append(TestCase("Surface Scan", self._test_surface_scan, timed=False))
+        if selected("endurance", self.config.get('test.endurance.enabled', False)):
+            self.test_cases.append(TestCase("Endurance Test", self._test_endurance, timed=False))
+        if not selected("jobs"):
+            return
+        # Workloads declared in test.jobs run after the built-in tests
+        try:
+            jobs = load_jobs(self.config.get('test.jobs', []))
+        except (ValueError, TypeError) as e:
+            logger.error(f"Invalid test.jobs configuration: {str(e)}")
+            self.test_cases.append(TestCase("Job Configuration", lambda config, error=str(e): (False, error)))
+            return
+        for job in jobs:
+            self.test_cases.append(TestCase(f"Job {job.name}", partial(self._run_job, job)))
     
     def _get_test_path(self):
         """Get test path on current SD card"""
@@ -43,40 +104,52 @@ class TestSuite:
         if not card_info:
             raise Exception("No SD card detected")
         return os.path.join(card_info.drive_letter, "test_files")
+    
+    def _get_verify_path(self):
+        """Get path of files kept on the card for a later verify-only pass"""
+        card_info = self.card_ops.check_card()
+        if not card_info:
+            raise Exception("No SD card detected")
+        return os.path.join(card_info.drive_letter, "verify_files")
         
-    def _show_test_details(self, test_name, details):
-        """Format test details"""
-        if test_name == "Controller Detection":
-            return f"Detect controller type and working mode: {details}"
-            
-        elif test_name == "Basic Read/Write":
-            return (f"Execute basic read/write test:\n"
-                   f"- Write 1MB random data\n"
-                   f"- Read and verify data integrity\n"
-                   f"Result: {details}")
-            
-        elif test_name == "Performance Test":
-            lines = details.split('\n')
-            result = "Execute performance test:\n"
-            for line in lines:
-                if line:
-                    size, speeds = line.split("test", 1)
-                    result += f"- {size}MB data test:\n"
-                    result += f"  {speeds}\n"
-            return result
-            
-        elif test_name == "Stability Test":
-            if "error" in details.lower():
-                return f"Execute stability test:\n- Random size(512KB-2MB) read/write test\n{details}"
-            else:
-                return f"Execute stability test:\n- Random size(512KB-2MB) read/write test\n- {details}"
-                
-        return details
+    def begin_session(self):
+        """Keep the test area across run_tests calls until end_session"""
+        self._session = True
+
+    def end_session(self):
+        self._session = False
+        self._release_test_area()
+        self._close_results_store()
+
+    def _close_results_store(self):
+        if self.results_store:
+            self.results_store.close()
+            self.results_store = None
+
+    def _record_iteration(self, config, phase, queue_depth, iteration, result):
+        """Pass an engine result of the running test to the results store and the iteration callback"""
+        if self.results_store:
+            self.results_store.add_iteration(self.round, self._current_test, phase, queue_depth, iteration, result)
+        if 'iteration_callback' in config:
+            config['iteration_callback'](self._current_test, phase, queue_depth, iteration, result)
+
+    def _record_samples(self, config, phase, iteration, sampler):
+        """Save a throughput series to the CSV file and the results store"""
+        if 'series_path' in config:
+            sampler.write_csv(config['series_path'], round=self.round, phase=phase, iteration=iteration)
+        if self.results_store:
+            self.results_store.add_samples(self.round, self._current_test, phase, iteration, sampler)
+
+    def _release_test_area(self):
+        if self.test_area:
+            self.test_area.release()
+            self.test_area = None
 
     def run_tests(self, config):
         """Run test cases"""
         self._running = True
         self._stop_event.clear()
+        self.round += 1
         results = {}
         
         # Update status
@@ -93,10 +166,32 @@ class TestSuite:
             return result
             
         logger.info(f"Test target: {card_info}")
+
+        # Raw device mode never falls back to test files, a refused interlock fails the round
+        self.raw_window = None
+        if self.config.get('test.raw.enabled', False):
+            try:
+                self.raw_window = open_raw_window(self.backend, card_info, self.config)
+            except (RawDeviceError, OSError, ValueError) as e:
+                logger.error(f"Raw device mode refused: {str(e)}")
+                result = {"Raw Device Mode": {"passed": False, "details": f"Raw device mode refused: {str(e)}"}}
+                if 'result_callback' in config:
+                    config['result_callback'](result)
+                return result
+        
+        # Typed records of the round are streamed to the results store of the run
+        results_path = config.get('results_path')
+        if results_path and (not self.results_store or self.results_store.directory != str(results_path)):
+            self._close_results_store()
+            self.results_store = ResultsStore(results_path)
         
-        # Create test directory
+        # Create test directory, the test area moves with it when the card changed
         test_dir = self._get_test_path()
         os.makedirs(test_dir, exist_ok=True)
+        if self.test_area and self.test_area.directory != test_dir:
+            self._release_test_area()
+        if not self.test_area:
+            self.test_area = TestArea(self.backend, test_dir)
         
         
         try:
@@ -109,18 +204,21 @@ class TestSuite:
                     logger.info("Test stopped manually")
                     break
 
+                self._current_test = test_case.name
+                test_start = time.time()
                 try:
                     # 每个测试子项开始前都检查本轮测试是否已超时
-                    self._check_timeout()
+                    if test_case.timed:
+                        self._check_timeout()
                     # Update status
                     if 'status_callback' in config:
                         config['status_callback'](f"Executing test: {test_case.name}")
-                    # Handle UI event loop, update status bar in real time
-                    if 'event_loop' in config:
-                        config['event_loop'].processEvents()
 
                     logger.info(f"Executing test case: {test_case.name}")
                     test_case.passed, test_case.details = test_case.func(config)
+                    if self.results_store:
+                        self.results_store.add_test(self.round, test_case.name, test_case.passed, test_start,
+                                                    time.time() - test_start)
                     
                     # Update progress
                     if 'progress_callback' in config:
@@ -141,10 +239,6 @@ class TestSuite:
                         config['result_callback'](result)
 
                     logger.info(f"Test case {test_case.name} completed: {'Passed' if test_case.passed else 'Failed'}")                    
-                    
-                    # Handle UI event loop, avoid freezing the UI
-                    if 'event_loop' in config:
-                        config['event_loop'].processEvents()
 
                 except Exception as e:
                     logger.error(f"Test case {test_case.name} execution error: {str(e)}", exc_info=True)
@@ -157,166 +251,439 @@ class TestSuite:
                     results.update(result)
                     if 'result_callback' in config:
                         config['result_callback'](result)
+                    if self.results_store:
+                        self.results_store.add_test(self.round, test_case.name, False, test_start,
+                                                    time.time() - test_start)
 
                     # 如果是超时异常，终止测试
                     if isinstance(e, TestTimeoutError):
                         break
+                finally:
+                    # Surface scan and endurance are bounded by their own limits, their run time
+                    # does not use up the timeout of the tests after them
+                    if not test_case.timed:
+                        self.start_time += time.time() - test_start
                         
         finally:
-            # Clean up test files
+            # Clean up test files, test area files stay until the session ends
+            if not self._session:
+                self._release_test_area()
+                self._close_results_store()
+            elif self.results_store:
+                self.results_store.flush(FLUSH_INTERVAL)
             try:
                 if os.path.exists(test_dir):
+                    area_files = self.test_area.names() if self.test_area else set()
                     for file in os.listdir(test_dir):
+                        if file in area_files:
+                            continue
                         try:
                             os.remove(os.path.join(test_dir, file))
                         except Exception as e:
                             logger.error(f"Failed to clean up test files: {str(e)}")
-                    os.rmdir(test_dir)
+                    if not os.listdir(test_dir):
+                        os.rmdir(test_dir)
             except Exception as e:
                 logger.error(f"Failed to clean up test directory: {str(e)}")
         
         self._running = False
         return results
     
+    def _io_target(self, file_name, size):
+        """Return (path, offset, create) of a workload: a test area file, or the raw window in raw mode"""
+        if self.raw_window:
+            return self.raw_window.device_path, self.raw_window.region(size), False
+        return self.test_area.file(file_name, size), 0, False
+
     def _test_performance(self, config):
-        """Performance test"""
+        """Performance test, sequential read/write at each configured queue depth"""
         try:
             # Get parameters from configuration file
-            total_size = config.get('test.performance.total_size', 128) * 1024 * 1024  # Convert to bytes
-            block_size = config.get('test.performance.block_size', 1) * 1024 * 1024
-            iterations = config.get('test.performance.iterations', 3)
+            total_size = self.config.get('test.performance.total_size', 128) * 1024 * 1024  # Convert to bytes
+            block_size = self.config.get('test.performance.block_size', 1) * 1024 * 1024
+            iterations = self.config.get('test.performance.iterations', 3)
+            queue_depths = self.config.get('test.performance.queue_depths', [1])
+            engine_name = self.config.get('test.performance.io_engine', 'auto')
+            seed = self.config.get('test.performance.seed', None)
+            sample_interval = self.config.get('test.performance.sample_interval_ms', 100) / 1000
             
             results = []
-            test_sizes = [total_size]
+            steps = []
+            qd_speeds = {}
+            size = total_size
             
             # Get test path
-            test_dir = self._get_test_path()
-            test_file = os.path.join(test_dir, "perf_test.bin")
-            
-            # Import needed Windows API
-            import win32file
+            path, offset, create = self._io_target("perf_test.bin", size)
+            if self.raw_window:
+                results.append(f"Target: {self.raw_window.describe()}")
             
-            for size in test_sizes:
+            for qd in queue_depths:
                 if self._stop_event.is_set():
                     return False, "Test stopped by user"
                     
                 total_write_speed = 0
                 total_read_speed = 0
+                write_stats = PhaseStats(f"QD{qd} write")
+                read_stats = PhaseStats(f"QD{qd} read")
                 
-                msg = f"Starting {size/1024/1024}MB performance test"
+                msg = f"Starting {size/1024/1024}MB performance test, queue depth {qd}"
                 logger.info(msg)
                 
-                for i in range(iterations):
-                    if self._stop_event.is_set():
-                        return False, "Test stopped by user"
-                        
-                    # Generate random data
-                    data = os.urandom(size)
-                    
-                    # Write speed test
-                    handle = None
-                    try:
-                        handle = win32file.CreateFile(
-                            test_file,
-                            win32file.GENERIC_WRITE,
-                            0,  # Not shared
-                            None,
-                            win32file.CREATE_ALWAYS,
-                            win32file.FILE_FLAG_NO_BUFFERING | 
-                            win32file.FILE_FLAG_WRITE_THROUGH |
-                            win32file.FILE_FLAG_SEQUENTIAL_SCAN,
-                            None
-                        )
-                        
-                        start_time = time.perf_counter()
-                        for offset in range(0, len(data), block_size):
-                            block = data[offset:offset + block_size]
-                            win32file.WriteFile(handle, block)
+                engine = self.backend.create_io_engine(queue_depth=qd, block_size=block_size, engine=engine_name)
+                try:
+                    for i in range(iterations):
+                        if self._stop_event.is_set():
+                            return False, "Test stopped by user"
                             
-                        write_time = time.perf_counter() - start_time
-                        write_speed = size / write_time / (1024 * 1024)
+                        # Random data is generated block by block into the engine buffers
+                        generator = StreamingDataGenerator(seed)
+                        
+                        # Write speed test
+                        write_sampler = ThroughputSampler(sample_interval)
+                        write_result = engine.run(path, "write", size, offset=offset, fill=generator.fill,
+                                                  stop_event=self._stop_event, sampler=write_sampler, create=create)
+                        write_speed = write_result.speed
                         total_write_speed += write_speed
+                        write_stats.add(write_result)
+                        self._record_iteration(config, f"QD{qd} write", qd, i + 1, write_result)
                         
-                    finally:
-                        if handle:
-                            handle.Close()
-                    
-                    # Wait for a while to ensure data is written
-                    time.sleep(1)
-                    
-                    # Read speed test
-                    handle = None
-                    try:
-                        handle = win32file.CreateFile(
-                            test_file,
-                            win32file.GENERIC_READ,
-                            0,  # Not shared
-                            None,
-                            win32file.OPEN_EXISTING,  # Use OPEN_EXISTING instead of CREATE_ALWAYS
-                            win32file.FILE_FLAG_NO_BUFFERING | 
-                            win32file.FILE_FLAG_SEQUENTIAL_SCAN |
-                            win32file.FILE_FLAG_OVERLAPPED,  # Enable asynchronous I/O
-                            None
-                        )
+                        # Wait for a while to ensure data is written
+                        time.sleep(1)
                         
-                        # Create an OVERLAPPED structure
-                        overlapped = win32file.OVERLAPPED()
-                        overlapped.Offset = 0
-                        overlapped.OffsetHigh = 0
+                        # Read speed test
+                        read_sampler = ThroughputSampler(sample_interval)
+                        read_result = engine.run(path, "read", size, offset=offset, stop_event=self._stop_event,
+                                                 sampler=read_sampler)
+                        read_speed = read_result.speed
+                        total_read_speed += read_speed
+                        read_stats.add(read_result)
+                        self._record_iteration(config, f"QD{qd} read", qd, i + 1, read_result)
                         
-                        buffer = win32file.AllocateReadBuffer(block_size)
-                        bytes_read = 0
-                        start_time = time.perf_counter()
+                        if write_result.stopped or read_result.stopped:
+                            return False, "Test stopped by user"
                         
-                        while bytes_read < size:
-                            # Use asynchronous read
-                            result, _ = win32file.ReadFile(handle, buffer, overlapped)
-                            if result == winerror.ERROR_IO_PENDING:
-                                # Wait for asynchronous operation to complete
-                                win32file.GetOverlappedResult(handle, overlapped, True)
-                            
-                            overlapped.Offset += block_size  # Update the next read position
-                            bytes_read += block_size
-                                
-                        read_time = time.perf_counter() - start_time
-                        read_speed = size / read_time / (1024 * 1024)
-                        total_read_speed += read_speed
+                        for phase, sampler in ((f"QD{qd} write", write_sampler), (f"QD{qd} read", read_sampler)):
+                            steps.extend(f"{phase} #{i+1}: {step}" for step in format_steps(sampler.detect_steps()))
+                            self._record_samples(config, phase, i + 1, sampler)
                         
-                    finally:
-                        if handle:
-                            handle.Close()
-                    
-                    msg = f"Test {i+1}: Read={read_speed:.2f}MB/s, Write={write_speed:.2f}MB/s"
-                    logger.debug(msg)
-                    # Update status bar
-                    if 'status_callback' in config:
-                        config['status_callback'](msg)
-                    if 'event_loop' in config:
-                        config['event_loop'].processEvents()
+                        msg = f"Test {i+1} QD{qd}: Read={read_speed:.2f}MB/s, Write={write_speed:.2f}MB/s"
+                        logger.debug(msg)
+                        # Update status bar
+                        if 'status_callback' in config:
+                            config['status_callback'](msg)
+                finally:
+                    engine.close()
                         
                 # Calculate average speed
                 avg_write_speed = total_write_speed / iterations
                 avg_read_speed = total_read_speed / iterations
+                qd_speeds[qd] = (avg_read_speed, avg_write_speed)
                 
-                results.append(f"{size/1024/1024}MB test (Average {iterations} times): "
+                results.append(f"{size/1024/1024}MB QD{qd} test (Average {iterations} times): "
                              f"Read speed={avg_read_speed:.2f}MB/s, "
                              f"Write speed={avg_write_speed:.2f}MB/s")
+                results.append(f"  {read_stats.summary()}")
+                results.append(f"  {write_stats.summary()}")
                 
-                logger.info(f"Performance test {size/1024/1024}MB: "
+                logger.info(f"Performance test {size/1024/1024}MB QD{qd}: "
                           f"Read={avg_read_speed:.2f}MB/s, "
                           f"Write={avg_write_speed:.2f}MB/s")
             
+            if len(qd_speeds) > 1:
+                results.append(self._saturation_summary(qd_speeds))
+            results.extend(steps)
+            if 'series_path' in config:
+                logger.info(f"Throughput time series saved to: {config['series_path']}")
+            
             return True, "\n".join(results)
             
         except Exception as e:
             logger.error(f"Performance test failed: {str(e)}", exc_info=True)
             return False, f"Performance test failed: {str(e)}"
-        finally:
-            if os.path.exists(test_file):
+    
+    def _test_random_iops(self, config):
+        """Random IOPS test, block aligned random I/O at each queue depth and read/write mix"""
+        try:
+            block_size = self.config.get('test.iops.block_size', 4) * 1024
+            read_percents = self.config.get('test.iops.read_percent', [100, 0])
+            if not isinstance(read_percents, list):
+                read_percents = [read_percents]
+            queue_depths = self.config.get('test.iops.queue_depths', [1, 32])
+            duration = self.config.get('test.iops.duration', 10)
+            region_size = self.config.get('test.iops.region_size', 256) * 1024 * 1024
+            engine_name = self.config.get('test.performance.io_engine', 'auto')
+            seed = self.config.get('test.iops.seed', None)
+            
+            results = []
+            path, offset, create = self._io_target("iops_test.bin", region_size)
+            if self.raw_window:
+                results.append(f"Target: {self.raw_window.describe()}")
+            
+            # Precondition the region, random reads must hit allocated, written blocks
+            logger.info(f"Preparing {region_size/1024/1024:.0f}MB random I/O region")
+            if 'status_callback' in config:
+                config['status_callback'](f"Preparing {region_size/1024/1024:.0f}MB random I/O region")
+            engine = self.backend.create_io_engine(queue_depth=1, block_size=1024 * 1024, engine=engine_name)
+            try:
+                prepare = engine.run(path, "write", region_size, offset=offset, fill=StreamingDataGenerator(seed).fill,
+                                     stop_event=self._stop_event, create=create)
+            finally:
+                engine.close()
+            if prepare.stopped:
+                return False, "Test stopped by user"
+            
+            for qd in queue_depths:
+                engine = self.backend.create_io_engine(queue_depth=qd, block_size=block_size, engine=engine_name)
                 try:
-                    os.remove(test_file)
-                except Exception as e:
-                    logger.error(f"Failed to clean up test files: {str(e)}")
+                    for read_percent in read_percents:
+                        if self._stop_event.is_set():
+                            return False, "Test stopped by user"
+                        
+                        msg = f"Random {block_size//1024}KB QD{qd} {read_percent}% read, {duration}s"
+                        logger.info(f"Starting {msg}")
+                        if 'status_callback' in config:
+                            config['status_callback'](msg)
+                        
+                        generator = StreamingDataGenerator(seed)
+                        run = engine.run_random(path, region_size, duration, read_percent, seed=seed,
+                                                fill=generator.fill, stop_event=self._stop_event, offset=offset)
+                        if run['read'].stopped:
+                            return False, "Test stopped by user"
+                        
+                        elapsed = run['read'].elapsed
+                        io_count = run['read'].io_count + run['write'].io_count
+                        iops = io_count / elapsed if elapsed > 0 else 0.0
+                        results.append(f"Random {block_size//1024}KB QD{qd} {read_percent}% read: "
+                                       f"IOPS={iops:.0f} ({iops * block_size / 1024 / 1024:.2f}MB/s)")
+                        for op in ("read", "write"):
+                            if run[op].io_count:
+                                self._record_iteration(config, f"QD{qd} {read_percent}% read: {op}", qd, 1, run[op])
+                                stats = PhaseStats(f"QD{qd} {op}")
+                                stats.add(run[op])
+                                results.append(f"  {stats.summary()}")
+                        logger.info(f"Random {block_size//1024}KB QD{qd} {read_percent}% read: IOPS={iops:.0f}")
+                finally:
+                    engine.close()
+            
+            return True, "\n".join(results)
+            
+        except Exception as e:
+            logger.error(f"Random IOPS test failed: {str(e)}", exc_info=True)
+            return False, f"Random IOPS test failed: {str(e)}"
+    
+    def _test_parallel_streams(self, config):
+        """Parallel stream test, aggregate and per worker throughput at each worker count"""
+        try:
+            worker_counts = self.config.get('test.parallel.workers', [1, 2, 4])
+            size = self.config.get('test.parallel.size', 128) * 1024 * 1024
+            block_size = self.config.get('test.parallel.block_size', 1024) * 1024
+            queue_depth = self.config.get('test.parallel.queue_depth', 8)
+            layout = self.config.get('test.parallel.layout', 'file')
+            processes = self.config.get('test.parallel.processes', False)
+            engine_name = self.config.get('test.performance.io_engine', 'auto')
+            seed = self.config.get('test.performance.seed', None)
+            
+            results = []
+            worker_speeds = {}
+            
+            def progress(speed, speeds):
+                # Called from the monitoring loop, not from the I/O workers
+                if 'status_callback' in config:
+                    config['status_callback'](f"{len(speeds)} streams: {speed:.2f}MB/s aggregate")
+            
+            for workers in worker_counts:
+                if self._stop_event.is_set():
+                    return False, "Test stopped by user"
+                logger.info(f"Starting parallel stream test, {workers} workers, QD{queue_depth}, layout {layout}")
+                streams = ParallelStreams(self.backend, self.test_area, workers, size, block_size, queue_depth,
+                                          layout=layout, processes=processes, engine=engine_name,
+                                          seed=seed, stop_event=self._stop_event)
+                write = streams.run("write", progress)
+                if write.stopped:
+                    return False, "Test stopped by user"
+                read = streams.run("read", progress)
+                if read.stopped:
+                    return False, "Test stopped by user"
+                
+                worker_speeds[workers] = (read.speed, write.speed)
+                results.append(f"{workers} workers QD{queue_depth} {size/1024/1024:.0f}MB each: "
+                               f"Read speed={read.speed:.2f}MB/s, Write speed={write.speed:.2f}MB/s")
+                for phase in (read, write):
+                    results.append(f"  {phase.op} per worker: "
+                                   f"{', '.join(f'{speed:.2f}' for speed in phase.worker_speeds)}MB/s")
+                logger.info(f"Parallel streams {workers} workers: Read={read.speed:.2f}MB/s, Write={write.speed:.2f}MB/s")
+            
+            if len(worker_speeds) > 1:
+                base = min(worker_speeds)
+                scaling = []
+                for index, op in enumerate(("Read", "Write")):
+                    best = max(worker_speeds, key=lambda workers: worker_speeds[workers][index])
+                    ratio = worker_speeds[best][index] / worker_speeds[base][index] if worker_speeds[base][index] else 0.0
+                    scaling.append(f"{op} x{ratio:.2f} at {best} workers")
+                results.append(f"Worker scaling vs {base} worker(s): " + ", ".join(scaling))
+            
+            return True, "\n".join(results)
+            
+        except Exception as e:
+            logger.error(f"Parallel stream test failed: {str(e)}", exc_info=True)
+            return False, f"Parallel stream test failed: {str(e)}"
+    
+    def _test_surface_scan(self, config):
+        """Full capacity surface scan, fills the free space (or the raw window) and verifies all of it"""
+        targets = []
+        try:
+            block_size = self.config.get('test.surface.block_size', 4) * 1024 * 1024
+            queue_depth = self.config.get('test.surface.queue_depth', 4)
+            file_size = self.config.get('test.surface.file_size', 1024) * 1024 * 1024
+            reserve = self.config.get('test.surface.reserve', 64) * 1024 * 1024
+            limit = int(self.config.get('test.surface.limit', 0) * 1024 * 1024 * 1024)
+            engine_name = self.config.get('test.performance.io_engine', 'auto')
+            seed = self.config.get('test.surface.seed', None)
+            sample_interval = self.config.get('test.performance.sample_interval_ms', 100) / 1000
+            
+            results = []
+            if self.raw_window:
+                # LBAs of the map are device LBAs
+                window = self.raw_window
+                targets = [ScanTarget(window.device_path, window.offset, window.size,
+                                      window.offset // 512, create=False)]
+                results.append(f"Target: {window.describe()}")
+            else:
+                card_info = self.card_ops.check_card()
+                if not card_info:
+                    return False, "No SD card detected"
+                free = self.backend.get_free_space(card_info.drive_letter) - reserve
+                total = min(free, limit) if limit else free
+                targets = file_targets(self._get_test_path(), total, file_size, block_size)
+                if not targets:
+                    return False, f"Not enough free space for a surface scan ({free / 1024 / 1024:.0f}MB)"
+                results.append(f"Target: {sum(t.size for t in targets) / 1024 ** 3:.2f}GB free space, "
+                               f"{len(targets)} files")
+            
+            def progress(phase, done, total, speed):
+                if 'status_callback' in config:
+                    config['status_callback'](f"Surface scan {phase}: {done / 1024 ** 3:.1f}/{total / 1024 ** 3:.1f}GB, "
+                                              f"{speed:.1f}MB/s")
+                if 'progress_callback' in config:
+                    config['progress_callback'](int(((phase == "verify") + done / total) * 50) if total else 0)
+            
+            logger.info(f"Starting surface scan: {results[-1]}, {block_size // 1024 // 1024}MB blocks, QD{queue_depth}")
+            scan = SurfaceScan(self.backend, targets, block_size, queue_depth, engine=engine_name, seed=seed,
+                               stop_event=self._stop_event, sample_interval=sample_interval,
+                               progress_callback=progress)
+            result = scan.run()
+            if result.stopped:
+                return False, "Test stopped by user"
+            
+            bad = result.map
+            results.append(f"Write: {result.written / 1024 ** 3:.2f}GB at {result.write_speed:.2f}MB/s, "
+                           f"Read: {result.verified / 1024 ** 3:.2f}GB at {result.read_speed:.2f}MB/s (seed {result.seed})")
+            results.append(f"Verified OK: {result.good_bytes / 1024 ** 3:.2f}GB, bad sectors: " +
+                           ", ".join(f"{kind} {bad.count(code)}" for code, kind in enumerate(REGION_KINDS)))
+            if result.write_error:
+                results.append(f"Write error: {result.write_error}")
+            results.append(f"Result: {result.verdict()}")
+            results.extend(f"  {line}" for line in bad.describe())
+            for phase, sampler in (("surface write", result.write_sampler), ("surface read", result.read_sampler)):
+                if sampler:
+                    results.extend(f"{phase}: {step}" for step in format_steps(sampler.detect_steps()))
+                    self._record_samples(config, phase, 1, sampler)
+            
+            logger.info(f"Surface scan: {result.verdict()}")
+            return result.passed, "\n".join(results)
+            
+        except Exception as e:
+            logger.error(f"Surface scan failed: {str(e)}", exc_info=True)
+            return False, f"Surface scan failed: {str(e)}"
+        finally:
+            for target in targets:
+                if target.create and os.path.exists(target.path):
+                    try:
+                        os.remove(target.path)
+                    except Exception as e:
+                        logger.error(f"Failed to clean up surface scan files: {str(e)}")
+    
+    def _test_endurance(self, config):
+        """Endurance test, checkpointed write/verify cycles resumed after an interruption"""
+        try:
+            cycle_size = self.config.get('test.endurance.cycle_size', 1024) * 1024 * 1024
+            block_size = self.config.get('test.endurance.block_size', 1) * 1024 * 1024
+            queue_depth = self.config.get('test.endurance.queue_depth', 4)
+            duration = self.config.get('test.endurance.duration', 24) * 3600
+            max_cycles = self.config.get('test.endurance.cycles', 0)
+            engine_name = self.config.get('test.performance.io_engine', 'auto')
+            
+            card_info = self.card_ops.check_card()
+            if not card_info:
+                return False, "No SD card detected"
+            # Data of the last cycle only survives an interruption, the test area removes it after a session
+            data_kept = os.path.exists(os.path.join(self._get_test_path(), "endurance.bin"))
+            path = self.test_area.file("endurance.bin", cycle_size)
+            checkpoint = create_checkpoint(self.config)
+            
+            def progress(state, fraction):
+                if 'status_callback' in config:
+                    config['status_callback'](f"Endurance cycle {state.cycles}: "
+                                              f"{state.bytes_written / 1024 ** 3:.1f}GB written, "
+                                              f"{state.error_cycles} cycles with errors")
+                if 'progress_callback' in config:
+                    config['progress_callback'](int(fraction * 100))
+            
+            test = EnduranceTest(self.backend, path, checkpoint, f"{card_info.serial}|{card_info.capacity}",
+                                 cycle_size, block_size, queue_depth, duration=duration, max_cycles=max_cycles,
+                                 engine=engine_name, seed=self.config.get('test.endurance.seed', None),
+                                 resume=self.config.get('test.endurance.resume', True), data_kept=data_kept,
+                                 stop_event=self._stop_event, progress_callback=progress)
+            state, stopped = test.run()
+            
+            results = [f"{state.cycles} cycles of {cycle_size / 1024 / 1024:.0f}MB in {state.sessions} sessions, "
+                       f"{state.bytes_written / 1024 ** 3:.2f}GB written, {state.elapsed / 3600:.2f}h"]
+            for op in ("write", "read"):
+                low, _, high = state.speeds[op]
+                if low is not None:
+                    results.append(f"{op.capitalize()} speed: min={low:.2f}MB/s, mean={state.mean_speed(op):.2f}MB/s, "
+                                   f"max={high:.2f}MB/s, latency {state.latency[op].summary()}")
+            if state.bad_sectors:
+                results.append(f"Errors: {state.error_cycles} cycles with mismatches, {state.bad_sectors} bad sectors, "
+                               f"first in cycle {state.first_error_cycle}")
+                for first, last, cycle, count in state.error_map[:16]:
+                    results.append(f"  LBA {first}-{last}: first in cycle {cycle}, {count} cycles")
+                if len(state.error_map) > 16 or state.dropped_ranges:
+                    results.append("  ...")
+            results.append(f"Checkpoint: {checkpoint.path}")
+            
+            if stopped:
+                return False, "\n".join(["Test stopped by user, the next run resumes from the checkpoint"] + results)
+            logger.info(f"Endurance test finished after {state.cycles} cycles, {state.bad_sectors} bad sectors")
+            return state.bad_sectors == 0, "\n".join(results)
+            
+        except Exception as e:
+            logger.error(f"Endurance test failed: {str(e)}", exc_info=True)
+            return False, f"Endurance test failed: {str(e)}"
+    
+    def _run_job(self, job, config):
+        """Run one declarative workload from test.jobs"""
+        try:
+            if 'status_callback' in config:
+                config['status_callback'](f"Running job {job.name}: {job.describe()}")
+            runner = JobRunner(job, self.backend, self.test_area,
+                               engine=self.config.get('test.performance.io_engine', 'auto'),
+                               stop_event=self._stop_event)
+            passed, details = runner.run()
+            logger.info(f"Job {job.name} {'passed' if passed else 'failed'}")
+            return passed, details
+        except Exception as e:
+            logger.error(f"Job {job.name} failed: {str(e)}", exc_info=True)
+            return False, f"Job {job.name} failed: {str(e)}"
+    
+    def _saturation_summary(self, qd_speeds):
+        """Find the lowest queue depth reaching 95% of the best throughput"""
+        summary = []
+        for index, op in enumerate(("Read", "Write")):
+            best = max(speeds[index] for speeds in qd_speeds.values())
+            saturated_qd = min(qd for qd, speeds in qd_speeds.items() if speeds[index] >= best * 0.95)
+            summary.append(f"{op} saturates at QD{saturated_qd} ({best:.2f}MB/s)")
+        return "Queue depth scaling: " + ", ".join(summary)
     
     def _test_controller(self, config):
         """Controller test"""
@@ -344,87 +711,73 @@ class TestSuite:
     def _test_basic_rw(self, config):
         """Basic read/write test"""
         try:
-            test_dir = self._get_test_path()
-            # Ensure test directory exists
-            os.makedirs(test_dir, exist_ok=True)
-            
-            test_file = os.path.join(test_dir, "basic_rw_test.bin")
             test_size = 1 * 1024 * 1024  # 1MB
+            test_file = self.test_area.file("basic_rw_test.bin", test_size)
             
             logger.info(f"Starting basic read/write test, file size: {test_size/1024/1024}MB")
             
-            # Use Windows API for file operations to get better control
+            # Use unbuffered I/O engine so data is read back from the card, not the cache
+            engine = self.backend.create_io_engine(queue_depth=1, block_size=test_size)
             try:
                 # Write test
                 logger.debug("Starting write test")
-                data = os.urandom(test_size)
-                
-                handle = win32file.CreateFile(
-                    test_file,
-                    win32file.GENERIC_WRITE,
-                    0,  # Not shared
-                    None,
-                    win32file.CREATE_ALWAYS,
-                    win32file.FILE_FLAG_WRITE_THROUGH,
-                    None
-                )
-                
-                try:
-                    win32file.WriteFile(handle, data)
-                finally:
-                    handle.Close()
+                pattern = PatternGenerator()
+                engine.run(test_file, "write", test_size, fill=pattern.fill, create=False)
                 
                 # Wait for data to finish writing
                 time.sleep(0.1)
                 
-                # Read test
+                # Read test, expected data is regenerated per block
                 logger.debug("Starting read test")
-                handle = win32file.CreateFile(
-                    test_file,
-                    win32file.GENERIC_READ,
-                    win32file.FILE_SHARE_READ,
-                    None,
-                    win32file.OPEN_EXISTING,
-                    0,
-                    None
-                )
+                report = MismatchReport()
                 
-                try:
-                    _, read_data = win32file.ReadFile(handle, test_size)
-                finally:
-                    handle.Close()
+                def consume(view, offset):
+                    pattern.verify(view, offset, report)
+                
+                result = engine.run(test_file, "read", test_size, consume=consume)
+                report.add_missing(result.bytes, test_size)
                 
                 # Verify data
-                if data == read_data:
+                if report.passed:
                     logger.info("Basic read/write test passed")
                     return True, "Read/write test successful, data verification passed"
                 else:
-                    logger.error("Data verification failed")
-                    return False, "Data verification failed"
+                    logger.error(f"Data verification failed: {report.summary()}")
+                    return False, f"Data verification failed: {report.summary()}"
                     
             except Exception as e:
                 logger.error(f"File operation failed: {str(e)}")
                 return False, f"File operation failed: {str(e)}"
+            finally:
+                engine.close()
                 
         except Exception as e:
             logger.error(f"Basic read/write test failed: {str(e)}", exc_info=True)
             return False, f"Read/write test failed: {str(e)}"
-            
-        finally:
-            if os.path.exists(test_file):
-                try:
-                    os.remove(test_file)
-                except Exception as e:
-                    logger.error(f"Failed to clean up test files: {str(e)}")
     
     def _test_stability(self, config):
         """Stability test"""
         try:
-            test_dir = self._get_test_path()
+            seed = self.config.get('test.stability.seed', None)
+            if seed is None:
+                seed = random.getrandbits(63)
+            keep_files = self.config.get('test.stability.keep_files', False)
+            
+            if self.config.get('test.stability.verify_only', False):
+                return self._verify_kept_files(config)
+            
+            # Kept files live outside test_files, which is removed after every round
+            test_dir = self._get_verify_path() if keep_files else self._get_test_path()
+            os.makedirs(test_dir, exist_ok=True)
             iterations = 10 if config.get('type') == 'quick' else 100
             errors = 0
+            failures = []
+            write_stats = PhaseStats("Write")
+            read_stats = PhaseStats("Read")
+            rng = random.Random(seed)
+            manifest = {'seed': seed, 'files': []}
             
-            logger.info(f"Starting stability test, iteration count: {iterations}")
+            logger.info(f"Starting stability test, iteration count: {iterations}, seed: {seed}")
             
             for i in range(iterations):
                 if self._stop_event.is_set():
@@ -432,29 +785,29 @@ class TestSuite:
                     return False, "Test interrupted"
                     
                 try:
-                    # Random read/write test
-                    size = random.randint(512*1024, 2*1024*1024)  # 512KB to 2MB
-                    test_file = os.path.join(test_dir, f"stability_test_{i}.bin")
+                    # Random read/write test, file content derived from (seed, iteration, offset)
+                    size = rng.randint(512*1024, STABILITY_MAX_SIZE)  # 512KB to 2MB
+                    if keep_files:
+                        test_file = os.path.join(test_dir, f"stability_test_{i}.bin")
+                    else:
+                        test_file = self.test_area.file(f"stability_test_{i % STABILITY_SLOTS}.bin",
+                                                        STABILITY_MAX_SIZE)
+                    pattern = PatternGenerator(seed, pass_number=i)
                     
                     logger.debug(f"Test {i+1}/{iterations}, file size: {size/1024:.1f}KB")
                     
                     # Write test
-                    data = os.urandom(size)
-                    with open(test_file, 'wb') as f:
-                        f.write(data)
-                        f.flush()
-                        os.fsync(f.fileno())
+                    self._write_pattern_file(test_file, size, pattern, write_stats, preallocated=not keep_files)
                     
                     # Read and verify
-                    with open(test_file, 'rb') as f:
-                        read_data = f.read()
-                    
-                    if data != read_data:
-                        logger.error(f"Data verification failed for test {i+1}")
+                    report = self._verify_pattern_file(test_file, size, pattern, read_stats)
+                    if not report.passed:
+                        logger.error(f"Data verification failed for test {i+1}: {report.summary()}")
+                        failures.append(f"{os.path.basename(test_file)}: {report.summary()}")
                         errors += 1
                     
-                    # Clean up file
-                    os.remove(test_file)
+                    if keep_files:
+                        manifest['files'].append({'name': os.path.basename(test_file), 'size': size, 'pass': i})
                     
                 except Exception as e:
                     logger.error(f"Test {i+1} failed: {str(e)}")
@@ -465,16 +818,99 @@ class TestSuite:
                     progress = int((i + 1) * 100 / iterations)
                     config['progress_callback'](progress)
             
+            if keep_files:
+                with open(os.path.join(test_dir, "manifest.json"), 'w', encoding='utf-8') as f:
+                    json.dump(manifest, f)
+                logger.info(f"Kept {len(manifest['files'])} stability test files in {test_dir} for verify-only pass")
+            
+            latency = [write_stats.summary(), read_stats.summary()]
             if errors == 0:
                 logger.info("Stability test passed")
-                return True, f"Completed {iterations} random read/write tests, no errors"
+                return True, "\n".join([f"Completed {iterations} random read/write tests, no errors (seed {seed})"] + latency)
             else:
                 logger.warning(f"Stability test completed, but with {errors} errors")
-                return False, f"Test completed, but with {errors} errors"
+                return False, "\n".join([f"Test completed, but with {errors} errors (seed {seed})"] + failures[:5] + latency)
                 
         except Exception as e:
             logger.error(f"Stability test failed: {str(e)}", exc_info=True)
             return False, f"Stability test failed: {str(e)}"
+    
+    def _verify_kept_files(self, config):
+        """Verify-only pass over files kept by an earlier stability test, e.g. after a power cycle"""
+        verify_dir = self._get_verify_path()
+        manifest_file = os.path.join(verify_dir, "manifest.json")
+        if not os.path.exists(manifest_file):
+            return False, f"No kept test files to verify: {manifest_file} not found"
+        
+        with open(manifest_file, 'r', encoding='utf-8') as f:
+            manifest = json.load(f)
+        
+        files = manifest['files']
+        errors = 0
+        failures = []
+        logger.info(f"Starting verify-only pass, file count: {len(files)}, seed: {manifest['seed']}")
+        for i, entry in enumerate(files):
+            if self._stop_event.is_set():
+                return False, "Test interrupted"
+            pattern = PatternGenerator(manifest['seed'], pass_number=entry['pass'])
+            try:
+                report = self._verify_pattern_file(os.path.join(verify_dir, entry['name']), entry['size'], pattern)
+                if not report.passed:
+                    logger.error(f"Data verification failed for {entry['name']}: {report.summary()}")
+                    failures.append(f"{entry['name']}: {report.summary()}")
+                    errors += 1
+            except Exception as e:
+                logger.error(f"Verify {entry['name']} failed: {str(e)}")
+                errors += 1
+            if 'progress_callback' in config:
+                config['progress_callback'](int((i + 1) * 100 / len(files)))
+        
+        if errors == 0:
+            return True, f"Verified {len(files)} kept files, no errors (seed {manifest['seed']})"
+        return False, "\n".join([f"Verified {len(files)} kept files, {errors} errors (seed {manifest['seed']})"] + failures[:5])
+    
+    def _write_pattern_file(self, path, size, pattern, stats=None, chunk_size=1024 * 1024, preallocated=False):
+        """Write pattern file chunk by chunk and flush it to the card
+        Args:
+            stats: Optional PhaseStats recording latency of every write call, final flush included
+            preallocated: Overwrite the start of a test area file in place instead of recreating it
+        """
+        with open(path, 'r+b' if preallocated else 'wb') as f:
+            for offset in range(0, size, chunk_size):
+                data = pattern.generate(offset, min(chunk_size, size - offset))
+                start = time.perf_counter()
+                f.write(data)
+                if stats:
+                    stats.record(time.perf_counter() - start)
+            start = time.perf_counter()
+            f.flush()
+            os.fsync(f.fileno())
+            if stats:
+                stats.record(time.perf_counter() - start)
+    
+    def _verify_pattern_file(self, path, size, pattern, stats=None, chunk_size=1024 * 1024):
+        """Read file back chunk by chunk, regenerating the expected pattern of each chunk
+        Args:
+            stats: Optional PhaseStats recording latency of every read call
+        Returns:
+            MismatchReport: Comparison result, offsets relative to file start
+        """
+        report = MismatchReport()
+        buffer = bytearray(chunk_size)
+        view = memoryview(buffer)
+        offset = 0
+        with open(path, 'rb') as f:
+            while offset < size:
+                start = time.perf_counter()
+                n = f.readinto(view[:min(chunk_size, size - offset)])
+                if stats:
+                    stats.record(time.perf_counter() - start)
+                if not n:
+                    break
+                pattern.verify(view[:n], offset, report)
+                offset += n
+        report.add_missing(offset, size)
+        return report
 
     def _check_timeout(self):
         """检查是否超时"""
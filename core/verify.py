@@ -0,0 +1,108 @@
+import numpy as np
+from utils.logger import get_logger
+
+logger = get_logger(__name__)
+
+SECTOR_SIZE = 512
+MAX_LBA_RANGES = 64  # Keep memory bounded on badly corrupted media
+
+# Number of set bits of every byte value
+_POPCOUNT = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint8)
+
+class MismatchReport:
+    """Accumulated result of block comparisons
+
+    Offsets and LBAs are relative to the start of the verified target, LBA is
+    the 512 byte sector index. Matching blocks only cost one vectorized equality
+    check, mismatching ones are localized down to sectors and bits.
+    """
+    def __init__(self):
+        self.bytes_checked = 0
+        self.first_offset = None
+        self.bad_sectors = 0
+        self.flipped_bits = 0
+        self.missing_bytes = 0
+        self.lba_ranges = []  # [first_lba, last_lba], adjacent ranges merged, in detection order
+        self.dropped_ranges = 0
+
+    @property
+    def passed(self):
+        return self.first_offset is None and self.missing_bytes == 0
+
+    def compare(self, view, expected, offset):
+        """Compare buffer view read from offset with expected uint8 array
+        Returns:
+            bool: True if the block matches
+        """
+        actual = np.frombuffer(view, dtype=np.uint8)
+        self.bytes_checked += len(actual)
+        if len(actual) == len(expected) and np.array_equal(actual, expected):
+            return True
+
+        length = min(len(actual), len(expected))
+        if len(actual) < len(expected):
+            self.add_missing(offset + length, offset + len(expected))
+        actual = actual[:length]
+        expected = expected[:length]
+
+        diff = actual != expected
+        bad_bytes = np.flatnonzero(diff)
+        if not len(bad_bytes):
+            return False
+
+        if self.first_offset is None or offset + int(bad_bytes[0]) < self.first_offset:
+            self.first_offset = offset + int(bad_bytes[0])
+        self.flipped_bits += int(_POPCOUNT[np.bitwise_xor(actual, expected)].sum(dtype=np.uint64))
+
+        # Sector granularity, block offset may not be sector aligned
+        first_lba = offset // SECTOR_SIZE
+        sector_index = np.unique((bad_bytes + offset) // SECTOR_SIZE - first_lba)
+        self.bad_sectors += len(sector_index)
+        self._add_ranges(sector_index + first_lba)
+        return False
+
+    def add_missing(self, start, end):
+        """Record bytes [start, end) that could not be read back at all"""
+        if end <= start:
+            return
+        self.missing_bytes += end - start
+        if self.first_offset is None or start < self.first_offset:
+            self.first_offset = start
+        first_lba = start // SECTOR_SIZE
+        last_lba = (end - 1) // SECTOR_SIZE
+        self.bad_sectors += last_lba - first_lba + 1
+        self._add_range(first_lba, last_lba)
+
+    def _add_ranges(self, lbas):
+        """Merge sorted sector indexes into LBA ranges"""
+        # Split into runs of consecutive LBAs
+        breaks = np.flatnonzero(np.diff(lbas) != 1) + 1
+        starts = np.concatenate(([lbas[0]], lbas[breaks]))
+        ends = np.concatenate((lbas[breaks - 1], [lbas[-1]]))
+        for first, last in zip(starts.tolist(), ends.tolist()):
+            self._add_range(first, last)
+
+    def _add_range(self, first, last):
+        """Add LBA range [first, last], merged into the previous range when adjacent"""
+        if self.lba_ranges and self.lba_ranges[-1][1] + 1 >= first and self.lba_ranges[-1][0] <= first:
+            self.lba_ranges[-1][1] = max(self.lba_ranges[-1][1], last)
+        elif len(self.lba_ranges) < MAX_LBA_RANGES:
+            self.lba_ranges.append([first, last])
+        else:
+            self.dropped_ranges += 1
+
+    def summary(self):
+        """One line description of the mismatches"""
+        if self.passed:
+            return f"{self.bytes_checked} bytes verified, no mismatch"
+        ranges = ", ".join(f"{first}-{last}" if first != last else f"{first}"
+                           for first, last in self.lba_ranges[:8])
+        if len(self.lba_ranges) > 8 or self.dropped_ranges:
+            ranges += ", ..."
+        summary = (f"first mismatch at offset {self.first_offset} (0x{self.first_offset:X}), "
+                   f"{self.bad_sectors} bad sectors, {self.flipped_bits} flipped bits")
+        if self.missing_bytes:
+            summary += f", {self.missing_bytes} bytes missing"
+        if ranges:
+            summary += f", LBA ranges: {ranges}"
+        return summary
@@ -0,0 +1,105 @@
+import math
+from PyQt5.QtWidgets import QWidget
+from PyQt5.QtCore import Qt, QTimer, QPointF, QRectF
+from PyQt5.QtGui import QPainter, QPen, QColor, QPolygonF
+from core.live_monitor import decimate
+
+MARGIN = 6
+LABEL_HEIGHT = 16
+
+class LiveChart(QWidget):
+    """Live MB/s and latency chart of a LiveMonitor
+
+    A timer takes a monitor snapshot at frame_rate, independent of the I/O
+    rate, and reduces it to one min/max bucket per pixel column, so a redraw
+    costs the same after a second or after hours of testing. Drawn with
+    QPainter, no charting package needed.
+    """
+    def __init__(self, frame_rate=10, parent=None):
+        super().__init__(parent)
+        self.monitor = None
+        self.setMinimumHeight(180)
+        self._timer = QTimer(self)
+        self._timer.setInterval(max(1, int(1000 / frame_rate)))
+        self._timer.timeout.connect(self._refresh)
+        self._clear()
+
+    def _clear(self):
+        self._count = -1
+        self._span = 0.0      # Seconds of history shown
+        self._speed = None    # (mins, maxs) MB/s per bucket
+        self._latency = None  # (mins, maxs) mean latency in ms per bucket
+        self._status = "No test running"
+
+    def set_monitor(self, monitor):
+        """Follow monitor, None keeps the last picture"""
+        if monitor is not None:
+            self._clear()
+            self._timer.start()
+        else:
+            self._refresh()
+            self._timer.stop()
+        self.monitor = monitor
+        self.update()
+
+    def _refresh(self):
+        if self.monitor is None:
+            return
+        count, speed, latency, latency_max = self.monitor.snapshot()
+        if count == self._count:
+            return  # No window closed since the last frame
+        self._count = count
+        self._span = len(speed) * self.monitor.interval
+        buckets = max(1, self.width() - 2 * MARGIN)
+        self._speed = decimate(speed, buckets)
+        self._latency = decimate(latency * 1000, buckets)
+        if len(speed):
+            self._status = (f"{speed[-1]:.1f}MB/s, latency {latency[-1] * 1000:.2f}ms "
+                            f"(max {latency_max[-1] * 1000:.2f}ms)")
+        self.update()
+
+    def paintEvent(self, event):
+        painter = QPainter(self)
+        painter.fillRect(self.rect(), self.palette().base())
+        painter.setPen(self.palette().text().color())
+        span = f", last {self._span:.0f}s" if self._span else ""
+        painter.drawText(QRectF(MARGIN, 0, self.width() - 2 * MARGIN, LABEL_HEIGHT),
+                         Qt.AlignLeft | Qt.AlignVCenter, self._status + span)
+        height = (self.height() - LABEL_HEIGHT - 3 * MARGIN) / 2
+        top = LABEL_HEIGHT + MARGIN
+        width = self.width() - 2 * MARGIN
+        self._draw_plot(painter, QRectF(MARGIN, top, width, height), self._speed, "MB/s", QColor(0, 120, 215))
+        self._draw_plot(painter, QRectF(MARGIN, top + height + MARGIN, width, height), self._latency, "ms",
+                        QColor(200, 90, 0))
+        painter.end()
+
+    def _draw_plot(self, painter, rect, envelope, unit, color):
+        painter.setPen(QPen(self.palette().mid().color()))
+        painter.drawRect(rect)
+        if envelope is None or not len(envelope[0]):
+            return
+        mins, maxs = envelope
+        scale = _nice_ceiling(float(maxs.max()))
+
+        # Zig-zag through the min and max of every bucket, one pixel column each
+        step = rect.width() / max(1, len(mins) - 1)
+        polygon = QPolygonF()
+        for index, (low, high) in enumerate(zip(mins.tolist(), maxs.tolist())):
+            x = rect.left() + index * step
+            polygon.append(QPointF(x, rect.bottom() - low / scale * rect.height()))
+            if high != low:
+                polygon.append(QPointF(x, rect.bottom() - high / scale * rect.height()))
+        painter.setPen(QPen(color, 1))
+        painter.drawPolyline(polygon)
+        # Full scale inside the top left corner
+        painter.setPen(self.palette().text().color())
+        painter.drawText(rect.adjusted(4, 2, -4, -2), Qt.AlignLeft | Qt.AlignTop, f"{scale:g}{unit}")
+
+def _nice_ceiling(value):
+    """Smallest 1, 2 or 5 times a power of ten not below value"""
+    if value <= 0:
+        return 1.0
+    power = 10 ** math.floor(math.log10(value))
+    for factor in (1, 2, 5, 10):
+        if value <= factor * power:
+            return factor * power
@@ -1,13 +1,20 @@
 import os
 import sys
 from PyQt5.QtWidgets import (QMainWindow, QGroupBox, QLabel, QPushButton, 
-                           QTextEdit, QVBoxLayout, QHBoxLayout, QWidget,
-                           QProgressBar, QMessageBox, QApplication, QDialog)
-from PyQt5.QtCore import Qt, QTimer
+                           QVBoxLayout, QHBoxLayout, QWidget,
+                           QProgressBar, QMessageBox, QDialog)
+from PyQt5.QtCore import Qt, QTimer, QThread, pyqtSignal
 from PyQt5.QtGui import QIcon
 from core.controller import SDController
-from core.card_ops import CardOperations
+from core.card_ops import CardOperations, MODE_PROBING
+from core.backend import create_backend
 from core.test_suite import TestSuite
+from core.test_runner import TestRunner
+from core.report import ReportWriter
+from core.live_monitor import LiveMonitor
+from gui.test_worker import TestWorker
+from gui.live_chart import LiveChart
+from gui.result_model import ResultListModel, ResultView, ResultRow, ResultCounters, MARKER, RESULT, NOTE
 from utils.logger import get_logger
 from utils.config import config
 from datetime import datetime
@@ -59,6 +66,9 @@ class AboutDialog(QDialog):
         self.setLayout(layout)
 
 class MainWindow(QMainWindow):
+    device_changed = pyqtSignal(str)  # Emitted from the device watcher thread, handled in the GUI thread
+    card_probed = pyqtSignal(object)  # Emitted from the mode probe thread with the detailed CardInfo
+    
     def __init__(self):
         super().__init__()
         logger.info("Initializing main window")
@@ -89,29 +99,39 @@ class MainWindow(QMainWindow):
         # Initialize UI
         self._setup_ui()
         
+        self.card_ops = None
+        self.report = None  # ReportWriter of the running test
+        self.test_thread = None
+        self.test_worker = None
+        self.device_watcher = None
+        self._card_check_pending = False
+        
         # Delay initialize core components and check
         QTimer.singleShot(100, self._init_components)
     
     def _init_components(self):
         """Delay initialize core components"""
         try:
-            self.controller = SDController()
+            self.backend = create_backend(config)
+            self.controller = SDController(backend=self.backend)
             self.card_ops = CardOperations(
                         controller=self.controller,
-                        config=config   #from utils.config import
+                        config=config,   #from utils.config import
+                        backend=self.backend
             )
             self.test_suite = TestSuite(self.card_ops)
+            self.card_probed.connect(self._show_card_info)
             logger.info("Core components initialized")
             
             # Start check
             self._check_controller_status()
             self._check_card_status()
             
-            # Add timer, check card status every second
-            self.card_check_timer = QTimer()
-            self.card_check_timer.timeout.connect(self._check_card_status)
-            self.card_check_timer.start(1000)  # Check every 1000ms
-            logger.debug("Started SD card status check timer")
+            # Check card status again only on device insert/remove events
+            self.device_changed.connect(self._on_device_changed)
+            self.device_watcher = self.backend.create_device_watcher()
+            self.device_watcher.start(self.device_changed.emit)
+            logger.debug(f"Started device watcher: {type(self.device_watcher).__name__}")
             
         except Exception as e:
             logger.error(f"Failed to initialize core components: {str(e)}", exc_info=True)
@@ -153,14 +173,23 @@ class MainWindow(QMainWindow):
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         
-        # Result display area
-        self.result_text = QTextEdit()
-        self.result_text.setReadOnly(True)
+        # Result display area, a capped list model keeps long loop runs cheap
+        self.result_model = ResultListModel(config.get('ui.result_rows', 2000))
+        self.result_counters = ResultCounters()
+        self.result_view = ResultView()
+        self.result_view.setModel(self.result_model)
+        
+        # Live throughput/latency chart, redrawn at a fixed frame rate whatever the I/O rate
+        self.live_chart = None
+        if config.get('ui.chart.enabled', True):
+            self.live_chart = LiveChart(config.get('ui.chart.frame_rate', 10))
         
         # Add to left layout
         left_layout.addWidget(self.status_panel)
         left_layout.addWidget(self.progress_bar)
-        left_layout.addWidget(self.result_text)
+        if self.live_chart:
+            left_layout.addWidget(self.live_chart)
+        left_layout.addWidget(self.result_view)
         
         # Right area
         right_layout = QVBoxLayout()
@@ -196,8 +225,12 @@ class MainWindow(QMainWindow):
         self.stop_btn = QPushButton("Stop test")
         self.stop_btn.clicked.connect(self._stop_test)
         self.stop_btn.setEnabled(False)
+        self.redetect_btn = QPushButton("Re-detect card mode")
+        self.redetect_btn.setToolTip("Measure the card mode again instead of using the cached result")
+        self.redetect_btn.clicked.connect(self._redetect_card)
         test_btn_layout.addWidget(self.test_btn)
         test_btn_layout.addWidget(self.stop_btn)
+        test_btn_layout.addWidget(self.redetect_btn)
         
         # Tool button
         tools_btn_layout = QVBoxLayout()
@@ -251,16 +284,34 @@ class MainWindow(QMainWindow):
             self.controller_capability.setStyleSheet("color: red")
             self.test_btn.setEnabled(False)
 
-    def _check_card_status(self):
-        """Check SD card status"""
+    def _check_card_status(self, reprobe=False):
+        """Check SD card status
+        Args:
+            reprobe: Measure the card mode again instead of using the card mode cache
+        """
         try:
-            # Check SD card information
-            card_info = self.card_ops.check_card()
+            # Check SD card information, mode probes run in the background and report through card_probed
+            card_info = self.card_ops.check_card(reprobe=reprobe, probe_callback=self.card_probed.emit)
 
             # Check controller information, there are two cases to check controller information
             # 1. The initial state has no inserted card, the controller is other NVMe SSDs on the platform.
             # 2. After inserting the SD card, the controller switches from NVMe SD Express to SD 4.0/3.0
             self._check_controller_status()
+            self._show_card_info(card_info)
+
+        except Exception as e:
+            logger.error(f"Failed to check SD card status: {str(e)}", exc_info=True)
+            self.card_name.setText("SD card: Check failed")
+            self.card_name.setStyleSheet("color: red")
+            self.card_capability.setText("Card capability: Check failed")
+            self.card_capability.setStyleSheet("color: red")
+            self.test_btn.setEnabled(False)
+
+    def _show_card_info(self, card_info):
+        """Show detected card, provisional while its mode is probed"""
+        try:
+            if self.test_thread:
+                return  # Test button and card status are restored when the test finished
 
             if not card_info:
                 self.card_name.setText("SD Card: Not Detected")
@@ -278,12 +329,23 @@ class MainWindow(QMainWindow):
             # Build card capability information
             capability_info = []
             if card_info.mode:
-                capability_info.append(f"Mode: {card_info.mode}")
+                notes = []
+                if card_info.mode_cached:
+                    notes.append("cached")
+                if card_info.mode_confidence:
+                    notes.append(f"{card_info.mode_confidence:.1%} confidence")
+                capability_info.append(f"Mode: {card_info.mode}" + (f" ({', '.join(notes)})" if notes else ""))
             if card_info.capacity:
                 capability_info.append(f"Capacity: {card_info.capacity/1024/1024/1024:.1f}GB")
             
             # Update card capability display
             self.card_capability.setText("Card Capability: " + ", ".join(capability_info))
+            if card_info.mode == MODE_PROBING:
+                # Test waits for the mode, it selects the test parameters
+                self.card_capability.setStyleSheet("color: orange")
+                self.test_btn.setEnabled(False)
+                self.statusBar.showMessage("Detecting card mode...")
+                return
             self.card_capability.setStyleSheet("color: green")
 
             # Enable test button
@@ -291,15 +353,10 @@ class MainWindow(QMainWindow):
             self.statusBar.showMessage("SD card ready")
 
         except Exception as e:
-            logger.error(f"Failed to check SD card status: {str(e)}", exc_info=True)
-            self.card_name.setText("SD card: Check failed")
-            self.card_name.setStyleSheet("color: red")
-            self.card_capability.setText("Card capability: Check failed")
-            self.card_capability.setStyleSheet("color: red")
-            self.test_btn.setEnabled(False)
+            logger.error(f"Failed to show SD card status: {str(e)}", exc_info=True)
  
     def _start_test(self):
-        """Start test"""
+        """Start test in a worker thread"""
         logger.info("Start test process")
         try:
             # Reset test suite status
@@ -307,175 +364,156 @@ class MainWindow(QMainWindow):
 
             self.test_btn.setEnabled(False)
             self.stop_btn.setEnabled(True)
+            self.redetect_btn.setEnabled(False)
             self.progress_bar.setVisible(True)
             self.progress_bar.setValue(0)
-            self.result_text.clear()
+            self.result_model.clear()
+            self.result_counters = ResultCounters()
             
             # Add simple test start marker
             start_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.result_text.insertHtml(
-                f"=== Test start ({start_time}) ===<br><br>"
-            )
+            self.result_model.append(ResultRow(MARKER, f"=== Test start ({start_time}) ==="))
             
             self.statusBar.showMessage("Executing test...")
             
-            # Get loop test configuration
-            loop_enabled = config.get('test.loop.enabled', False)
-            loop_count = config.get('test.loop.count', 1)
-            
             test_config = {
                 'mode': 'all',
                 'type': 'quick',
                 'timeout': 300,
-                'progress_callback': self._update_progress,
-                'event_loop': QApplication.instance(),
-                'result_callback': self._show_test_result,
                 'config': config,  # Pass configuration object
-                'status_callback': self._update_status  # Add status update callback
             }
             
             # Set output file
             timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-            output_path = Path(f"test_report_{timestamp}.txt")
-            
-            # Initialize result list
-            all_results = []
-            
-            # Execute loop test
-            for i in range(loop_count if loop_enabled else 1):
-                if self.test_suite._stop_event.is_set():
-                    logger.info("Test stopped by user, exit loop")
-                    break
-                
-                if loop_enabled:
-                    self.result_text.append(f"\n=== Test {i+1}/{loop_count} ===\n")
-                    self.statusBar.showMessage(f"Executing test {i+1}/{loop_count}...")
-                
-                results = self.test_suite.run_tests(test_config)
-                if not results:
-                    break
-                all_results.append(results)
-            
-            # Generate report
-            self._generate_report(all_results if loop_enabled else results, output_path)
-            logger.info(f"Test report saved to: {output_path}")
-            self.statusBar.showMessage(f"Test report saved to: {output_path}")
+            self.output_path = Path(f"test_report_{timestamp}.txt")
+            test_config['series_path'] = self.output_path.with_name(f"{self.output_path.stem}_throughput.csv")
+            test_config['results_path'] = self.output_path.with_name(f"{self.output_path.stem}_results")
+            
+            # Engines created from now on feed the live chart
+            if self.live_chart:
+                interval = config.get('test.performance.sample_interval_ms', 100) / 1000
+                monitor = LiveMonitor(interval, int(config.get('ui.chart.history', 3600) / interval))
+                self.backend.monitor = monitor
+                self.live_chart.set_monitor(monitor)
+            
+            # Callbacks become queued signals, handled here in the GUI thread
+            self.report = ReportWriter(self.output_path, config)
+            self.test_thread = QThread()
+            self.test_worker = TestWorker(TestRunner(self.test_suite, config), test_config, self.report)
+            self.test_worker.moveToThread(self.test_thread)
+            self.test_worker.progress.connect(self._update_progress)
+            self.test_worker.status.connect(self._update_status)
+            self.test_worker.result.connect(self._show_test_result)
+            self.test_worker.round_started.connect(self._show_test_round)
+            self.test_worker.error.connect(self._show_test_error)
+            self.test_worker.finished.connect(self._on_test_finished)
+            self.test_thread.started.connect(self.test_worker.run)
+            self.test_thread.start()
             
         except Exception as e:
             logger.error(f"Test process error: {str(e)}", exc_info=True)
             QMessageBox.critical(self, "Error", f"Test process error: {str(e)}")
             self.statusBar.showMessage("Test failed")
-
+            self._finish_test()
+    
+    def _show_test_round(self, round_number, round_count):
+        """Mark the start of a loop test round"""
+        self.result_counters.start_round(len(self.test_suite.test_cases))
+        self.result_model.append(ResultRow(MARKER, f"=== Test {round_number}/{round_count} ===",
+                                           round_number=round_number))
+        self.statusBar.showMessage(f"Executing test {round_number}/{round_count}...")
+    
+    def _show_test_error(self, message):
+        QMessageBox.critical(self, "Error", f"Test process error: {message}")
+        self.statusBar.showMessage("Test failed")
+    
+    def _on_test_finished(self, results):
+        """Worker thread finished, write report and restore the UI"""
+        try:
+            if self.report:
+                # Rounds are already in the report, only the summary footer is missing
+                self.report.finish(stopped=results is None or self.test_suite._stop_event.is_set())
+                self.report = None
+                logger.info(f"Typed results saved to: {self.output_path.with_name(f'{self.output_path.stem}_results')}")
+                self.statusBar.showMessage(f"Test report saved to: {self.output_path}")
+        except Exception as e:
+            logger.error(f"Failed to generate test report: {str(e)}", exc_info=True)
+            QMessageBox.critical(self, "Error", f"Failed to generate test report: {str(e)}")
         finally:
+            self.test_thread.quit()
+            self.test_thread.wait()
+            self.test_thread = None
+            self.test_worker = None
             self._finish_test()
+            if self._card_check_pending:
+                self._card_check_pending = False
+                self._check_card_status()
+    
+    def _on_device_changed(self, reason):
+        """Device inserted or removed"""
+        logger.debug(f"Device change ({reason}), checking SD card status")
+        if self.test_thread:
+            # Card detection would compete with the running test, check once it finished
+            self._card_check_pending = True
+            return
+        self._check_card_status()
     
+    def _redetect_card(self):
+        """Forced card mode probe, replaces the cached mode of the card"""
+        if self.test_thread or not self.card_ops:
+            return
+        self.statusBar.showMessage("Detecting card mode...")
+        self._check_card_status(reprobe=True)
+
     def _stop_test(self):
-        """Stop test"""
+        """Stop test, the worker finishes the running test case step and reports back"""
         logger.info("User requested to stop test")
-        self.test_suite._stop_event.set()  # Set stop flag
+        if self.test_worker:
+            self.test_worker.stop()  # Set stop flag
+        self.stop_btn.setEnabled(False)
         
         # Add stop information, but no summary
-        self.result_text.insertHtml(
-            "<br><span style='color: orange;'>Test stopped by user</span><br>"
-        )
+        self.result_model.append(ResultRow(NOTE, "Test stopped by user", color="orange"))
         
-        self.statusBar.showMessage("Test stopped")
-        self._finish_test()
+        self.statusBar.showMessage("Stopping test...")
+    
+    def closeEvent(self, event):
+        """Stop a running test before the window closes"""
+        if self.device_watcher:
+            self.device_watcher.stop()
+        if self.test_thread and self.test_thread.isRunning():
+            self.test_worker.stop()
+            self.test_thread.quit()  # Event loop exits once the running test returns
+            self.test_thread.wait()
+        super().closeEvent(event)
     
     def _finish_test(self):
         """Finish test (whether normally or stopped)"""
         try:
-            # Add test result summary
-            summary_html = self._generate_test_summary()
-            
-            # Add simple test end marker
+            # Add simple test end marker and the test result summary from the counters
             end_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-            self.result_text.insertHtml(
-                f"<br>=== Test end ({end_time}) ===<br>{summary_html}<br>"
-            )
+            self.result_model.append(ResultRow(MARKER, f"=== Test end ({end_time}) ==="))
+            if self.result_model.dropped:
+                self.result_model.append(ResultRow(NOTE, "Earlier rows are not shown, see the test report for all "
+                                                         "results", color="gray"))
+            summary, color = self.result_counters.summary(len(self.test_suite.test_cases))
+            self.result_model.append(ResultRow(NOTE, summary, color=color))
             
             self.test_btn.setEnabled(True)
             self.stop_btn.setEnabled(False)
+            self.redetect_btn.setEnabled(True)
             self.progress_bar.setVisible(False)
+            if self.live_chart and self.backend.monitor:
+                self.backend.monitor.stop()
+                self.backend.monitor = None
+                self.live_chart.set_monitor(None)
             
             # Scroll to bottom
-            self.result_text.verticalScrollBar().setValue(
-                self.result_text.verticalScrollBar().maximum()
-            ) 
+            self.result_view.scrollToBottom()
             
         except Exception as e:
             logger.error(f"Failed to update UI after test completion: {str(e)}", exc_info=True)
     
-    def _generate_test_summary(self):
-        """Generate test result summary"""
-        try:
-            text = self.result_text.toPlainText()
-            if not text:
-                return ""
-            
-            # Check if it's a loop test
-            if "=== Test 1/" in text:
-                # Loop test summary
-                total_rounds = 0
-                passed_rounds = 0
-                failed_rounds = 0
-                
-                # Analyze each test round result
-                rounds = text.split("=== Test ")[1:]
-                for round_text in rounds:
-                    if "/" not in round_text:
-                        continue
-                    
-                    total_rounds += 1
-                    test_items = 0
-                    failed_items = 0
-                    
-                    # Check all test items in the current test round
-                    lines = round_text.split('\n')
-                    for line in lines:
-                        if any(test in line for test in ["Controller Detection", "Basic Read/Write", "Performance Test", "Stability Test"]):
-                            test_items += 1
-                            if "Failed" in line or "Error" in line:  # Add check for "Error"
-                                failed_items += 1
-                    
-                    # Only pass if all test items are completed and all passed
-                    if test_items == 4 and failed_items == 0:
-                        passed_rounds += 1
-                    else:
-                        failed_rounds += 1
-                
-                # Generate summary information
-                if total_rounds == 0:
-                    return "<br><span style='color: gray; font-weight: bold;'>Test result: No test completed</span>"
-                else:
-                    status_color = "green" if failed_rounds == 0 else "red"
-                    return (f"<br><span style='color: {status_color}; font-weight: bold;'>"
-                           f"Test result: Completed {total_rounds} rounds of testing, "
-                           f"passed {passed_rounds} rounds, failed {failed_rounds} rounds</span>")
-            else:
-                # Single test summary logic remains unchanged
-                test_items = 0
-                failed_items = 0
-                lines = text.split('\n')
-                for line in lines:
-                    if any(test in line for test in ["Controller Detection", "Basic Read/Write", "Performance Test", "Stability Test"]):
-                        test_items += 1
-                        if "Failed" in line:
-                            failed_items += 1
-                
-                if test_items == 0:
-                    return "<br><span style='color: gray; font-weight: bold;'>Test result: No test completed</span>"
-                elif failed_items > 0:
-                    return f"<br><span style='color: red; font-weight: bold;'>Test result: Test error (Failed items: {failed_items}/{test_items})</span>"
-                elif test_items == 4:
-                    return "<br><span style='color: green; font-weight: bold;'>Test result: Test passed</span>"
-                else:
-                    return "<br><span style='color: orange; font-weight: bold;'>Test result: Test not completed</span>"
-            
-        except Exception as e:
-            logger.error(f"Failed to generate test summary: {str(e)}", exc_info=True)
-            return "<br><span style='color: red; font-weight: bold;'>Test result: Summary failed</span>"
-    
     def _update_progress(self, value):
         """Update progress bar"""
         self.progress_bar.setValue(value)
@@ -487,34 +525,13 @@ class MainWindow(QMainWindow):
     def _show_test_result(self, result):
         """Display single test result"""
         for test_name, test_result in result.items():
-            # Create simple HTML format text
-            status = "Passed" if test_result['passed'] else "Failed"
-            status_color = "green" if test_result['passed'] else "red"
-            
-            # Process detail text, convert newline characters to HTML line breaks
-            details = test_result['details'].replace('\n', '<br>')
-            
-            # Use simple HTML format
-            result_html = f"""
-            <div>
-                <span style='font-weight: bold;'>{test_name}: </span>
-                <span style='color: {status_color};'>{status}</span><br>
-                Details: {details}<br>
-            </div>
-            <br>
-            """
-            
-            # Add HTML text to result display area
-            self.result_text.insertHtml(result_html)
+            self.result_counters.add_result(test_result['passed'])
+            self.result_model.append(ResultRow(RESULT, test_name, test_result['passed'], test_result['details'],
+                                               self.result_counters.rounds))
             
             # Update status bar
-            status_msg = f"Test item {test_name}: {status}"
-            self.statusBar.showMessage(status_msg)
-            
-            # Scroll to bottom
-            self.result_text.verticalScrollBar().setValue(
-                self.result_text.verticalScrollBar().maximum()
-            )
+            status = "Passed" if test_result['passed'] else "Failed"
+            self.statusBar.showMessage(f"Test item {test_name}: {status}")
     
     def _open_config(self):
         """Open configuration file"""
@@ -603,51 +620,3 @@ class MainWindow(QMainWindow):
         """Display About dialog"""
         dialog = AboutDialog(self)
         dialog.exec_()
-    
-    def _generate_report(self, all_results, output_path):
-        """Generate test report"""
-        with open(output_path, 'w', encoding='utf-8') as f:
-            # Write report header
-            f.write("=== SD Express Tester Test Report ===\n")
-            f.write(f"Test time: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}\n\n")
-            
-            # Write configuration information
-            f.write("Test configuration:\n")
-            f.write(f"- Loop test: {'Enabled' if config.get('test.loop.enabled') else 'Disabled'}\n")
-            if config.get('test.loop.enabled'):
-                f.write(f"- Loop count: {config.get('test.loop.count')}\n")
-            f.write(f"- Total size of performance test: {config.get('test.performance.total_size')}MB\n")
-            f.write(f"- Performance test block size: {config.get('test.performance.block_size')}MB\n")
-            f.write(f"- Performance test iterations: {config.get('test.performance.iterations')}\n\n")
-            
-            # Write test results
-            if isinstance(all_results, list):  # Loop test results
-                total_rounds = len(all_results)
-                passed_rounds = sum(1 for results in all_results 
-                                  if all(r.get('passed', False) for r in results.values()))
-                failed_rounds = total_rounds - passed_rounds
-                
-                f.write(f"Test result summary:\n")
-                f.write(f"- Total number of test rounds: {total_rounds}\n")
-                f.write(f"- Passed rounds: {passed_rounds}\n")
-                f.write(f"- Failed rounds: {failed_rounds}\n\n")
-                
-                # Write detailed results of each test round
-                for round_num, results in enumerate(all_results, 1):
-                    f.write(f"\n=== Test round {round_num}/{total_rounds} ===\n")
-                    self._write_test_details(f, results)
-                    
-            else:  # Single test result
-                f.write("Test results:\n")
-                self._write_test_details(f, all_results)
-    
-    def _write_test_details(self, f, results):
-        """Write test details"""
-        for test_name, result in results.items():
-            status = "Passed" if result['passed'] else "Failed"
-            f.write(f"\n{test_name}: {status}\n")
-            # Process multi-line details
-            details = result['details'].split('\n')
-            for detail in details:
-                if detail.strip():
-                    f.write(f"  {detail}\n")
\ No newline at end of file
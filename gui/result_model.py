@@ -0,0 +1,189 @@
+from PyQt5.QtWidgets import QListView, QAbstractItemView, QApplication
+from PyQt5.QtCore import Qt, QAbstractListModel, QModelIndex
+from PyQt5.QtGui import QColor, QFont, QKeySequence
+
+MAX_ROWS = 2000  # Default row cap of the result list
+
+# Row kinds
+MARKER = 0  # Test start/end and round markers
+RESULT = 1  # Result of one test case
+NOTE = 2    # Stop notes and the final summary
+
+# Custom item data roles
+RowRole = Qt.UserRole          # The ResultRow
+PassedRole = Qt.UserRole + 1   # True/False for RESULT rows, None otherwise
+DetailsRole = Qt.UserRole + 2  # Detail text of RESULT rows
+RoundRole = Qt.UserRole + 3    # Round number, 0 outside loop tests
+
+class ResultRow:
+    """One row of the result list"""
+    __slots__ = ('kind', 'title', 'passed', 'details', 'round_number', 'color')
+
+    def __init__(self, kind, title, passed=None, details="", round_number=0, color=None):
+        self.kind = kind
+        self.title = title
+        self.passed = passed
+        self.details = details
+        self.round_number = round_number
+        self.color = color
+
+    def text(self):
+        if self.kind != RESULT:
+            return self.title
+        lines = [f"{self.title}: {'Passed' if self.passed else 'Failed'}"]
+        lines.extend(f"  {detail}" for detail in self.details.split('\n') if detail.strip())
+        return "\n".join(lines)
+
+class ResultCounters:
+    """Pass/fail counters of the results shown, the summary never rescans the rows
+
+    In loop tests a round passes only when all its test cases finished and
+    passed, a round cut short by a stop counts as failed.
+    """
+    def __init__(self):
+        self.loop = False
+        self.rounds = 0
+        self.passed_rounds = 0
+        self.items = 0         # Results of the current round, or of the whole single run
+        self.failed_items = 0
+        self._round_open = False
+
+    def start_round(self, expected_items):
+        self._close_round(expected_items)
+        self.loop = True
+        self._round_open = True
+        self.rounds += 1
+        self.items = 0
+        self.failed_items = 0
+
+    def add_result(self, passed):
+        self.items += 1
+        if not passed:
+            self.failed_items += 1
+
+    def _close_round(self, expected_items):
+        if self._round_open:
+            self._round_open = False
+            if self.items == expected_items and self.failed_items == 0:
+                self.passed_rounds += 1
+
+    def summary(self, expected_items):
+        """Summary text and color once the test finished
+        Args:
+            expected_items: Number of test cases of a complete round
+        """
+        if self.loop:
+            self._close_round(expected_items)
+            if self.rounds == 0:
+                return "Test result: No test completed", "gray"
+            failed_rounds = self.rounds - self.passed_rounds
+            return (f"Test result: Completed {self.rounds} rounds of testing, passed {self.passed_rounds} rounds, "
+                    f"failed {failed_rounds} rounds", "green" if failed_rounds == 0 else "red")
+        if self.items == 0:
+            return "Test result: No test completed", "gray"
+        if self.failed_items:
+            return f"Test result: Test error (Failed items: {self.failed_items}/{self.items})", "red"
+        if self.items == expected_items:
+            return "Test result: Test passed", "green"
+        return "Test result: Test not completed", "orange"
+
+class ResultListModel(QAbstractListModel):
+    """Capped list of result rows
+
+    Holds at most max_rows rows, once full the oldest tenth is dropped in one
+    batch so views relayout rarely. The report file keeps every result, the
+    list only shows the tail of long loop runs.
+    """
+    def __init__(self, max_rows=MAX_ROWS, parent=None):
+        super().__init__(parent)
+        self.max_rows = max(1, max_rows)
+        self.dropped = 0  # Rows dropped since the last clear()
+        self._rows = []
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        row = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return row.text()
+        if role == Qt.ForegroundRole:
+            if row.kind == RESULT:
+                return QColor("green" if row.passed else "red")
+            return QColor(row.color) if row.color else None
+        if role == Qt.FontRole:
+            if row.kind != RESULT:
+                font = QFont()
+                font.setBold(True)
+                return font
+            return None
+        if role == Qt.ToolTipRole:
+            return row.details or None
+        if role == RowRole:
+            return row
+        if role == PassedRole:
+            return row.passed
+        if role == DetailsRole:
+            return row.details
+        if role == RoundRole:
+            return row.round_number
+        return None
+
+    def append(self, row):
+        if len(self._rows) >= self.max_rows:
+            count = max(1, self.max_rows // 10)
+            self.beginRemoveRows(QModelIndex(), 0, count - 1)
+            del self._rows[:count]
+            self.endRemoveRows()
+            self.dropped += count
+        position = len(self._rows)
+        self.beginInsertRows(QModelIndex(), position, position)
+        self._rows.append(row)
+        self.endInsertRows()
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows = []
+        self.dropped = 0
+        self.endResetModel()
+
+    def row(self, number):
+        return self._rows[number]
+
+class ResultView(QListView):
+    """List view of a ResultListModel
+
+    Follows new rows while scrolled to the bottom, and copies the text of the
+    selected rows with the standard copy shortcut.
+    """
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWordWrap(True)
+        self.setSelectionMode(QAbstractItemView.ExtendedSelection)
+        self.setVerticalScrollMode(QAbstractItemView.ScrollPerPixel)
+        self.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.setLayoutMode(QListView.Batched)
+        self.setBatchSize(100)
+        self._follow = True
+
+    def setModel(self, model):
+        super().setModel(model)
+        model.rowsAboutToBeInserted.connect(self._check_follow)
+        model.rowsInserted.connect(self._follow_rows)
+
+    def _check_follow(self, *args):
+        scroll_bar = self.verticalScrollBar()
+        self._follow = scroll_bar.value() == scroll_bar.maximum()
+
+    def _follow_rows(self, *args):
+        if self._follow:
+            self.scrollToBottom()
+
+    def keyPressEvent(self, event):
+        if event.matches(QKeySequence.Copy):
+            rows = sorted(index.row() for index in self.selectedIndexes())
+            QApplication.clipboard().setText("\n".join(self.model().row(row).text() for row in rows))
+            return
+        super().keyPressEvent(event)
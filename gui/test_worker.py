@@ -0,0 +1,60 @@
+from PyQt5.QtCore import QObject, pyqtSignal, pyqtSlot
+from utils.logger import get_logger
+
+try:
+    import pythoncom
+except ImportError:  # Non-Windows platform, no COM apartment needed
+    pythoncom = None
+
+logger = get_logger(__name__)
+
+class TestWorker(QObject):
+    """Runs a TestRunner in a QThread
+
+    Test callbacks emit signals only, receivers living in the GUI thread get
+    them as queued events, so timed I/O loops never run Qt code and the GUI
+    stays responsive during long blocking I/O.
+    """
+    progress = pyqtSignal(int)
+    status = pyqtSignal(str)
+    result = pyqtSignal(dict)
+    round_started = pyqtSignal(int, int)
+    error = pyqtSignal(str)
+    finished = pyqtSignal(object)  # Number of finished rounds, None after an error
+
+    def __init__(self, runner, test_config, report=None):
+        """
+        Args:
+            report: Optional ReportWriter, rounds are appended from this thread as they finish
+        """
+        super().__init__()
+        self.runner = runner
+        self.test_config = dict(test_config)
+        self.report = report
+
+    @pyqtSlot()
+    def run(self):
+        # WMI card detection runs in this thread too, it needs its own COM apartment
+        if pythoncom:
+            pythoncom.CoInitialize()
+        results = None
+        try:
+            test_config = dict(self.test_config,
+                               progress_callback=self.progress.emit,
+                               status_callback=self.status.emit,
+                               result_callback=self.result.emit)
+            if self.report:
+                test_config['iteration_callback'] = self.report.add_iteration
+            results = self.runner.run(test_config, round_callback=self.round_started.emit,
+                                      round_finished=self.report.add_round if self.report else None)
+        except Exception as e:
+            logger.error(f"Test process error: {str(e)}", exc_info=True)
+            self.error.emit(str(e))
+        finally:
+            if pythoncom:
+                pythoncom.CoUninitialize()
+            self.finished.emit(results)
+
+    def stop(self):
+        """Thread safe stop request"""
+        self.runner.stop()
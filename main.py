@@ -1,8 +1,8 @@
+import os
 import sys
 import ctypes
-from PyQt5.QtWidgets import QApplication
-from gui.main_window import MainWindow
-from cli.cli_runner import CLIRunner
+import multiprocessing
+from cli.cli_runner import CLIRunner, EXIT_ERROR
 from utils.logger import get_logger
 
 # Get main logger
@@ -10,6 +10,8 @@ logger = get_logger()
 
 def hide_console():
     """Hide console window"""
+    if os.name != 'nt':
+        return
     kernel32 = ctypes.WinDLL('kernel32')
     user32 = ctypes.WinDLL('user32')
     get_win = kernel32.GetConsoleWindow
@@ -21,6 +23,8 @@ def hide_console():
 
 def show_console():
     """Show console window"""
+    if os.name != 'nt':
+        return
     kernel32 = ctypes.WinDLL('kernel32')
     user32 = ctypes.WinDLL('user32')
     get_win = kernel32.GetConsoleWindow
@@ -42,18 +46,22 @@ def main():
             show_console()
             logger.info("Running in CLI mode")
             cli = CLIRunner()
-            cli.run()
+            sys.exit(cli.run())
         else:
             # GUI mode: Hide console
             hide_console()
             logger.info("Running in GUI mode")
+            # Qt is only loaded for the GUI, batch CLI runs work on headless machines
+            from PyQt5.QtWidgets import QApplication
+            from gui.main_window import MainWindow
             app = QApplication(sys.argv)
             window = MainWindow()
             window.show()
             sys.exit(app.exec_())
     except Exception as e:
         logger.error(f"Program error: {str(e)}", exc_info=True)
-        sys.exit(1)
+        sys.exit(EXIT_ERROR)
 
 if __name__ == "__main__":
+    multiprocessing.freeze_support()  # Parallel stream worker processes in the frozen executable
     main() 
\ No newline at end of file
@@ -13,12 +13,35 @@ a = Analysis(
     hiddenimports=[
         'gui',
         'gui.main_window',
+        'gui.test_worker',
+        'gui.result_model',
+        'gui.live_chart',
         'cli',
         'cli.cli_runner',
+        'cli.json_output',
         'core',
         'core.card_ops',
         'core.controller',
         'core.test_suite',
+        'core.io_engine',
+        'core.backend',
+        'core.patterns',
+        'core.verify',
+        'core.latency',
+        'core.sampler',
+        'core.jobs',
+        'core.parallel',
+        'core.test_runner',
+        'core.device_events',
+        'core.card_cache',
+        'core.mode_probe',
+        'core.raw_device',
+        'core.test_area',
+        'core.surface_scan',
+        'core.endurance',
+        'core.results_store',
+        'core.report',
+        'core.live_monitor',
         'utils',
         'utils.logger',
         'PyQt5',
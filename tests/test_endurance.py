@@ -0,0 +1,45 @@
+import json
+from core.backend import SimulatedBackend
+from core.endurance import EnduranceCheckpoint, EnduranceTest
+
+CYCLE_SIZE = 4 * 1024 * 1024
+
+def _endurance_test(tmp_path, max_cycles, data_kept=False):
+    backend = SimulatedBackend(path=str(tmp_path / "card"), capacity=1, read_bandwidth=0, write_bandwidth=0,
+                               latency_us=0)
+    path = tmp_path / "endurance.bin"
+    if not path.exists():
+        backend.preallocate(str(path), CYCLE_SIZE)
+    checkpoint = EnduranceCheckpoint(str(tmp_path / "checkpoint.jsonl"))
+    return EnduranceTest(backend, str(path), checkpoint, "card", CYCLE_SIZE, block_size=256 * 1024,
+                         queue_depth=2, max_cycles=max_cycles, seed=1, data_kept=data_kept)
+
+def test_resume_inside_cycle_skips_retention_check(tmp_path):
+    state, stopped = _endurance_test(tmp_path, max_cycles=2).run()
+    assert not stopped and state.cycles == 2
+
+    # Interrupted after the write pass of cycle 2 was started: its completion and done records are lost
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    records = [json.loads(line) for line in checkpoint.read_text().splitlines()]
+    kept = [record for record in records
+            if record['type'] != 'done' and not (record['type'] == 'cycle' and record['cycle'] == 2)]
+    checkpoint.write_text("".join(json.dumps(record) + "\n" for record in kept))
+
+    test = _endurance_test(tmp_path, max_cycles=2, data_kept=True)
+    state, stopped = test.run()
+    assert test.resumed and not stopped
+    assert state.cycles == 2
+    assert state.error_cycles == 0 and state.bad_sectors == 0
+    assert not any(json.loads(line)['type'] == 'retention' for line in checkpoint.read_text().splitlines())
+
+def test_resume_after_finished_cycle_checks_retention(tmp_path):
+    _endurance_test(tmp_path, max_cycles=1).run()
+    checkpoint = tmp_path / "checkpoint.jsonl"
+    lines = checkpoint.read_text().splitlines()
+    checkpoint.write_text("".join(line + "\n" for line in lines if json.loads(line)['type'] != 'done'))
+
+    state, _ = _endurance_test(tmp_path, max_cycles=2, data_kept=True).run()
+    retention = [json.loads(line) for line in checkpoint.read_text().splitlines()
+                 if json.loads(line)['type'] == 'retention']
+    assert len(retention) == 1 and retention[0]['cycle'] == 1
+    assert state.cycles == 2 and state.error_cycles == 0
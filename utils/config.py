@@ -21,6 +21,7 @@ class Config:
         return '''# Card Configuration
 card:
   sd_express_model: ""  # SD Express card model name, empty for automatic detection
+  target: ""            # Test only this card: volume (E: or mount point), device path or serial number, empty for the first card found
   sd4_disable: null     # SD4.0 mode control: (true/false/null). true to disable SD4.0, false to re-enable SD4.0, null for no control
   registry_path: "SYSTEM\\\\CurrentControlSet\\\\Services\\\\bhtsddr\\\\GG8"  # Registry path for SD host controller
   registry_item: "sd_card_mode_dis"  # Registry item name for card configuration
@@ -37,8 +38,28 @@ card:
     sd_4: 120          # SD 4.0 (UHS-II) minimum speed threshold (120 MB/s)
     sd_3: 30           # SD 3.0 (UHS-I) minimum speed threshold (30 MB/s)
 
+  # Adaptive mode probe: read passes continue until the confidence interval of the
+  # mean speed excludes every speed threshold, or the pass or time budget is used up
+  probe:
+    confidence: 0.95   # Confidence level of the speed interval (0.5-0.999)
+    min_samples: 3     # Minimum read passes (2-100)
+    max_samples: 20    # Maximum read passes (2-100)
+    time_budget: 3.0   # Maximum sampling time (seconds)
+
+  # Card mode cache, a known card is classified without the speed probe
+  # Cards are identified by serial number, model, capacity and controller
+  mode_cache:
+    enabled: true      # Use and update the card mode cache (true/false)
+    path: ""           # Cache file, empty for card_mode_cache.json next to the program
+    ttl_days: 30       # Cached modes older than this are measured again (days)
+    max_entries: 64    # Least recently used cards are evicted beyond this count
+
 # Test Configuration
 test:
+  # Test cases of every round: controller, basic, performance, iops, stability, parallel, surface,
+  # endurance, jobs. Empty for the default set; listed optional tests run even when not enabled
+  workloads: []
+
   # Loop test configuration
   loop:
     enabled: false  # Enable loop test (true/false)
@@ -46,16 +67,105 @@ test:
 
   # Performance test configuration
   performance:
-    total_size: 128  # Total data size(MB) (1-1024)
+    total_size: 128  # Total data size(MB) (1-65536), data is streamed so large sustained runs need no extra memory
     block_size: 1    # Block size(MB) (1-64)
     iterations: 3    # Average count (1-10)
+    queue_depths: [1, 32]  # Outstanding I/O requests per run, one result per queue depth (1-64)
+    io_engine: auto  # I/O engine: auto, overlapped (Windows), threadpool (Linux/POSIX)
+    seed: null       # Seed of write data stream, null for a random seed per run
+    sample_interval_ms: 100  # Throughput time series window (ms), series saved as test_report_*_throughput.csv
+
+  # Random IOPS test configuration
+  iops:
+    block_size: 4          # Block size (KB), requests are aligned to the block size
+    read_percent: [100, 0] # Read percentage of each run, the rest are writes (0-100)
+    queue_depths: [1, 32]  # Outstanding I/O requests, one run per queue depth and read percentage (1-64)
+    duration: 10           # Run time of each run (seconds)
+    region_size: 256       # Random I/O region (MB), written once before the runs
+    seed: null             # Seed of offsets and write data, null for a random seed per run
+
+  # Parallel stream test configuration, measures multi-queue scaling (NVMe mode)
+  parallel:
+    enabled: false       # Add the parallel stream test to every round (true/false)
+    workers: [1, 2, 4]   # Worker counts to compare, each worker has its own I/O engine
+    size: 128            # Data per worker (MB)
+    block_size: 1024     # Block size (KB)
+    queue_depth: 8       # Outstanding I/O requests per worker (1-64)
+    layout: file         # file: one file per worker, range: disjoint ranges of one shared file
+    processes: false     # Run workers in processes instead of threads, uses the native I/O engine
+
+  # Full capacity surface scan (h2testw/f3 style): fills the free space of the card with LBA tagged
+  # data, then reads all of it back and maps corrupted, aliased (fake capacity) and lost regions.
+  # Takes hours on large cards. In raw device mode the raw window is scanned instead.
+  surface:
+    enabled: false       # Add the surface scan to every round (true/false)
+    block_size: 4        # Block size (MB)
+    queue_depth: 4       # Outstanding I/O requests (1-64)
+    file_size: 1024      # Size of each scan file (MB), FAT32 limits files to 4096MB
+    reserve: 64          # Free space left on the volume (MB)
+    limit: 0             # Scan at most this much (GB), 0 for all free space
+    seed: null           # Data pattern seed, null for a random seed per run (reported in results)
+
+  # Endurance test: write/verify cycles over one file for hours or days. Every finished cycle is
+  # appended to a checkpoint file, an interrupted run (crash, reboot, stop) resumes from it.
+  endurance:
+    enabled: false       # Add the endurance test to every round (true/false)
+    cycle_size: 1024     # Data written and verified per cycle (MB)
+    block_size: 1        # Block size (MB)
+    queue_depth: 4       # Outstanding I/O requests (1-64)
+    duration: 24         # Total run time over all sessions (hours), 0 for no limit
+    cycles: 0            # Total cycle count, 0 for no limit
+    checkpoint: ""       # Checkpoint file, empty for endurance_checkpoint.jsonl in the program directory
+    resume: true         # Resume an unfinished checkpoint of the same card (true/false)
+    seed: null           # Data pattern seed of a new run, null for a random seed
+
+  # Declarative workloads (fio job file style), each job runs as an extra test case
+  # Keys: name, rw (read, write, rw, randread, randwrite, randrw), bs, iodepth, size,
+  # runtime (s), rwmixread, verify (none, pattern), numjobs, min_speed (MB/s), min_iops, seed
+  # Example:
+  #   jobs:
+  #     - {name: a2-randread, rw: randread, bs: 4k, iodepth: 32, size: 1g, runtime: 10, min_iops: 4000}
+  #     - {name: v30-sustained, rw: write, bs: 1m, size: 1g, runtime: 60, min_speed: 30}
+  jobs: []
+
+  # Raw block device mode: performance and random IOPS tests use a reserved LBA window of the
+  # card's physical device (\\\\.\\PhysicalDriveN, /dev/sdX, /dev/nvmeXnY) instead of files,
+  # so results exclude file system overhead. DATA IN THE WINDOW IS OVERWRITTEN.
+  raw:
+    enabled: false       # Use the raw window (true/false), needs administrator/root rights
+    confirm: ""          # Serial number or device path of the card to overwrite, must match the detected card
+    window_offset: null  # Window start (MB from the start of the device), null for the end of the device
+    window_size: 1024    # Window size (MB), must lie in unpartitioned space and hold the test sizes
+
+  # Stability test configuration
+  stability:
+    seed: null          # Data pattern seed, null for a random seed per run (reported in results)
+    keep_files: false   # Keep written files and a manifest in verify_files on the card (true/false)
+    verify_only: false  # Only verify files kept by an earlier run, e.g. after a power cycle (true/false)
 
   # Test timeout configuration (seconds)
   timeout: 600       # Single test loop timeout (10 minutes)
 
+# Storage backend configuration
+backend:
+  type: auto  # Storage backend: auto, windows, posix (Linux), simulated (file backed simulated card)
+  simulated:
+    path: sim_card        # Directory of simulated card volume, raw image is created as <path>.img
+    capacity: 32          # Simulated capacity (GB), image file is sparse
+    mode: "8.0"           # Simulated bus mode: 8.0, 7.0, 4.0, 3.0, 2.0
+    read_bandwidth: null  # Read bandwidth (MB/s), null for mode default, 0 for unlimited
+    write_bandwidth: null # Write bandwidth (MB/s), null for mode default, 0 for unlimited
+    latency_us: 100       # Latency per I/O request (microseconds)
+    unpartitioned: 256    # Space (MB) at the end of the image outside the simulated partition, raw window space
+
 # UI Configuration
 ui:
   always_on_top: false  # Keep window always on top (true/false)
+  result_rows: 2000  # Rows kept in the result list, older rows are dropped (the report keeps all)
+  chart:
+    enabled: true  # Live throughput/latency chart during the test
+    frame_rate: 10  # Chart redraws per second, independent of the I/O rate
+    history: 3600  # Seconds shown, older windows are overwritten
 
 # Logger Configuration
 logger:
@@ -127,6 +237,20 @@ logger:
             logger.error(f"Failed to save configuration: {str(e)}", exc_info=True)
             return False
     
+    def override(self, key, value):
+        """Set configuration value in memory only, e.g. from command line options
+        
+        Missing intermediate sections are created, the config file is not changed.
+        """
+        keys = key.split('.')
+        config = self.config
+        for k in keys[:-1]:
+            if not isinstance(config.get(k), dict):
+                config[k] = {}
+            config = config[k]
+        config[keys[-1]] = value
+        logger.info(f"Configuration override: {key} = {value!r}")
+    
     def reload(self):
         """Reload configuration file"""
         logger.info("Reload configuration file")